@@ -3,18 +3,29 @@
 from datetime import datetime, timedelta
 from alpaca.trading.client import TradingClient
 from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockLatestQuoteRequest
+from alpaca.data.requests import StockLatestQuoteRequest, StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
 from alpaca.trading.requests import GetOrdersRequest, MarketOrderRequest
 from alpaca.trading.enums import OrderStatus, QueryOrderStatus, OrderSide, TimeInForce
 import os
+import threading
+import time
+from concurrent.futures import Future
 from decimal import Decimal
-from typing import Dict, List
+from typing import Dict, List, Optional
 import io
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import requests
+from alpaca_service.plot_renderer import render_portfolio_png
+
+# Seconds a latest quote is reused before it is fetched again
+QUOTE_CACHE_TTL = 0.5
 
 class AlpacaService:
+    # Latest quotes don't depend on the account, so every instance in the process shares them
+    _quote_cache: Dict[str, tuple] = {}  # symbol -> (fetched_at, quote)
+    _quote_requests: Dict[str, Future] = {}  # symbol -> fetch in flight
+    _quote_lock = threading.Lock()
+
     def __init__(self, api_key=None, secret_key=None):
         self.api_key = api_key
         self.secret_key = secret_key
@@ -134,6 +145,105 @@ class AlpacaService:
         
         return allocation
     
+    def get_stock_bars(self, symbols: List[str], start: datetime, timeframe: TimeFrame = TimeFrame.Day) -> Dict[str, List[Dict]]:
+        """Get historical bars for several symbols with a single batched request."""
+        if not symbols:
+            return {}
+
+        request_params = StockBarsRequest(
+            symbol_or_symbols=symbols,
+            timeframe=timeframe,
+            start=start
+        )
+        bar_set = self.data_client.get_stock_bars(request_params)
+
+        return {
+            symbol: [{
+                'timestamp': bar.timestamp,
+                'open': float(bar.open),
+                'high': float(bar.high),
+                'low': float(bar.low),
+                'close': float(bar.close),
+                'volume': float(bar.volume)
+            } for bar in bars]
+            for symbol, bars in bar_set.data.items()
+        }
+
+    def get_latest_quotes(self, symbols: List[str], max_age: float = QUOTE_CACHE_TTL) -> Dict[str, Dict]:
+        """Get latest quotes for several symbols with a single batched request.
+        
+        Quotes younger than max_age seconds are served from a process-wide cache, and
+        symbols already being fetched by another caller wait for that fetch instead of
+        requesting again. Symbols without a quote are left out of the result.
+        """
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol))
+        quotes = {}
+        pending = {}
+        to_fetch = []
+        now = time.monotonic()
+        
+        with self._quote_lock:
+            for symbol in symbols:
+                cached = self._quote_cache.get(symbol)
+                if cached and now - cached[0] <= max_age:
+                    quotes[symbol] = cached[1]
+                elif symbol in self._quote_requests:
+                    pending[symbol] = self._quote_requests[symbol]
+                else:
+                    to_fetch.append(symbol)
+            if to_fetch:
+                fetch = Future()
+                for symbol in to_fetch:
+                    self._quote_requests[symbol] = fetch
+        
+        if to_fetch:
+            try:
+                response = self.data_client.get_stock_latest_quote(
+                    StockLatestQuoteRequest(symbol_or_symbols=to_fetch)
+                )
+                fetched = {symbol: self._format_quote(symbol, quote) for symbol, quote in response.items()}
+            except Exception as e:
+                with self._quote_lock:
+                    for symbol in to_fetch:
+                        self._quote_requests.pop(symbol, None)
+                fetch.set_exception(e)
+                raise
+            
+            fetched_at = time.monotonic()
+            with self._quote_lock:
+                for symbol in to_fetch:
+                    self._quote_requests.pop(symbol, None)
+                for symbol, quote in fetched.items():
+                    self._quote_cache[symbol] = (fetched_at, quote)
+            fetch.set_result(fetched)
+            quotes.update(fetched)
+        
+        for symbol, fetch in pending.items():
+            quote = fetch.result().get(symbol)
+            if quote:
+                quotes[symbol] = quote
+        
+        return quotes
+
+    def get_latest_quote(self, symbol: str) -> Optional[Dict]:
+        """Get the latest quote for one symbol (see get_latest_quotes)."""
+        return self.get_latest_quotes([symbol]).get(symbol.strip().upper())
+
+    @staticmethod
+    def _format_quote(symbol: str, quote) -> Dict:
+        bid_price = float(quote.bid_price or 0)
+        ask_price = float(quote.ask_price or 0)
+        return {
+            'symbol': symbol,
+            'bid_price': bid_price,
+            'ask_price': ask_price,
+            'bid_size': float(quote.bid_size or 0),
+            'ask_size': float(quote.ask_size or 0),
+            # Mid price when both sides are quoted, otherwise whichever side is
+            'price': (bid_price + ask_price) / 2 if bid_price > 0 and ask_price > 0 else ask_price or bid_price,
+            'timestamp': quote.timestamp
+        }
+
     def get_portfolio_history(self, timeframe='1D', period=None, date_end=None):
         """Get historical portfolio values from Alpaca."""
         base_url = "https://paper-api.alpaca.markets"
@@ -190,56 +300,7 @@ class AlpacaService:
 
     def create_portfolio_plot(self, portfolio_history):
         """Create a visualization of portfolio history."""
-        timestamps = [datetime.fromtimestamp(ts) for ts in portfolio_history['timestamp']]
-        
-        plt.figure(figsize=(12, 6))
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[3, 1])
-        fig.suptitle('Portfolio Performance', fontsize=16)
-        
-        ax1.plot(timestamps, portfolio_history['equity'], label='Portfolio Value', color='blue')
-        ax1.set_ylabel('Portfolio Value ($)')
-        ax1.grid(True)
-        ax1.legend()
-        
-        locator = mdates.AutoDateLocator()
-        ax1.xaxis.set_major_locator(locator)
-        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-        plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45, ha='right')
-        
-        profit_loss_pct = portfolio_history['profit_loss_pct']
-        ax2.plot(timestamps, profit_loss_pct, label='Profit/Loss %', color='green')
-        ax2.axhline(y=0, color='r', linestyle='-', alpha=0.3)
-        ax2.set_ylabel('Profit/Loss %')
-        ax2.grid(True)
-        ax2.legend()
-        
-        ax2.xaxis.set_major_locator(locator)
-        ax2.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45, ha='right')
-        
-        current_value = portfolio_history['equity'][-1]
-        total_return = profit_loss_pct[-1]
-        max_value = max(portfolio_history['equity'])
-        min_value = min(portfolio_history['equity'])
-        
-        stats_text = f'Current Value: ${current_value:,.2f}\n'
-        stats_text += f'Total Return: {total_return:.2f}%\n'
-        stats_text += f'Max Value: ${max_value:,.2f}\n'
-        stats_text += f'Min Value: ${min_value:,.2f}'
-        
-        ax1.text(0.02, 0.98, stats_text,
-                transform=ax1.transAxes,
-                verticalalignment='top',
-                bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-        
-        plt.tight_layout()
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        return buf
+        return io.BytesIO(render_portfolio_png(portfolio_history))
 
     def submit_order(self, symbol: str, side: str, qty: float, order_type: str = 'market', 
                     limit_price: float = None, stop_price: float = None) -> Dict:
@@ -0,0 +1,250 @@
+"""
+Vectorized portfolio analytics for equity curves (returns, drawdown, volatility, Sharpe/Sortino)
+"""
+
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+TRADING_DAYS_PER_YEAR = 252
+TRADING_SECONDS_PER_DAY = 6.5 * 3600
+SECONDS_PER_DAY = 86400
+
+
+def to_array(values: Optional[Sequence]) -> np.ndarray:
+    """Convert a list of values (which may contain None) into a float array with NaN gaps"""
+    if values is None:
+        return np.empty(0, dtype=float)
+    return np.asarray(values, dtype=float)
+
+
+def infer_periods_per_year(timestamps: Optional[Sequence]) -> float:
+    """Estimate how many sampling periods make up one trading year from epoch timestamps"""
+    ts = to_array(timestamps)
+    ts = ts[np.isfinite(ts)]
+    if ts.size < 2:
+        return TRADING_DAYS_PER_YEAR
+
+    step = float(np.median(np.diff(ts)))
+    if step <= 0:
+        return TRADING_DAYS_PER_YEAR
+    if step < 0.8 * SECONDS_PER_DAY:
+        # Intraday bars only cover the regular trading session
+        return TRADING_DAYS_PER_YEAR * TRADING_SECONDS_PER_DAY / step
+    if step <= 1.5 * SECONDS_PER_DAY:
+        return TRADING_DAYS_PER_YEAR
+    return 365.25 * SECONDS_PER_DAY / step
+
+
+def align_series(target_timestamps: Sequence, source_timestamps: Sequence, source_values: Sequence) -> np.ndarray:
+    """
+    Align a series onto target timestamps by carrying the last known value forward
+
+    Args:
+        target_timestamps: Epoch timestamps to align onto (sorted)
+        source_timestamps: Epoch timestamps of the source series (sorted)
+        source_values: Values of the source series
+
+    Returns:
+        np.ndarray: Source values sampled at each target timestamp (NaN before the first source point)
+    """
+    target = to_array(target_timestamps)
+    source_ts = to_array(source_timestamps)
+    values = to_array(source_values)
+    aligned = np.full(target.shape, np.nan)
+    if source_ts.size == 0 or target.size == 0:
+        return aligned
+
+    idx = np.searchsorted(source_ts, target, side='right') - 1
+    valid = idx >= 0
+    aligned[valid] = values[idx[valid]]
+    return aligned
+
+
+def returns_since(timestamps: Sequence, values: Sequence, starts: Sequence) -> np.ndarray:
+    """
+    Percent change from the value in effect at each start timestamp to the latest value
+
+    Args:
+        timestamps: Epoch timestamps of the series (sorted)
+        values: Values of the series
+        starts: Window start timestamps, one return is computed per entry
+
+    Returns:
+        np.ndarray: Returns in percent (NaN where no positive starting value exists)
+    """
+    ts = to_array(timestamps)
+    vals = to_array(values)
+    valid = np.isfinite(vals)
+    ts, vals = ts[valid], vals[valid]
+    starts = to_array(starts)
+    if vals.size == 0:
+        return np.full(starts.shape, np.nan)
+
+    start_values = align_series(starts, ts, vals)
+    # Windows opening before the first observation start from the first value
+    start_values = np.where(np.isfinite(start_values), start_values, vals[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(start_values > 0, (vals[-1] / start_values - 1) * 100, np.nan)
+
+
+def _period_returns(values: np.ndarray) -> np.ndarray:
+    """Simple returns between consecutive values, NaN where the previous value is not positive"""
+    if values.size < 2:
+        return np.empty(0, dtype=float)
+    previous = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(previous > 0, values[1:] / previous - 1, np.nan)
+    return returns
+
+
+def _rolling_std(returns: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sample standard deviation computed from cumulative sums"""
+    if window < 2 or returns.size < window:
+        return np.empty(0, dtype=float)
+    padded = np.concatenate(([0.0], returns))
+    sums = np.cumsum(padded)
+    squares = np.cumsum(padded ** 2)
+    window_sum = sums[window:] - sums[:-window]
+    window_sq = squares[window:] - squares[:-window]
+    variance = (window_sq - window_sum ** 2 / window) / (window - 1)
+    return np.sqrt(np.clip(variance, 0, None))
+
+
+def compute_performance_metrics(
+    equity: Sequence,
+    timestamps: Optional[Sequence] = None,
+    benchmark: Optional[Sequence] = None,
+    base_value: Optional[float] = None,
+    risk_free_rate: float = 0.0,
+    rolling_window: int = 20,
+    periods_per_year: Optional[float] = None,
+    include_series: bool = False
+) -> Dict:
+    """
+    Compute portfolio statistics for an equity curve in a single vectorized pass
+
+    Args:
+        equity: Equity values (None entries are ignored)
+        timestamps: Epoch timestamps matching equity, used to annualize ratios
+        benchmark: Benchmark values aligned with equity (see align_series)
+        base_value: Reference value for the total return (defaults to the first valid equity value)
+        risk_free_rate: Annual risk-free rate as a fraction (e.g. 0.04)
+        rolling_window: Number of periods for the rolling volatility
+        periods_per_year: Override the annualization factor inferred from timestamps
+        include_series: Also return the drawdown and rolling volatility arrays
+
+    Returns:
+        dict: Performance metrics with returns, volatility and drawdown expressed in percent
+    """
+    values = to_array(equity)
+    ts = to_array(timestamps) if timestamps is not None else None
+    bench = to_array(benchmark) if benchmark is not None else None
+
+    mask = np.isfinite(values)
+    if bench is not None and bench.shape == values.shape:
+        bench = bench[mask]
+    else:
+        bench = None
+    if ts is not None and ts.shape == values.shape:
+        ts = ts[mask]
+    values = values[mask]
+
+    if values.size == 0:
+        return {}
+
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(ts)
+
+    start_value = float(values[0])
+    end_value = float(values[-1])
+    reference = base_value if base_value else start_value
+    total_return = (end_value - reference) / reference * 100 if reference > 0 else 0.0
+
+    returns = _period_returns(values)
+    valid_returns = returns[np.isfinite(returns)]
+    rf_per_period = risk_free_rate / periods_per_year
+
+    # Drawdown from the running peak
+    running_max = np.maximum.accumulate(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = np.where(running_max > 0, values / running_max - 1, 0.0)
+
+    volatility = 0.0
+    sharpe_ratio = 0.0
+    sortino_ratio = 0.0
+    if valid_returns.size >= 2:
+        excess = valid_returns - rf_per_period
+        std = float(np.std(valid_returns, ddof=1))
+        volatility = std * np.sqrt(periods_per_year) * 100
+        if std > 0:
+            sharpe_ratio = float(np.mean(excess) / std * np.sqrt(periods_per_year))
+        downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+        if downside > 0:
+            sortino_ratio = float(np.mean(excess) / downside * np.sqrt(periods_per_year))
+
+    rolling_vol = _rolling_std(np.nan_to_num(returns), rolling_window) * np.sqrt(periods_per_year) * 100
+
+    metrics = {
+        'start_value': start_value,
+        'end_value': end_value,
+        'max_value': float(values.max()),
+        'min_value': float(values.min()),
+        'total_return': float(total_return),
+        'max_drawdown': float(-drawdown.min() * 100),
+        'current_drawdown': float(-drawdown[-1] * 100),
+        'volatility': float(volatility),
+        'rolling_volatility': float(rolling_vol[-1]) if rolling_vol.size else None,
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'periods': int(values.size),
+        'periods_per_year': float(periods_per_year)
+    }
+
+    if bench is not None:
+        metrics.update(_benchmark_metrics(returns, bench, periods_per_year))
+        if metrics['benchmark_return'] is not None:
+            metrics['excess_return'] = metrics['total_return'] - metrics['benchmark_return']
+
+    if include_series:
+        metrics['drawdown_series'] = drawdown * 100
+        metrics['rolling_volatility_series'] = rolling_vol
+
+    return metrics
+
+
+def _benchmark_metrics(returns: np.ndarray, benchmark: np.ndarray, periods_per_year: float) -> Dict:
+    """Benchmark-relative statistics (beta, alpha, tracking error, information ratio)"""
+    valid_bench = benchmark[np.isfinite(benchmark) & (benchmark > 0)]
+    if valid_bench.size < 2:
+        return {'benchmark_return': None}
+
+    bench_returns = _period_returns(benchmark)
+    paired = np.isfinite(returns) & np.isfinite(bench_returns)
+    port = returns[paired]
+    bench = bench_returns[paired]
+
+    benchmark_return = float((valid_bench[-1] / valid_bench[0] - 1) * 100)
+    result = {
+        'benchmark_return': benchmark_return,
+        'beta': None,
+        'alpha': None,
+        'correlation': None,
+        'tracking_error': None,
+        'information_ratio': None
+    }
+    if port.size < 2:
+        return result
+
+    bench_var = float(np.var(bench, ddof=1))
+    active = port - bench
+    tracking = float(np.std(active, ddof=1))
+    if bench_var > 0:
+        beta = float(np.cov(port, bench, ddof=1)[0, 1] / bench_var)
+        result['beta'] = beta
+        result['alpha'] = float((np.mean(port) - beta * np.mean(bench)) * periods_per_year * 100)
+        if np.std(port) > 0:
+            result['correlation'] = float(np.corrcoef(port, bench)[0, 1])
+    result['tracking_error'] = float(tracking * np.sqrt(periods_per_year) * 100)
+    if tracking > 0:
+        result['information_ratio'] = float(np.mean(active) / tracking * np.sqrt(periods_per_year))
+    return result
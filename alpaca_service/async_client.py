@@ -0,0 +1,99 @@
+"""
+Awaitable Alpaca trading client for code running on an asyncio event loop
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from alpaca.trading.client import TradingClient
+
+logger = logging.getLogger(__name__)
+
+# Alpaca allows 200 trading API requests per minute per account
+DEFAULT_REQUESTS_PER_MINUTE = 200
+
+
+class AsyncRateLimiter:
+    """Token bucket limiting how many requests start per time window"""
+
+    def __init__(self, rate: int, per: float = 60.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+
+class AsyncTradingClient:
+    """
+    Async adapter over alpaca-py's TradingClient
+
+    Each call runs on a dedicated bounded thread pool (so Alpaca requests never block the
+    event loop or compete with other executor work) after passing a shared rate limiter.
+    Independent calls can be awaited concurrently with asyncio.gather.
+    """
+
+    def __init__(self, trading_client: TradingClient, max_workers: int = 8,
+                 requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE):
+        self.trading_client = trading_client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='alpaca')
+        self._rate_limiter = AsyncRateLimiter(requests_per_minute)
+
+    async def _call(self, method, *args, **kwargs):
+        await self._rate_limiter.acquire()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def get_account(self):
+        """Get account details"""
+        return await self._call(self.trading_client.get_account)
+
+    async def get_clock(self):
+        """Get the market clock"""
+        return await self._call(self.trading_client.get_clock)
+
+    async def get_open_position(self, symbol: str):
+        """Get the open position for a symbol (raises if there is none)"""
+        return await self._call(self.trading_client.get_open_position, symbol)
+
+    async def get_all_positions(self):
+        """Get all open positions"""
+        return await self._call(self.trading_client.get_all_positions)
+
+    async def submit_order(self, order_data):
+        """Submit an order request"""
+        return await self._call(self.trading_client.submit_order, order_data)
+
+    async def get_order_by_id(self, order_id):
+        """Get an order by its Alpaca id"""
+        return await self._call(self.trading_client.get_order_by_id, order_id)
+
+    async def get_order_by_client_id(self, client_order_id: str):
+        """Get an order by its client order id"""
+        return await self._call(self.trading_client.get_order_by_client_id, client_order_id)
+
+    async def get_orders(self, filter=None):
+        """Get orders matching an optional GetOrdersRequest"""
+        return await self._call(self.trading_client.get_orders, filter=filter)
+
+    async def close_position(self, symbol: str):
+        """Liquidate the position for a symbol"""
+        return await self._call(self.trading_client.close_position, symbol)
+
+    def shutdown(self):
+        """Stop the worker threads once in-flight requests finish"""
+        self._executor.shutdown(wait=False)
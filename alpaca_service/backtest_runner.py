@@ -0,0 +1,111 @@
+"""
+Per-symbol backtests run in parallel worker processes, with results streamed as they finish
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+try:
+    from alpaca_service.backtest_store import BacktestStore
+except ImportError:
+    # The Telegram bot runs from inside alpaca_service/ and imports its modules directly
+    from backtest_store import BacktestStore
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # Workers only ever render to PNG buffers
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+def run_symbol_backtest(symbol: str, days: int, store_root: Optional[str] = None) -> Dict:
+    """
+    Run one symbol's backtest and render its plot (executed in a worker process)
+
+    Args:
+        symbol: Symbol to backtest
+        days: Days of history to simulate
+        store_root: BacktestStore directory to save the full result in, if any
+
+    Returns:
+        dict: {'symbol', 'stats', 'plot' (PNG bytes), 'run_id', 'error'}
+    """
+    # Imported here so the runner can be imported where the strategy modules are not on the path
+    from backtest_individual import run_backtest, create_backtest_plot
+
+    try:
+        result = run_backtest(symbol, days)
+        buf, stats = create_backtest_plot(result)
+        run_id = None
+        if store_root:
+            # The full result stays in the worker; only its run id is sent back
+            try:
+                run_id = BacktestStore(store_root).save('symbol', result, parameters={'symbol': symbol, 'days': days},
+                                                        metrics=stats)
+            except Exception as e:
+                logger.error(f"Error saving backtest run for {symbol}: {str(e)}")
+        return {'symbol': symbol, 'stats': stats, 'plot': buf.getvalue(), 'run_id': run_id, 'error': None}
+    except Exception as e:
+        # Only plain values cross the process boundary
+        return {'symbol': symbol, 'stats': None, 'plot': None, 'run_id': None, 'error': str(e)}
+
+
+class BacktestRunner:
+    """
+    Spreads per-symbol backtests across a process pool
+
+    The pool is started on first use and kept for later commands, so an all-symbols
+    backtest takes about as long as its slowest symbol instead of the sum of all of them.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, store_root: Optional[str] = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.store_root = store_root  # Where each symbol's full result is saved (BacktestStore)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the event loop or client threads of the caller
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    async def stream(self, symbols: List[str], days: int) -> AsyncIterator[Dict]:
+        """
+        Run backtests for all symbols concurrently, yielding each result as soon as it is ready
+
+        Yields:
+            dict: run_symbol_backtest() results, in completion order
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        tasks = [loop.run_in_executor(executor, run_symbol_backtest, symbol, days, self.store_root) for symbol in symbols]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop waiting on the rest if the consumer gives up early
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, symbols: List[str], days: int) -> Dict[str, Dict]:
+        """Run backtests for all symbols and return the results keyed by symbol"""
+        return {result['symbol']: result async for result in self.stream(symbols, days)}
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
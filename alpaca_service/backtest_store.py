@@ -0,0 +1,158 @@
+"""
+Per-run backtest artifacts stored as compressed Parquet tables with JSON metadata
+"""
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = 'metadata.json'
+PARQUET_COMPRESSION = 'zstd'
+
+
+def _tables(result: Any) -> Dict[str, pd.DataFrame]:
+    """DataFrames (and Series) found at the top level of a backtest result"""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        result = {'data': result}
+    if not isinstance(result, dict):
+        return {}
+    tables = {}
+    for name, value in result.items():
+        if isinstance(value, pd.Series):
+            value = value.to_frame(name=str(value.name or name))
+        if isinstance(value, pd.DataFrame):
+            tables[str(name)] = value
+    return tables
+
+
+def _json_safe(value: Any) -> Any:
+    """Metadata values that survive a JSON round trip (tables are stored separately)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return None
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items() if not isinstance(v, (pd.DataFrame, pd.Series))}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if hasattr(value, 'item'):  # NumPy scalars
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class BacktestStore:
+    """
+    Backtest runs saved under <root>/<run_id>/, one Parquet file per table plus metadata.json
+
+    Run ids start with a UTC timestamp and end with a random suffix, so concurrent runs never
+    share a directory and listing them by name orders them by time. A run directory is
+    written under a temporary name and renamed into place, so loaders never see a partial run.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, kind: str, result: Any, parameters: Optional[Dict] = None,
+             metrics: Optional[Dict] = None) -> str:
+        """
+        Save a backtest result as a new run
+
+        Args:
+            kind: Kind of backtest, e.g. 'portfolio' or 'symbol'
+            result: Backtest result; top-level DataFrames/Series become Parquet tables
+            parameters: Inputs of the run (symbols, days, ...)
+            metrics: Summary metrics (defaults to result['metrics'] when present)
+
+        Returns:
+            str: The new run id
+        """
+        created_at = datetime.now(timezone.utc)
+        run_id = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{kind}-{uuid.uuid4().hex[:8]}"
+        if metrics is None and isinstance(result, dict):
+            metrics = result.get('metrics')
+
+        tables = _tables(result)
+        temp_dir = os.path.join(self.root, f".{run_id}.tmp")
+        os.makedirs(temp_dir)
+        try:
+            for name, table in tables.items():
+                table = table.copy(deep=False)
+                table.columns = [str(column) for column in table.columns]
+                table.to_parquet(os.path.join(temp_dir, f"{name}.parquet"), compression=PARQUET_COMPRESSION)
+
+            metadata = {
+                'run_id': run_id,
+                'kind': kind,
+                'created_at': created_at.isoformat(),
+                'parameters': _json_safe(parameters or {}),
+                'metrics': _json_safe(metrics or {}),
+                'tables': {name: {'rows': len(table), 'columns': [str(c) for c in table.columns]}
+                           for name, table in tables.items()}
+            }
+            with open(os.path.join(temp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(temp_dir, os.path.join(self.root, run_id))
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Saved {kind} backtest run {run_id} ({len(tables)} tables)")
+        return run_id
+
+    def _run_dir(self, run_id: str) -> str:
+        path = os.path.join(self.root, os.path.basename(run_id))
+        if not os.path.isfile(os.path.join(path, METADATA_FILE)):
+            raise KeyError(f"Unknown backtest run: {run_id}")
+        return path
+
+    def metadata(self, run_id: str) -> Dict:
+        """Metadata of a run (parameters, metrics and table shapes), without loading its tables"""
+        with open(os.path.join(self._run_dir(run_id), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def list_runs(self, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Metadata of saved runs, newest first"""
+        runs = []
+        for name in sorted(os.listdir(self.root), reverse=True):
+            if name.startswith('.') or (kind and f"-{kind}-" not in name):
+                continue
+            try:
+                runs.append(self.metadata(name))
+            except (KeyError, OSError, ValueError):
+                continue
+            if limit and len(runs) >= limit:
+                break
+        return runs
+
+    def load_table(self, run_id: str, name: str = 'data', columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load one table of a run (optionally only some columns)"""
+        path = os.path.join(self._run_dir(run_id), f"{name}.parquet")
+        if not os.path.exists(path):
+            raise KeyError(f"Run {run_id} has no table {name}")
+        return pd.read_parquet(path, columns=columns)
+
+    def load(self, run_id: str) -> Dict:
+        """
+        Load a run
+
+        Returns:
+            dict: {'metadata': ..., 'tables': {name: DataFrame}}
+        """
+        metadata = self.metadata(run_id)
+        return {
+            'metadata': metadata,
+            'tables': {name: self.load_table(run_id, name) for name in metadata['tables']}
+        }
+
+    def delete(self, run_id: str):
+        """Delete a run"""
+        shutil.rmtree(self._run_dir(run_id))
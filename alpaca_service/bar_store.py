@@ -0,0 +1,269 @@
+"""
+Memory-mapped historical bar store shared by backtests, plots and live analysis
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; appends are then only serialized per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# One fixed-width record per bar; timestamps are epoch seconds (UTC)
+BAR_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8')
+])
+
+_INTERVAL_PATTERN = re.compile(r'^(\d+)\s*(m|min|h|d|wk|w|mo)$', re.IGNORECASE)
+
+BarFetcher = Callable[[str, str, datetime], Iterable]
+
+
+def to_records(bars) -> np.ndarray:
+    """
+    Convert bars into a BAR_DTYPE array sorted by timestamp
+
+    Accepts a BAR_DTYPE array, a DataFrame with a DatetimeIndex (or a 'timestamp' column)
+    and open/high/low/close/volume columns, or an iterable of bar dicts/objects.
+    """
+    if isinstance(bars, np.ndarray) and bars.dtype == BAR_DTYPE:
+        records = bars
+    elif isinstance(bars, pd.DataFrame):
+        frame = bars.rename(columns=str.lower)
+        times = pd.DatetimeIndex(frame['timestamp'] if 'timestamp' in frame else frame.index)
+        if times.tz is None:
+            times = times.tz_localize('UTC')
+        records = np.empty(len(frame), dtype=BAR_DTYPE)
+        records['timestamp'] = times.asi8 // 10**9
+        for field in BAR_DTYPE.names[1:]:
+            records[field] = frame[field].to_numpy(dtype=float)
+    else:
+        rows = []
+        for bar in bars:
+            get = bar.get if isinstance(bar, dict) else lambda field: getattr(bar, field)
+            ts = get('timestamp')
+            if isinstance(ts, datetime):
+                ts = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+            rows.append((int(ts), *(float(get(field)) for field in BAR_DTYPE.names[1:])))
+        records = np.array(rows, dtype=BAR_DTYPE)
+    return np.sort(records, order='timestamp', kind='stable')
+
+
+def to_frame(records: np.ndarray) -> pd.DataFrame:
+    """Copy bar records into a DataFrame indexed by UTC timestamp"""
+    index = pd.to_datetime(np.asarray(records['timestamp']), unit='s', utc=True)
+    return pd.DataFrame({field: np.asarray(records[field]) for field in BAR_DTYPE.names[1:]}, index=index)
+
+
+def interval_seconds(interval: str) -> int:
+    """Length of an interval such as '5m', '1h', '1d' or '1wk' in seconds"""
+    match = _INTERVAL_PATTERN.match(interval.strip())
+    if not match:
+        raise ValueError(f"Invalid interval: {interval}")
+    unit = match.group(2).lower()
+    seconds = {'m': 60, 'min': 60, 'h': 3600, 'd': 86400, 'wk': 604800, 'w': 604800, 'mo': 2592000}[unit]
+    return int(match.group(1)) * seconds
+
+
+def alpaca_bar_fetcher(data_client) -> BarFetcher:
+    """Bar fetcher backed by an alpaca-py StockHistoricalDataClient or CryptoHistoricalDataClient"""
+    from alpaca.data.requests import CryptoBarsRequest, StockBarsRequest
+    from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+
+    units = {60: TimeFrameUnit.Minute, 3600: TimeFrameUnit.Hour, 86400: TimeFrameUnit.Day,
+             604800: TimeFrameUnit.Week, 2592000: TimeFrameUnit.Month}
+    crypto = hasattr(data_client, 'get_crypto_bars')
+
+    def fetch(symbol: str, interval: str, start: datetime):
+        seconds = interval_seconds(interval)
+        unit_seconds = max(s for s in units if seconds % s == 0)
+        timeframe = TimeFrame(seconds // unit_seconds, units[unit_seconds])
+        if crypto:
+            bar_set = data_client.get_crypto_bars(CryptoBarsRequest(symbol_or_symbols=symbol, timeframe=timeframe, start=start))
+        else:
+            bar_set = data_client.get_stock_bars(StockBarsRequest(symbol_or_symbols=symbol, timeframe=timeframe, start=start))
+        return bar_set.data.get(symbol, [])
+
+    return fetch
+
+
+class BarStore:
+    """
+    Append-only bar files, one per (symbol, interval), read through memory maps
+
+    Reads return read-only views of the mapped file, so every consumer in every process
+    shares the same pages instead of holding its own copy. Appends only add bars newer
+    than the last stored one (a bar with the last timestamp replaces it), so a dataset is
+    downloaded once and then extended incrementally.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._maps: Dict[tuple, tuple] = {}  # key -> (file size, memmap)
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+        return os.path.join(self.root, f"{safe_symbol}_{interval}.bars")
+
+    def _key_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def read(self, symbol: str, interval: str, start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> np.ndarray:
+        """
+        Stored bars between two datetimes (inclusive), as a zero-copy view
+
+        Returns:
+            np.ndarray: Read-only BAR_DTYPE records sorted by timestamp
+        """
+        key = (symbol.upper(), interval)
+        path = self.path(symbol, interval)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        size -= size % BAR_DTYPE.itemsize  # Ignore a record still being written
+        if size == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        cached = self._maps.get(key)
+        if cached is None or cached[0] != size:
+            cached = (size, np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(size // BAR_DTYPE.itemsize,)))
+            self._maps[key] = cached
+        records = cached[1]
+
+        timestamps = records['timestamp']
+        lo = np.searchsorted(timestamps, int(start.timestamp()), 'left') if start else 0
+        hi = np.searchsorted(timestamps, int(end.timestamp()), 'right') if end else len(records)
+        return records[lo:hi]
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Epoch timestamp of the newest stored bar, if any"""
+        records = self.read(symbol, interval)
+        return int(records['timestamp'][-1]) if len(records) else None
+
+    def append(self, symbol: str, interval: str, bars) -> int:
+        """
+        Append bars newer than the stored ones
+
+        Returns:
+            int: Number of bars written (including a replaced last bar)
+        """
+        records = to_records(bars)
+        if len(records) == 0:
+            return 0
+        key = (symbol.upper(), interval)
+        path = self.path(symbol, interval)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._key_lock(key), os.fdopen(fd, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                size = f.seek(0, os.SEEK_END)
+                if size % BAR_DTYPE.itemsize:
+                    # Drop a record left half-written by an interrupted append
+                    size -= size % BAR_DTYPE.itemsize
+                    f.truncate(size)
+                last_ts = None
+                if size:
+                    f.seek(size - BAR_DTYPE.itemsize)
+                    last_ts = int(np.frombuffer(f.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)['timestamp'][0])
+
+                write_at = size
+                if last_ts is not None:
+                    records = records[records['timestamp'] >= last_ts]
+                    if len(records) and records['timestamp'][0] == last_ts:
+                        # The stored last bar may have been incomplete: overwrite it in place
+                        write_at -= BAR_DTYPE.itemsize
+                if len(records) == 0:
+                    return 0
+                # Keep one record per timestamp (the latest version of each bar)
+                keep = np.append(records['timestamp'][1:] != records['timestamp'][:-1], True)
+                records = records[keep]
+                f.seek(write_at)
+                f.write(records.tobytes())
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return len(records)
+
+    def _coverage_path(self, symbol: str, interval: str) -> str:
+        return self.path(symbol, interval) + '.json'
+
+    def _covered_from(self, symbol: str, interval: str) -> Optional[float]:
+        """Earliest time the stored dataset was fetched from (bars may start later, e.g. on weekends)"""
+        try:
+            with open(self._coverage_path(symbol, interval)) as f:
+                return json.load(f)['start']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def update(self, symbol: str, interval: str, fetcher: BarFetcher, lookback: timedelta) -> np.ndarray:
+        """
+        Bring a dataset up to date and return at least `lookback` of history
+
+        Only bars after the newest stored one are fetched. When the dataset doesn't reach back
+        far enough (or doesn't exist), the whole window is fetched and the file is replaced.
+        """
+        window_start = datetime.now(timezone.utc) - lookback
+        stored = self.read(symbol, interval)
+        covered_from = self._covered_from(symbol, interval)
+        if len(stored) and covered_from is not None and covered_from <= window_start.timestamp():
+            bars = fetcher(symbol, interval, datetime.fromtimestamp(int(stored['timestamp'][-1]), timezone.utc))
+            written = self.append(symbol, interval, bars)
+        else:
+            bars = to_records(fetcher(symbol, interval, window_start))
+            written = self.replace(symbol, interval, bars, window_start)
+        logger.debug(f"Stored {written} new {interval} bars for {symbol}")
+        return self.read(symbol, interval, start=window_start)
+
+    def replace(self, symbol: str, interval: str, bars, covered_from: datetime) -> int:
+        """
+        Replace a dataset with a fetched window of bars
+
+        The file is swapped atomically, so readers holding the old mapping keep a consistent view.
+        """
+        records = to_records(bars)
+        if len(records):
+            keep = np.append(records['timestamp'][1:] != records['timestamp'][:-1], True)
+            records = records[keep]
+        key = (symbol.upper(), interval)
+        path = self.path(symbol, interval)
+        with self._key_lock(key):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(records.tobytes())
+            os.replace(temp_path, path)
+            with open(temp_path, 'w') as f:
+                json.dump({'start': covered_from.timestamp()}, f)
+            os.replace(temp_path, self._coverage_path(symbol, interval))
+            self._maps.pop(key, None)
+        return len(records)
+
+    def clear(self, symbol: str, interval: str):
+        """Delete a stored dataset"""
+        key = (symbol.upper(), interval)
+        with self._key_lock(key):
+            self._maps.pop(key, None)
+            for path in (self.path(symbol, interval), self._coverage_path(symbol, interval)):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,368 @@
+"""
+Technical indicators (SMA, EMA, RSI, MACD, Bollinger Bands): vectorized over NumPy arrays,
+or updated incrementally per bar with IndicatorState
+"""
+
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+try:
+    from alpaca_service.analytics import to_array
+except ImportError:
+    # The Telegram bot runs from inside alpaca_service/ and imports its modules directly
+    from analytics import to_array
+
+# Largest growth of the scaling weights inside one filter block; bounds the
+# relative rounding error of the blockwise recursion to roughly 1e-10
+_MAX_BLOCK_SCALE = 1e6
+
+
+def recursive_filter(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    Vectorized y[t] = alpha * x[t] + (1 - alpha) * y[t-1], starting from y[-1] = initial
+
+    The recursion is solved in closed form per block:
+    y[s+j] = d^(j+1) * y[s-1] + alpha * d^j * sum_{i<=j} x[s+i] / d^i  with d = 1 - alpha.
+    Blocks are kept short enough that the 1 / d^i weights stay numerically well-scaled.
+    """
+    x = to_array(values)
+    out = np.empty_like(x)
+    if x.size == 0:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = x
+        return out
+    block = max(1, int(np.log(_MAX_BLOCK_SCALE) / -np.log(decay)))
+    steps = np.arange(block)
+    powers = decay ** steps            # d^j
+    inverse_powers = decay ** -steps   # 1 / d^i
+
+    previous = float(initial)
+    for start in range(0, x.size, block):
+        chunk = x[start:start + block]
+        n = chunk.size
+        weighted = np.cumsum(chunk * inverse_powers[:n])
+        out[start:start + n] = powers[:n] * (decay * previous + alpha * weighted)
+        previous = out[start + n - 1]
+    return out
+
+
+def sma(values: Sequence, window: int) -> np.ndarray:
+    """Simple moving average (NaN until a full window is available)"""
+    x = to_array(values)
+    out = np.full(x.shape, np.nan)
+    if window < 1 or x.size < window:
+        return out
+    sums = np.cumsum(np.concatenate(([0.0], x)))
+    out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def ema(values: Sequence, span: int) -> np.ndarray:
+    """Exponential moving average seeded with the first value (pandas ewm(span, adjust=False))"""
+    x = to_array(values)
+    out = np.empty_like(x)
+    if x.size == 0:
+        return out
+    out[0] = x[0]
+    out[1:] = recursive_filter(x[1:], 2.0 / (span + 1), x[0])
+    return out
+
+
+def rolling_std(values: Sequence, window: int, ddof: int = 0) -> np.ndarray:
+    """Rolling standard deviation (NaN until a full window is available)"""
+    x = to_array(values)
+    out = np.full(x.shape, np.nan)
+    if window <= ddof or x.size < window:
+        return out
+    # Center on the mean to limit cancellation in the sum of squares
+    centered = x - np.mean(x)
+    padded = np.concatenate(([0.0], centered))
+    sums = np.cumsum(padded)
+    squares = np.cumsum(padded ** 2)
+    window_sum = sums[window:] - sums[:-window]
+    window_sq = squares[window:] - squares[:-window]
+    variance = (window_sq - window_sum ** 2 / window) / (window - ddof)
+    out[window - 1:] = np.sqrt(np.clip(variance, 0, None))
+    return out
+
+
+def rsi(values: Sequence, period: int = 14) -> np.ndarray:
+    """Relative Strength Index with Wilder's smoothing (NaN for the first `period` values)"""
+    x = to_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.size <= period:
+        return out
+
+    change = np.diff(x)
+    gains = np.clip(change, 0, None)
+    losses = np.clip(-change, 0, None)
+
+    # Wilder's averages start from a simple mean, then smooth with alpha = 1 / period
+    alpha = 1.0 / period
+    avg_gain = np.empty(x.size - period)
+    avg_loss = np.empty(x.size - period)
+    avg_gain[0] = gains[:period].mean()
+    avg_loss[0] = losses[:period].mean()
+    avg_gain[1:] = recursive_filter(gains[period:], alpha, avg_gain[0])
+    avg_loss[1:] = recursive_filter(losses[period:], alpha, avg_loss[0])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        out[period:] = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100 - 100 / (1 + rs))
+    return out
+
+
+def macd(values: Sequence, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    x = to_array(values)
+    macd_line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(macd_line, signal)
+    return {'macd': macd_line, 'signal': signal_line, 'histogram': macd_line - signal_line}
+
+
+def bollinger_bands(values: Sequence, window: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger Bands around a simple moving average"""
+    middle = sma(values, window)
+    width = num_std * rolling_std(values, window)
+    return {'upper': middle + width, 'middle': middle, 'lower': middle - width}
+
+
+def _last(series: np.ndarray) -> Optional[float]:
+    """Latest value of a series, None when it is not defined yet"""
+    if series.size == 0 or not np.isfinite(series[-1]):
+        return None
+    return float(series[-1])
+
+
+def compute_indicators(close: Sequence) -> Dict:
+    """
+    Latest indicator values for a close price series
+
+    Args:
+        close: Close prices, oldest first
+
+    Returns:
+        dict: Latest SMA/EMA/RSI/MACD/Bollinger values (None where there is not enough data)
+    """
+    x = to_array(close)
+    x = x[np.isfinite(x)]
+    if x.size == 0:
+        return {}
+
+    macd_series = macd(x)
+    bands = bollinger_bands(x)
+    enough_for_macd = x.size >= 26
+    return {
+        'price': float(x[-1]),
+        'sma_20': _last(sma(x, 20)),
+        'sma_50': _last(sma(x, 50)),
+        'sma_200': _last(sma(x, 200)),
+        'ema_12': _last(ema(x, 12)) if x.size >= 12 else None,
+        'ema_26': _last(ema(x, 26)) if enough_for_macd else None,
+        'rsi_14': _last(rsi(x, 14)),
+        'macd': {
+            'macd': _last(macd_series['macd']),
+            'signal': _last(macd_series['signal']),
+            'histogram': _last(macd_series['histogram'])
+        } if enough_for_macd else None,
+        'bollinger': {
+            'upper': _last(bands['upper']),
+            'middle': _last(bands['middle']),
+            'lower': _last(bands['lower'])
+        } if x.size >= 20 else None
+    }
+
+
+class IndicatorState:
+    """
+    Incremental SMA/EMA/RSI/MACD/Bollinger state for one bar series
+
+    update() folds in one close in O(1): rolling sums over a ring buffer for the SMAs and
+    Bollinger Bands, and the EMA/MACD/Wilder recursions. values() returns the same dict as
+    compute_indicators() over the same closes. A bar with the same timestamp as the last one
+    replaces it (for bars that are still forming). snapshot()/restore() round-trip the state
+    through plain Python values.
+    """
+
+    SMA_WINDOWS = (20, 50, 200)
+    BOLLINGER_WINDOW = 20
+    BOLLINGER_STD = 2.0
+    EMA_FAST = 12
+    EMA_SLOW = 26
+    SIGNAL = 9
+    RSI_PERIOD = 14
+    # Rolling sums are recomputed from the buffer this often to stop rounding drift
+    RESYNC_INTERVAL = 1024
+
+    _CAPACITY = max(SMA_WINDOWS) + 1
+    _SCALARS = ('count', 'timestamp', 'anchor', 'sums', 'sum_squares', 'ema_fast', 'ema_slow',
+                'signal', 'prev_close', 'avg_gain', 'avg_loss')
+
+    def __init__(self):
+        self._closes = [0.0] * self._CAPACITY
+        self.count = 0
+        self.timestamp = None
+        self.anchor = 0.0  # Sums are taken over close - anchor to limit cancellation
+        self.sums = {window: 0.0 for window in self.SMA_WINDOWS}
+        self.sum_squares = 0.0  # Over the Bollinger window
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        self.prev_close = None
+        self.avg_gain = 0.0  # Plain sums until RSI_PERIOD changes are seen, then Wilder averages
+        self.avg_loss = 0.0
+        self._undo = None
+
+    @classmethod
+    def from_closes(cls, closes: Sequence, timestamps: Optional[Sequence] = None) -> 'IndicatorState':
+        """Build a state by folding in a close series, oldest first"""
+        state = cls()
+        for i, close in enumerate(closes):
+            state.update(close, timestamps[i] if timestamps is not None else None)
+        return state
+
+    def _ago(self, k: int) -> float:
+        """Close k bars before the latest one"""
+        return self._closes[(self.count - 1 - k) % self._CAPACITY]
+
+    def _scalars(self) -> Dict:
+        state = {name: getattr(self, name) for name in self._SCALARS}
+        state['sums'] = dict(self.sums)
+        return state
+
+    def _set_scalars(self, state: Dict):
+        for name in self._SCALARS:
+            setattr(self, name, state[name])
+        self.sums = {int(window): value for window, value in state['sums'].items()}
+
+    def update(self, close: float, timestamp=None):
+        """
+        Fold in the close of a new bar
+
+        Args:
+            close: Bar close price
+            timestamp: Bar timestamp; a bar with the last bar's timestamp replaces it
+        """
+        close = float(close)
+        if not np.isfinite(close):
+            return
+        if timestamp is not None and timestamp == self.timestamp and self._undo is not None:
+            # Replacing the latest bar: only its slot in the buffer changed, the rest is restored
+            self._set_scalars(self._undo)
+        self._undo = self._scalars()
+
+        if self.count == 0:
+            self.anchor = close
+        self._closes[self.count % self._CAPACITY] = close
+        self.count += 1
+        self.timestamp = timestamp
+
+        value = close - self.anchor
+        if self.count % self.RESYNC_INTERVAL == 0:
+            self._resync()
+        else:
+            for window in self.SMA_WINDOWS:
+                self.sums[window] += value
+                if self.count > window:
+                    self.sums[window] -= self._ago(window) - self.anchor
+            self.sum_squares += value ** 2
+            if self.count > self.BOLLINGER_WINDOW:
+                self.sum_squares -= (self._ago(self.BOLLINGER_WINDOW) - self.anchor) ** 2
+
+        if self.ema_fast is None:
+            self.ema_fast = self.ema_slow = close
+        else:
+            self.ema_fast += 2.0 / (self.EMA_FAST + 1) * (close - self.ema_fast)
+            self.ema_slow += 2.0 / (self.EMA_SLOW + 1) * (close - self.ema_slow)
+        line = self.ema_fast - self.ema_slow
+        self.signal = line if self.signal is None else self.signal + 2.0 / (self.SIGNAL + 1) * (line - self.signal)
+
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            changes = self.count - 1
+            if changes < self.RSI_PERIOD:
+                self.avg_gain += gain
+                self.avg_loss += loss
+            elif changes == self.RSI_PERIOD:
+                self.avg_gain = (self.avg_gain + gain) / self.RSI_PERIOD
+                self.avg_loss = (self.avg_loss + loss) / self.RSI_PERIOD
+            else:
+                self.avg_gain += (gain - self.avg_gain) / self.RSI_PERIOD
+                self.avg_loss += (loss - self.avg_loss) / self.RSI_PERIOD
+        self.prev_close = close
+
+    def _resync(self):
+        """Recompute the rolling sums exactly from the buffer"""
+        for window in self.SMA_WINDOWS:
+            n = min(window, self.count)
+            self.sums[window] = sum(self._ago(k) - self.anchor for k in range(n))
+        n = min(self.BOLLINGER_WINDOW, self.count)
+        self.sum_squares = sum((self._ago(k) - self.anchor) ** 2 for k in range(n))
+
+    def _sma(self, window: int) -> Optional[float]:
+        if self.count < window:
+            return None
+        return self.anchor + self.sums[window] / window
+
+    def values(self) -> Dict:
+        """Latest indicator values in the same shape as compute_indicators()"""
+        if self.count == 0:
+            return {}
+
+        rsi_value = None
+        if self.count > self.RSI_PERIOD:
+            if self.avg_loss == 0:
+                rsi_value = 50.0 if self.avg_gain == 0 else 100.0
+            else:
+                rsi_value = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+        bollinger = None
+        if self.count >= self.BOLLINGER_WINDOW:
+            n = self.BOLLINGER_WINDOW
+            middle = self._sma(n)
+            variance = max((self.sum_squares - self.sums[n] ** 2 / n) / n, 0.0)
+            width = self.BOLLINGER_STD * float(np.sqrt(variance))
+            bollinger = {'upper': middle + width, 'middle': middle, 'lower': middle - width}
+
+        enough_for_macd = self.count >= self.EMA_SLOW
+        line = self.ema_fast - self.ema_slow
+        return {
+            'price': self._ago(0),
+            'sma_20': self._sma(20),
+            'sma_50': self._sma(50),
+            'sma_200': self._sma(200),
+            'ema_12': self.ema_fast if self.count >= self.EMA_FAST else None,
+            'ema_26': self.ema_slow if enough_for_macd else None,
+            'rsi_14': rsi_value,
+            'macd': {
+                'macd': line,
+                'signal': self.signal,
+                'histogram': line - self.signal
+            } if enough_for_macd else None,
+            'bollinger': bollinger
+        }
+
+    def snapshot(self) -> Dict:
+        """State as plain Python values (e.g. to persist across restarts)"""
+        retained = min(self.count, self._CAPACITY)
+        state = self._scalars()
+        state['closes'] = [self._ago(k) for k in range(retained - 1, -1, -1)]
+        # Lets a restored state still revise its latest bar
+        state['undo'] = self._undo
+        return state
+
+    @classmethod
+    def restore(cls, snapshot: Dict) -> 'IndicatorState':
+        """Rebuild a state from snapshot()"""
+        state = cls()
+        state._set_scalars(snapshot)
+        closes = snapshot['closes']
+        first = state.count - len(closes)
+        for i, close in enumerate(closes):
+            state._closes[(first + i) % cls._CAPACITY] = close
+        state._undo = snapshot.get('undo')
+        return state
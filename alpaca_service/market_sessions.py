@@ -0,0 +1,230 @@
+"""
+In-memory market session index answering open/close queries without network calls
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import pytz
+from alpaca.trading.requests import GetCalendarRequest
+
+logger = logging.getLogger(__name__)
+
+# Alpaca's calendar reports US exchange sessions in New York time
+CALENDAR_TIMEZONE = 'America/New_York'
+# Seconds to wait before retrying a failed calendar load
+CALENDAR_RETRY_SECONDS = 300
+
+CalendarLoader = Callable[[date, date], Iterable[Tuple[datetime, datetime]]]
+
+
+def alpaca_calendar_loader(trading_client) -> CalendarLoader:
+    """Calendar loader returning (open, close) session times from an alpaca-py TradingClient"""
+    def load(start: date, end: date):
+        days = trading_client.get_calendar(GetCalendarRequest(start=start, end=end))
+        return [(day.open, day.close) for day in days]
+    return load
+
+
+class MarketSessions:
+    """
+    Session index per market, rebuilt once per day
+
+    Each market is a sorted list of (open, close) epoch intervals covering a window around
+    today, so is_open/next_open/next_close are a bisect away. Markets flagged use_calendar
+    take their trading days and early closes from the exchange calendar (clipped to the
+    configured hours); other markets trade their configured hours on weekdays, and
+    markets configured 00:00-23:59 are always open.
+    """
+
+    def __init__(self, calendar_loader: Optional[CalendarLoader] = None,
+                 lookback_days: int = 7, lookahead_days: int = 60):
+        self.calendar_loader = calendar_loader
+        self.lookback_days = lookback_days
+        self.lookahead_days = lookahead_days
+        self._markets: Dict[str, Dict] = {}
+        self._loaded_for: Optional[date] = None
+        self._retry_at = 0.0
+        self._window: Tuple[Optional[date], Optional[date]] = (None, None)
+        self._lock = threading.Lock()
+
+    def add_market(self, name: str, start: str = '09:30', end: str = '16:00',
+                   timezone: str = CALENDAR_TIMEZONE, use_calendar: bool = False):
+        """
+        Register a market's regular hours
+
+        Args:
+            name: Market key used in queries
+            start: Session start ('%H:%M', market local time)
+            end: Session end ('%H:%M', market local time)
+            timezone: Market timezone name
+            use_calendar: Take trading days and early closes from the exchange calendar
+        """
+        with self._lock:
+            if name in self._markets:
+                return
+            self._markets[name] = {
+                'start': datetime.strptime(start, '%H:%M').time(),
+                'end': datetime.strptime(end, '%H:%M').time(),
+                'timezone': pytz.timezone(timezone),
+                'always_open': start == '00:00' and end == '23:59',
+                'use_calendar': use_calendar,
+                'index': ([], [])  # (session opens, session closes) as sorted epoch seconds
+            }
+            # Build the new market on the next query
+            self._loaded_for = None
+
+    def has_market(self, name: str) -> bool:
+        return name in self._markets
+
+    def refresh(self):
+        """Rebuild every market's index now (e.g. to load the calendar off the event loop)"""
+        now = time.time()
+        with self._lock:
+            self._rebuild(datetime.utcfromtimestamp(now).date(), now)
+
+    def _is_stale(self, today: date, now: float) -> bool:
+        return self._loaded_for != today or bool(self._retry_at and now >= self._retry_at)
+
+    def _ensure_current(self, now: float):
+        today = datetime.utcfromtimestamp(now).date()
+        if not self._is_stale(today, now):
+            return
+        with self._lock:
+            if self._is_stale(today, now):
+                self._rebuild(today, now)
+
+    def _rebuild(self, today: date, now: float):
+        first_day = today - timedelta(days=self.lookback_days)
+        last_day = today + timedelta(days=self.lookahead_days)
+
+        calendar = None
+        wants_calendar = self.calendar_loader is not None and any(m['use_calendar'] for m in self._markets.values())
+        if wants_calendar:
+            try:
+                calendar = list(self.calendar_loader(first_day, last_day))
+            except Exception as e:
+                logger.error(f"Error loading market calendar, using weekday sessions: {str(e)}")
+
+        for market in self._markets.values():
+            if market['always_open']:
+                continue
+            if market['use_calendar'] and calendar is not None:
+                sessions = self._calendar_sessions(market, calendar)
+            else:
+                sessions = self._weekday_sessions(market, first_day, last_day)
+            sessions.sort()
+            # Swap the whole index at once so concurrent readers never see mismatched lists
+            market['index'] = ([open_ts for open_ts, _ in sessions], [close_ts for _, close_ts in sessions])
+
+        self._window = (first_day, last_day)
+        self._loaded_for = today
+        # A failed calendar load is retried later instead of waiting for tomorrow
+        self._retry_at = now + CALENDAR_RETRY_SECONDS if wants_calendar and calendar is None else 0.0
+
+    @staticmethod
+    def _session_bounds(market: Dict, day: date) -> Tuple[float, float]:
+        tz = market['timezone']
+        open_dt = tz.localize(datetime.combine(day, market['start']))
+        close_day = day if market['end'] > market['start'] else day + timedelta(days=1)
+        close_dt = tz.localize(datetime.combine(close_day, market['end']))
+        return open_dt.timestamp(), close_dt.timestamp()
+
+    def _weekday_sessions(self, market: Dict, first_day: date, last_day: date) -> List[Tuple[float, float]]:
+        sessions = []
+        day = first_day
+        while day <= last_day:
+            if day.weekday() < 5:  # Saturday = 5, Sunday = 6
+                sessions.append(self._session_bounds(market, day))
+            day += timedelta(days=1)
+        return sessions
+
+    def _calendar_sessions(self, market: Dict, calendar: List[Tuple[datetime, datetime]]) -> List[Tuple[float, float]]:
+        calendar_tz = pytz.timezone(CALENDAR_TIMEZONE)
+        sessions = []
+        for session_open, session_close in calendar:
+            if session_open.tzinfo is None:
+                session_open = calendar_tz.localize(session_open)
+                session_close = calendar_tz.localize(session_close)
+            configured_open, configured_close = self._session_bounds(
+                market, session_open.astimezone(market['timezone']).date()
+            )
+            open_ts = max(session_open.timestamp(), configured_open)
+            close_ts = min(session_close.timestamp(), configured_close)
+            if open_ts < close_ts:
+                sessions.append((open_ts, close_ts))
+        return sessions
+
+    def _lookup(self, name: str, at: Optional[datetime]) -> Tuple[Dict, float]:
+        market = self._markets.get(name)
+        if market is None:
+            raise KeyError(f"Unknown market: {name}")
+        self._ensure_current(time.time())
+        return market, at.timestamp() if at is not None else time.time()
+
+    def _to_datetime(self, market: Dict, ts: float) -> datetime:
+        return datetime.fromtimestamp(ts, market['timezone'])
+
+    def is_open(self, name: str, at: Optional[datetime] = None) -> bool:
+        """Whether the market is in session now (or at the given aware datetime)"""
+        market, now = self._lookup(name, at)
+        if market['always_open']:
+            return True
+        opens, closes = market['index']
+        i = bisect_right(opens, now) - 1
+        return i >= 0 and now < closes[i]
+
+    def next_open(self, name: str, at: Optional[datetime] = None) -> Optional[datetime]:
+        """Start of the next session after now (None if beyond the loaded window)"""
+        market, now = self._lookup(name, at)
+        if market['always_open']:
+            return self._to_datetime(market, now)
+        opens, _ = market['index']
+        i = bisect_right(opens, now)
+        return self._to_datetime(market, opens[i]) if i < len(opens) else None
+
+    def next_close(self, name: str, at: Optional[datetime] = None) -> Optional[datetime]:
+        """End of the current session, or of the next one if the market is closed"""
+        market, now = self._lookup(name, at)
+        if market['always_open']:
+            return None
+        _, closes = market['index']
+        i = bisect_right(closes, now)
+        return self._to_datetime(market, closes[i]) if i < len(closes) else None
+
+    def clock(self, name: str, at: Optional[datetime] = None) -> Dict:
+        """Market clock in the same shape as Alpaca's /v2/clock"""
+        market, now = self._lookup(name, at)
+        return {
+            'timestamp': self._to_datetime(market, now),
+            'is_open': self.is_open(name, at),
+            'next_open': self.next_open(name, at),
+            'next_close': self.next_close(name, at)
+        }
+
+    def sessions(self, name: str, start: date, end: date) -> Optional[List[Dict]]:
+        """
+        Sessions opening between two dates (inclusive)
+
+        Returns:
+            list: [{'date', 'open', 'close'}], or None if the range is outside the loaded window
+        """
+        market, _ = self._lookup(name, None)
+        first_day, last_day = self._window
+        if market['always_open'] or first_day is None or start < first_day or end > last_day:
+            return None
+
+        tz = market['timezone']
+        start_ts = tz.localize(datetime.combine(start, datetime.min.time())).timestamp()
+        end_ts = tz.localize(datetime.combine(end + timedelta(days=1), datetime.min.time())).timestamp()
+        opens, closes = market['index']
+        lo = bisect_left(opens, start_ts)
+        hi = bisect_left(opens, end_ts)
+        return [{
+            'date': self._to_datetime(market, opens[i]).date(),
+            'open': self._to_datetime(market, opens[i]),
+            'close': self._to_datetime(market, closes[i])
+        } for i in range(lo, hi)]
@@ -0,0 +1,151 @@
+"""
+Order lifecycle tracking from Alpaca's trade_updates websocket stream
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, Optional
+import websockets
+from alpaca.trading.models import TradeUpdate
+
+logger = logging.getLogger(__name__)
+
+TRADE_STREAM_URL_PAPER = 'wss://paper-api.alpaca.markets/stream'
+TRADE_STREAM_URL_LIVE = 'wss://api.alpaca.markets/stream'
+
+# Trade update events that settle what happened to a submitted order
+RESOLVING_EVENTS = frozenset({'fill', 'partial_fill', 'canceled', 'rejected', 'expired'})
+
+
+class OrderTracker:
+    """
+    Resolves per-order futures from the account's trade_updates stream
+
+    Register an order with track() before submitting it (using the same client_order_id),
+    then await wait_for() to receive its TradeUpdate as soon as Alpaca reports it.
+    The stream URL can be overridden, e.g. to point at a local test server.
+    """
+
+    def __init__(self, api_key: str, secret_key: str, paper: bool = True, url: Optional[str] = None,
+                 max_reconnect_delay: float = 30.0):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.url = url or (TRADE_STREAM_URL_PAPER if paper else TRADE_STREAM_URL_LIVE)
+        self.max_reconnect_delay = max_reconnect_delay
+        self._pending: Dict[str, tuple] = {}  # client_order_id -> (future, resolving events)
+        self._connected = asyncio.Event()
+        self._task = None
+
+    @property
+    def connected(self) -> bool:
+        """Whether the stream is currently authenticated and listening"""
+        return self._connected.is_set()
+
+    async def start(self, timeout: float = 10.0) -> bool:
+        """Start consuming the stream and wait (up to timeout) until it is listening"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Trade update stream not connected yet, order updates will fall back to polling")
+        return self.connected
+
+    async def stop(self):
+        """Stop the stream and cancel any pending waits"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._connected.clear()
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def track(self, client_order_id: str, events: Iterable[str] = RESOLVING_EVENTS) -> asyncio.Future:
+        """
+        Register interest in an order before it is submitted
+
+        Args:
+            client_order_id: Client order id the order will be submitted with
+            events: Trade update events that resolve the future
+
+        Returns:
+            asyncio.Future: Resolves to the order's TradeUpdate
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[client_order_id] = (future, frozenset(events))
+        return future
+
+    def untrack(self, client_order_id: str):
+        """Stop waiting for an order"""
+        entry = self._pending.pop(client_order_id, None)
+        if entry and not entry[0].done():
+            entry[0].cancel()
+
+    async def wait_for(self, client_order_id: str, timeout: float = 30.0) -> Optional[TradeUpdate]:
+        """
+        Wait for a tracked order to resolve
+
+        Returns:
+            TradeUpdate: The resolving update, or None if none arrived within the timeout
+        """
+        entry = self._pending.get(client_order_id)
+        if entry is None:
+            raise KeyError(f"Order {client_order_id} is not tracked")
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry[0]), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.untrack(client_order_id)
+
+    async def _run(self):
+        """Keep a stream connection open, reconnecting with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await self._authenticate(ws)
+                    self._connected.set()
+                    delay = 1.0
+                    logger.info("Listening for trade updates")
+                    async for raw in ws:
+                        self._dispatch(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trade update stream error: {str(e)}")
+            self._connected.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _authenticate(self, ws):
+        await ws.send(json.dumps({
+            'action': 'authenticate',
+            'data': {'key_id': self.api_key, 'secret_key': self.secret_key}
+        }))
+        response = json.loads(await ws.recv())
+        if response.get('data', {}).get('status') != 'authorized':
+            raise ValueError("Trade update stream authentication failed")
+        await ws.send(json.dumps({'action': 'listen', 'data': {'streams': ['trade_updates']}}))
+
+    def _dispatch(self, message: Dict):
+        if message.get('stream') != 'trade_updates':
+            return
+        data = message.get('data') or {}
+        client_order_id = (data.get('order') or {}).get('client_order_id')
+        entry = self._pending.get(client_order_id)
+        if entry is None:
+            return
+
+        future, events = entry
+        if data.get('event') in events and not future.done():
+            try:
+                future.set_result(TradeUpdate(**data))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,193 @@
+"""
+Portfolio chart rendering on a reusable Agg canvas, with a cache of rendered PNGs
+"""
+
+import asyncio
+import io
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+try:
+    from alpaca_service.analytics import compute_performance_metrics
+except ImportError:
+    # The Telegram bot runs from inside alpaca_service/ and imports its modules directly
+    from analytics import compute_performance_metrics
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+
+class PortfolioPlotRenderer:
+    """
+    Portfolio history chart built once and redrawn by updating its line data in place
+
+    The figure is drawn with the Agg canvas directly so no pyplot state (or GUI backend)
+    is involved. Instances are not shared between processes; render() is thread-safe.
+    """
+
+    def __init__(self):
+        self.figure = Figure(figsize=(12, 8))
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.figure.suptitle('Portfolio Performance', fontsize=16)
+        self.ax1, self.ax2 = self.figure.subplots(2, 1, height_ratios=[3, 1])
+
+        self.equity_line, = self.ax1.plot([], [], label='Portfolio Value', color='blue')
+        self.ax1.set_ylabel('Portfolio Value ($)')
+
+        self.profit_loss_line, = self.ax2.plot([], [], label='Profit/Loss %', color='green')
+        self.ax2.axhline(y=0, color='r', linestyle='-', alpha=0.3)
+        self.ax2.set_ylabel('Profit/Loss %')
+
+        for ax in (self.ax1, self.ax2):
+            ax.xaxis_date()
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+            ax.xaxis.set_major_formatter(mdates.DateFormatter(DATE_FORMAT))
+            ax.tick_params(axis='x', labelrotation=45)
+            ax.grid(True)
+            ax.legend()
+
+        self.stats_text = self.ax1.text(0.02, 0.98, '',
+                                        transform=self.ax1.transAxes,
+                                        verticalalignment='top',
+                                        bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+        self._lock = threading.Lock()
+
+    def render(self, portfolio_history: Dict) -> bytes:
+        """
+        Draw a portfolio history and return it as PNG data
+
+        Args:
+            portfolio_history (dict): Portfolio history data from get_portfolio_history()
+
+        Returns:
+            bytes: PNG image data
+        """
+        dates = mdates.date2num([datetime.fromtimestamp(ts) for ts in portfolio_history['timestamp']])
+        equity = [value if value is not None else float('nan') for value in portfolio_history['equity']]
+        profit_loss_pct = [value if value is not None else float('nan')
+                           for value in portfolio_history['profit_loss_pct']]
+
+        metrics = compute_performance_metrics(
+            portfolio_history['equity'],
+            timestamps=portfolio_history['timestamp'],
+            base_value=portfolio_history.get('base_value')
+        )
+
+        stats_text = ''
+        if metrics:
+            stats_text = f'Current Value: ${metrics["end_value"]:,.2f}\n'
+            stats_text += f'Total Return: {metrics["total_return"]:.2f}%\n'
+            stats_text += f'Max Value: ${metrics["max_value"]:,.2f}\n'
+            stats_text += f'Min Value: ${metrics["min_value"]:,.2f}\n'
+            stats_text += f'Max Drawdown: {metrics["max_drawdown"]:.2f}%'
+
+        with self._lock:
+            self.equity_line.set_data(dates, equity)
+            self.profit_loss_line.set_data(dates, profit_loss_pct)
+            self.stats_text.set_text(stats_text)
+            self.stats_text.set_visible(bool(stats_text))
+
+            for ax in (self.ax1, self.ax2):
+                ax.relim()
+                ax.autoscale_view()
+                for label in ax.get_xticklabels():
+                    label.set_horizontalalignment('right')
+
+            self.figure.tight_layout()
+            buf = io.BytesIO()
+            self.figure.savefig(buf, format='png', bbox_inches='tight')
+            return buf.getvalue()
+
+
+_renderer: Optional[PortfolioPlotRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def render_portfolio_png(portfolio_history: Dict) -> bytes:
+    """Render a portfolio history with this process's shared figure template"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PortfolioPlotRenderer()
+    return _renderer.render(portfolio_history)
+
+
+class PlotRenderingService:
+    """
+    Renders portfolio charts in a process pool and caches the resulting PNGs
+
+    Rendered images are keyed by (account, timeframe, last data timestamp), so a repeat
+    request for unchanged data is answered from memory without touching matplotlib.
+    """
+
+    def __init__(self, max_workers: int = 2, max_cached: int = 64):
+        self.max_workers = max_workers
+        self.max_cached = max_cached
+        self._executor = None
+        self._cache: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(account: Hashable, timeframe: str, portfolio_history: Dict) -> Tuple:
+        """Cache key for a portfolio history: (account, timeframe, last data timestamp)"""
+        timestamps = portfolio_history.get('timestamp') or []
+        return (account, timeframe, timestamps[-1] if timestamps else None)
+
+    def get_cached(self, key: Tuple) -> Optional[bytes]:
+        """Return a previously rendered PNG for the key, if any"""
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+            return png
+
+    def _store(self, key: Tuple, png: bytes):
+        with self._lock:
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the event loop or client threads of the caller
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def render(self, account: Hashable, timeframe: str, portfolio_history: Dict) -> bytes:
+        """Render synchronously in the current process, using the cache"""
+        key = self.cache_key(account, timeframe, portfolio_history)
+        png = self.get_cached(key)
+        if png is None:
+            png = render_portfolio_png(portfolio_history)
+            self._store(key, png)
+        return png
+
+    async def render_async(self, account: Hashable, timeframe: str, portfolio_history: Dict) -> bytes:
+        """Render in the process pool without blocking the event loop, using the cache"""
+        key = self.cache_key(account, timeframe, portfolio_history)
+        png = self.get_cached(key)
+        if png is None:
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(self._get_executor(), render_portfolio_png, portfolio_history)
+            self._store(key, png)
+        return png
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+"""
+Coalesced progress reporting for long-running jobs (percent complete, ETA, per-item timings)
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressChannel:
+    """
+    Progress state that producers update from any thread and a publisher delivers at a bounded rate
+
+    Updates are coalesced: the publisher only ever sends the latest snapshot, at most once every
+    min_interval seconds, one at a time and therefore in order. With start_publishing() the
+    publisher runs as a task on the event loop (publish may be a coroutine function, e.g. a
+    Telegram edit); without it, publish is called inline by the producer whenever the interval
+    has passed, and whatever is pending is flushed by finish().
+    """
+
+    def __init__(self, total: int, publish: Callable[[Dict], Any], min_interval: float = 3.0):
+        self.total = total
+        self.publish = publish
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._completed = 0
+        self._current = None
+        self._message = None
+        self._finished = False
+        self._started_at = time.monotonic()
+        self._last_completed_at = self._started_at
+        self._item_started: Dict[str, float] = {}
+        self._timings: Dict[str, float] = {}
+        self._version = 0
+        self._published_version = 0
+        self._published_at = 0.0
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    # Producer side (safe from any thread)
+
+    def start(self, item: str):
+        """Mark an item as started (for its timing)"""
+        with self._lock:
+            self._item_started[item] = time.monotonic()
+            self._current = item
+            self._changed()
+
+    def complete(self, item: Optional[str] = None, message: Optional[str] = None):
+        """
+        Mark one item as done
+
+        An item that was never start()ed is timed from the previous completion, which suits
+        jobs that process items one after another and only report when each one finishes.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._completed = min(self._completed + 1, self.total)
+            if item is not None:
+                self._timings[item] = now - self._item_started.pop(item, self._last_completed_at)
+                self._current = item
+            self._last_completed_at = now
+            if message is not None:
+                self._message = message
+            self._changed()
+        self._publish_inline()
+
+    def set_message(self, message: str):
+        """Set the status message shown with the progress"""
+        with self._lock:
+            self._message = message
+            self._changed()
+        self._publish_inline()
+
+    def finish(self, message: Optional[str] = None):
+        """Mark the job as finished; the final state is always published"""
+        with self._lock:
+            self._finished = True
+            if message is not None:
+                self._message = message
+            self._changed()
+        self._publish_inline(force=True)
+
+    def _changed(self):
+        # Called with the lock held
+        self._version += 1
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Reading
+
+    def snapshot(self) -> Dict:
+        """Current progress: percent, ETA, per-item timings and status"""
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            remaining = self.total - self._completed
+            eta = None
+            if self._finished or remaining <= 0:
+                eta = 0.0
+            elif self._completed:
+                eta = elapsed / self._completed * remaining
+            return {
+                'completed': self._completed,
+                'total': self.total,
+                'percent': self._completed / self.total * 100 if self.total else 100.0,
+                'elapsed_seconds': elapsed,
+                'eta_seconds': eta,
+                'current': self._current,
+                'message': self._message,
+                'timings': dict(self._timings),
+                'finished': self._finished,
+                'version': self._version
+            }
+
+    # Publishing
+
+    def _publish_inline(self, force: bool = False):
+        """Publish from the producer thread when no event loop publisher is running"""
+        if self._loop is not None:
+            return
+        # One producer publishes at a time, so snapshots go out in order
+        with self._publish_lock:
+            with self._lock:
+                due = time.monotonic() - self._published_at >= self.min_interval
+                if self._published_version == self._version or not (due or force):
+                    return
+            self._deliver_sync(self.snapshot())
+
+    def _deliver_sync(self, snapshot: Dict):
+        self._published_version = snapshot['version']
+        self._published_at = time.monotonic()
+        try:
+            self.publish(snapshot)
+        except Exception as e:
+            logger.error(f"Error publishing progress: {str(e)}")
+
+    async def _deliver(self, snapshot: Dict):
+        self._published_version = snapshot['version']
+        self._published_at = time.monotonic()
+        try:
+            outcome = self.publish(snapshot)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            logger.error(f"Error publishing progress: {str(e)}")
+
+    def start_publishing(self) -> asyncio.Task:
+        """Publish from a task on the running event loop until the channel is closed"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._publish_loop())
+        return self._task
+
+    async def _publish_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Let updates accumulate until the next publish is allowed
+            delay = self.min_interval - (time.monotonic() - self._published_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._wakeup.clear()
+            snapshot = self.snapshot()
+            if snapshot['version'] != self._published_version:
+                await self._deliver(snapshot)
+
+    async def close(self, flush: bool = True):
+        """
+        Stop the publisher task
+
+        Args:
+            flush: Publish the latest state first if it hasn't been sent yet
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        snapshot = self.snapshot()
+        if flush and snapshot['version'] != self._published_version:
+            await self._deliver(snapshot)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Short human-readable duration, e.g. '42s' or '3m 05s'"""
+    if seconds is None:
+        return 'estimating...'
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
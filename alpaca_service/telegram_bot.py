@@ -1,23 +1,42 @@
+import math
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from telegram import Bot, Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 from strategy import TradingStrategy
 from alpaca.trading.client import TradingClient
+from alpaca.data.historical import StockHistoricalDataClient, CryptoHistoricalDataClient
 from visualization import create_strategy_plot, create_multi_symbol_plot
-from config import TRADING_SYMBOLS
+from config import TRADING_SYMBOLS, ALPACA_API_KEY, ALPACA_SECRET_KEY
 from trading import TradingExecutor
+from async_client import AsyncTradingClient
+from order_tracker import OrderTracker
+from market_sessions import MarketSessions, alpaca_calendar_loader
 from backtest import run_portfolio_backtest, create_portfolio_backtest_plot, create_portfolio_with_prices_plot
-from backtest_individual import run_backtest, create_backtest_plot
-from portfolio import get_portfolio_history, create_portfolio_plot
+from backtest_runner import BacktestRunner
+from bar_store import BarStore, alpaca_bar_fetcher, interval_seconds, to_frame
+from indicators import compute_indicators
+from backtest_store import BacktestStore
+from progress import ProgressChannel, format_duration
+from portfolio import get_portfolio_history_async
+from plot_renderer import PlotRenderingService
 import pandas as pd
 import pytz
 from utils import get_api_symbol, get_display_symbol
 import asyncio
+import time
+import httpx
 
 logger = logging.getLogger(__name__)
 
+# Seconds a rendered /portfolio chart is resent without refetching the history
+PORTFOLIO_CHART_TTL = 60
+# Minimum seconds between edits of a backtest progress message
+BACKTEST_PROGRESS_INTERVAL = 3.0
+# Bars behind the technical indicators shown by /indicators (the 200-bar SMA needs them all)
+INDICATOR_WARMUP_BARS = 200
+
 class TradingBot:
     def __init__(self, trading_client: TradingClient, strategies: dict, symbols: list):
         self.trading_client = trading_client
@@ -31,8 +50,35 @@ class TradingBot:
         if not self.chat_id:
             raise ValueError("CHAT_ID not found in environment variables")
             
+        # All Alpaca calls from the bot share one bounded, rate-limited async client
+        self.alpaca = AsyncTradingClient(trading_client)
+        # Order fills are confirmed from the trade update stream (started in start())
+        self.order_tracker = OrderTracker(ALPACA_API_KEY, ALPACA_SECRET_KEY, paper=True)
+        # Market hours and exchange holidays, loaded once per day and shared by all executors
+        self.market_sessions = MarketSessions(alpaca_calendar_loader(trading_client))
+        
         # Initialize trading executors for each symbol
-        self.executors = {symbol: TradingExecutor(trading_client, symbol) for symbol in symbols}
+        self.executors = {
+            symbol: TradingExecutor(trading_client, symbol, self.alpaca, self.order_tracker, self.market_sessions)
+            for symbol in symbols
+        }
+        
+        # Portfolio charts are rendered out of process and cached by data timestamp
+        self.plot_service = PlotRenderingService()
+        self._portfolio_charts = {}  # (timeframe, period) -> last chart sent for it
+        self._http_client = None  # Shared async HTTP client, created on first use
+        # Historical bars are kept once per symbol on disk and extended incrementally
+        self.bar_store = BarStore(os.getenv('BAR_STORE_DIR', os.path.join('data', 'bars')))
+        self._bar_fetchers = {
+            'stock': alpaca_bar_fetcher(StockHistoricalDataClient(ALPACA_API_KEY, ALPACA_SECRET_KEY)),
+            'crypto': alpaca_bar_fetcher(CryptoHistoricalDataClient())
+        }
+        self._bar_refreshed = {}  # symbol -> (monotonic time, days covered) of the last update
+        self._bar_locks = {}  # symbol -> asyncio.Lock serializing its updates
+        # Every backtest run is kept in its own directory of Parquet tables
+        self.backtest_store = BacktestStore(os.getenv('BACKTEST_STORE_DIR', os.path.join('data', 'backtests')))
+        # Per-symbol backtests run in parallel worker processes
+        self.backtest_runner = BacktestRunner(store_root=self.backtest_store.root)
             
         # Initialize the application and bot
         self.application = Application.builder().token(self.bot_token).build()
@@ -71,6 +117,9 @@ class TradingBot:
             await self.application.initialize()
             await self.application.start()
             await self.application.updater.start_polling()
+            await self.order_tracker.start()
+            # Load today's calendar up front so market-hours checks never wait on the network
+            await asyncio.get_running_loop().run_in_executor(None, self.market_sessions.refresh)
             
             # Send startup message
             await self.send_message("🤖 Trading Bot started successfully!")
@@ -95,9 +144,61 @@ class TradingBot:
                 await self.application.updater.stop()
             await self.application.stop()
             await self.application.shutdown()
+            self.plot_service.shutdown()
+            self.backtest_runner.shutdown()
+            await self.order_tracker.stop()
+            self.alpaca.shutdown()
+            if self._http_client is not None:
+                await self._http_client.aclose()
+                self._http_client = None
         except Exception as e:
             logger.error(f"Error stopping bot: {e}")
             
+    async def get_bars(self, symbol: str, days: int) -> pd.DataFrame:
+        """
+        Bars for a symbol over the last `days` days from its shared dataset
+
+        The dataset is fetched once and then only extended with bars newer than the stored
+        ones (at most once per bar interval), so every command reads the same data.
+        """
+        config = TRADING_SYMBOLS[symbol]
+        interval = config['interval']
+        lookback = timedelta(days=days)
+        lock = self._bar_locks.setdefault(symbol, asyncio.Lock())
+        async with lock:
+            refreshed_at, covered_days = self._bar_refreshed.get(symbol, (0.0, 0))
+            if covered_days >= days and time.monotonic() - refreshed_at < interval_seconds(interval):
+                records = self.bar_store.read(
+                    get_api_symbol(symbol), interval, start=datetime.now(pytz.UTC) - lookback
+                )
+            else:
+                fetcher = self._bar_fetchers['crypto' if config['market'] == 'CRYPTO' else 'stock']
+                records = await asyncio.get_running_loop().run_in_executor(
+                    None, self.bar_store.update, get_api_symbol(symbol), interval, fetcher, lookback
+                )
+                self._bar_refreshed[symbol] = (time.monotonic(), max(days, covered_days))
+        return to_frame(records)
+
+    @staticmethod
+    def _warmup_days(symbol: str) -> int:
+        """Calendar days covering INDICATOR_WARMUP_BARS bars of a symbol's interval"""
+        config = TRADING_SYMBOLS[symbol]
+        hours = config['market_hours']
+        start_h, start_m = map(int, hours['start'].split(':'))
+        end_h, end_m = map(int, hours['end'].split(':'))
+        session_seconds = ((end_h - start_h) * 60 + end_m - start_m) * 60 or 86400
+        bars_per_day = max(1, session_seconds // interval_seconds(config['interval']))
+        trading_days = math.ceil(INDICATOR_WARMUP_BARS / bars_per_day)
+        if config['market'] == 'CRYPTO':
+            return trading_days + 1
+        # Allow for weekends and exchange holidays
+        return math.ceil(trading_days * 7 / 5) + 4
+
+    async def get_technical_indicators(self, symbol: str) -> dict:
+        """SMA/EMA/RSI/MACD/Bollinger values of a symbol's latest bar, from its shared dataset"""
+        data = await self.get_bars(symbol, self._warmup_days(symbol))
+        return compute_indicators(data['close'].to_numpy())
+
     async def send_message(self, message: str):
         """Send message to Telegram"""
         try:
@@ -177,7 +278,7 @@ class TradingBot:
                         
                         # Get position details if any
                         try:
-                            pos = self.trading_client.get_open_position(get_api_symbol(sym))
+                            pos = await self.alpaca.get_open_position(get_api_symbol(sym))
                             pos_pnl = f"P&L: ${float(pos.unrealized_pl):.2f} ({float(pos.unrealized_plpc)*100:.2f}%)"
                         except:
                             pos_pnl = "No open position"
@@ -224,6 +325,14 @@ Price Changes:
                 
             symbols_to_check = [symbol] if symbol else self.symbols
             
+            # Fetch the account and every requested position concurrently
+            account, *positions = await asyncio.gather(
+                self.alpaca.get_account(),
+                *(self.alpaca.get_open_position(get_api_symbol(sym)) for sym in symbols_to_check),
+                return_exceptions=True
+            )
+            positions = dict(zip(symbols_to_check, positions))
+            
             # Process symbols in chunks of 3
             for i in range(0, len(symbols_to_check), 3):
                 chunk_messages = []
@@ -231,9 +340,12 @@ Price Changes:
                 
                 for sym in chunk_symbols:
                     try:
-                        position = self.trading_client.get_open_position(get_api_symbol(sym))
+                        position = positions[sym]
+                        if isinstance(position, Exception):
+                            raise position
                         # Get account equity for exposure calculation
-                        account = self.trading_client.get_account()
+                        if isinstance(account, Exception):
+                            raise account
                         equity = float(account.equity)
                         market_value = float(position.market_value)
                         exposure_percentage = (market_value / equity) * 100
@@ -259,7 +371,8 @@ Unrealized P&L: ${float(position.unrealized_pl):.2f} ({float(position.unrealized
             # Add summary of all positions if not looking at a specific symbol
             if not symbol:
                 try:
-                    account = self.trading_client.get_account()
+                    if isinstance(account, Exception):
+                        raise account
                     equity = float(account.equity)
                     total_market_value = 0
                     total_pnl = 0
@@ -268,7 +381,9 @@ Unrealized P&L: ${float(position.unrealized_pl):.2f} ({float(position.unrealized
                     # Calculate totals and collect position details
                     for sym in self.symbols:
                         try:
-                            position = self.trading_client.get_open_position(get_api_symbol(sym))
+                            position = positions[sym]
+                            if isinstance(position, Exception):
+                                raise position
                             market_value = float(position.market_value)
                             total_market_value += market_value
                             total_pnl += float(position.unrealized_pl)
@@ -315,7 +430,7 @@ Open Positions:
     async def balance_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Check account balance"""
         try:
-            account = self.trading_client.get_account()
+            account = await self.alpaca.get_account()
             message = f"""
 💰 Account Balance:
 Cash: ${float(account.cash):.2f}
@@ -330,7 +445,7 @@ Today's P&L: ${float(account.equity) - float(account.last_equity):.2f}
     async def performance_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """View today's performance"""
         try:
-            account = self.trading_client.get_account()
+            account = await self.alpaca.get_account()
             today_pl = float(account.equity) - float(account.last_equity)
             today_pl_pct = (today_pl / float(account.last_equity)) * 100
             
@@ -384,6 +499,11 @@ Weekly Composite: {analysis['weekly_composite']:.4f}
 Price Changes:
 • 5min: {analysis['price_change_5m']*100:.2f}%
 • 1hr: {analysis['price_change_1h']*100:.2f}%"""
+                        try:
+                            technical = await self.get_technical_indicators(sym)
+                            message += self._format_technical_indicators(sym, technical)
+                        except Exception as e:
+                            logger.error(f"Error computing technical indicators for {sym}: {str(e)}")
                         chunk_messages.append(message)
                     except Exception as e:
                         chunk_messages.append(f"Error analyzing {sym}: {str(e)}")
@@ -398,6 +518,20 @@ Price Changes:
         except Exception as e:
             await update.message.reply_text(f"❌ Error getting indicators: {str(e)}")
 
+    @staticmethod
+    def _format_technical_indicators(symbol: str, technical: dict) -> str:
+        """/indicators block for compute_indicators() values ('n/a' while there are too few bars)"""
+        def fmt(value, spec='.2f'):
+            return format(value, spec) if value is not None else 'n/a'
+
+        macd = technical.get('macd') or {}
+        return f"""
+
+Technicals ({TRADING_SYMBOLS[symbol]['interval']} bars):
+• SMA 20/50/200: {fmt(technical.get('sma_20'))} / {fmt(technical.get('sma_50'))} / {fmt(technical.get('sma_200'))}
+• RSI 14: {fmt(technical.get('rsi_14'), '.1f')}
+• MACD Histogram: {fmt(macd.get('histogram'), '.4f')}"""
+
     async def plot_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Generate and send strategy visualization plots."""
         try:
@@ -642,27 +776,71 @@ Price Changes:
                 await update.message.reply_text(f"❌ Invalid symbol: {symbol}")
                 return
             
-            symbols_to_close = [symbol] if symbol else self.symbols
-            success_count = 0
-            
-            for sym in symbols_to_close:
-                try:
-                    if await self.executors[sym].close_position(self.send_message):
-                        success_count += 1
-                except Exception as e:
-                    await update.message.reply_text(f"❌ Error closing {sym} position: {str(e)}")
+            if not symbol:
+                await self._close_all_positions(update)
+                return
             
-            if success_count > 0:
-                message = f"Successfully closed {success_count} position(s)"
-                if symbol:
-                    message += f" for {symbol}"
-                await update.message.reply_text(message)
-            elif not symbol:  # No positions were closed when trying to close all
-                await update.message.reply_text("No open positions to close")
+            try:
+                if await self.executors[symbol].close_position(self.send_message):
+                    await update.message.reply_text(f"Successfully closed 1 position(s) for {symbol}")
+            except Exception as e:
+                await update.message.reply_text(f"❌ Error closing {symbol} position: {str(e)}")
             
         except Exception as e:
             await update.message.reply_text(f"❌ Error closing positions: {str(e)}")
 
+    async def _close_all_positions(self, update: Update):
+        """Liquidate every held configured symbol concurrently from one positions snapshot"""
+        positions = await self.alpaca.get_all_positions()
+        # Alpaca reports crypto positions without the slash (BTC/USD -> BTCUSD)
+        held = {position.symbol.replace('/', ''): position for position in positions}
+        
+        to_close = []
+        market_closed = []
+        for sym in self.symbols:
+            position = held.get(get_api_symbol(sym).replace('/', ''))
+            if position is None:
+                continue
+            executor = self.executors[sym]
+            if not executor._check_market_hours():
+                market_closed.append(sym)
+                continue
+            to_close.append((sym, position, executor.close_order_request(position)))
+        
+        if not to_close and not market_closed:
+            await update.message.reply_text("No open positions to close")
+            return
+        
+        # Submit all liquidation orders at once; the async client applies the rate limit
+        results = await asyncio.gather(
+            *(self.alpaca.submit_order(order) for _, _, order in to_close),
+            return_exceptions=True
+        )
+        
+        closed_lines = []
+        failed_lines = []
+        for (sym, position, order), result in zip(to_close, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error closing {sym} position: {str(result)}")
+                failed_lines.append(f"• {sym}: {str(result)}")
+            else:
+                closed_lines.append(
+                    f"• {sym} ({TRADING_SYMBOLS[sym]['name']}): SELL {order.qty} "
+                    f"(~${abs(float(position.market_value)):.2f}) | Order ID: {result.id}"
+                )
+        
+        report = [f"🔻 Close all: {len(closed_lines)} order(s) submitted at market price"]
+        if closed_lines:
+            report.append("\n".join(closed_lines))
+        if failed_lines:
+            report.append("❌ Failed:\n" + "\n".join(failed_lines))
+        if market_closed:
+            report.append("⏸ Market closed, not closed: " + ", ".join(market_closed))
+        
+        message = "\n\n".join(report)
+        logger.info(message)
+        await update.message.reply_text(message)
+
     async def backtest_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Run backtest simulation"""
         try:
@@ -701,35 +879,29 @@ Price Changes:
                     # Create async task for the backtest
                     async def run_backtest_task():
                         try:
-                            # Create a closure to track progress
-                            symbols_processed = 0
-                            total_symbols = len(self.symbols)
                             loop = asyncio.get_running_loop()
                             
-                            def progress_callback(symbol):
-                                nonlocal symbols_processed
-                                symbols_processed += 1
-                                # Schedule the coroutine on the event loop
-                                loop.call_soon_threadsafe(
-                                    lambda: asyncio.create_task(
-                                        self._update_backtest_progress(
-                                            status_message,
-                                            symbols_processed,
-                                            total_symbols,
-                                            symbol
-                                        )
-                                    )
-                                )
+                            # Progress from the worker thread is coalesced into at most one edit per interval
+                            progress = ProgressChannel(
+                                len(self.symbols),
+                                lambda snapshot: self._update_backtest_progress(status_message, snapshot),
+                                min_interval=BACKTEST_PROGRESS_INTERVAL
+                            )
+                            progress.start_publishing()
                             
                             # Run portfolio backtest with progress updates
-                            result = await loop.run_in_executor(
-                                None,
-                                lambda: run_portfolio_backtest(
-                                    self.symbols, 
-                                    days, 
-                                    progress_callback=progress_callback
+                            try:
+                                result = await loop.run_in_executor(
+                                    None,
+                                    lambda: run_portfolio_backtest(
+                                        self.symbols, 
+                                        days, 
+                                        progress_callback=progress.complete
+                                    )
                                 )
-                            )
+                            finally:
+                                # The completion message below replaces the last progress edit
+                                await progress.close(flush=False)
                             
                             # Create performance summary
                             metrics = result['metrics']
@@ -769,8 +941,14 @@ Price Changes:
                             # Send second plot
                             await update.message.reply_photo(prices_plot_buffer)
                             
-                            # Notify about CSV file
-                            await update.message.reply_text("💾 Complete backtest data saved to 'portfolio backtest.csv'")
+                            # Keep the complete run for later comparison
+                            run_id = await loop.run_in_executor(
+                                None,
+                                lambda: self.backtest_store.save(
+                                    'portfolio', result, parameters={'symbols': self.symbols, 'days': days}
+                                )
+                            )
+                            await update.message.reply_text(f"💾 Complete backtest data saved as run {run_id}")
                             
                         except Exception as e:
                             await status_message.edit_text(f"❌ Error during backtest: {str(e)}")
@@ -812,20 +990,15 @@ Price Changes:
             
             status_message = await update.message.reply_text(f"🔄 Starting backtest for the last {days} days...")
             
-            # Run backtest for each symbol
-            for sym in symbols_to_test:
+            # Run all symbols in parallel and report each one as soon as it finishes
+            completed = 0
+            async for outcome in self.backtest_runner.stream(symbols_to_test, days):
+                sym = outcome['symbol']
+                completed += 1
                 try:
-                    # Run backtest simulation asynchronously
-                    result = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: run_backtest(sym, days)
-                    )
-                    
-                    # Generate plot in executor
-                    buf, stats = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: create_backtest_plot(result)
-                    )
+                    if outcome['error']:
+                        raise RuntimeError(outcome['error'])
+                    stats = outcome['stats']
                     
                     # Create performance message
                     message = f"""
@@ -840,20 +1013,20 @@ Price Changes:
                     # Send plot and stats
                     await context.bot.send_photo(
                         chat_id=update.effective_chat.id,
-                        photo=buf,
+                        photo=outcome['plot'],
                         caption=message,
                         parse_mode='HTML'
                     )
-                    
-                    # Update status for multiple symbols
-                    if len(symbols_to_test) > 1:
-                        await status_message.edit_text(f"✅ Completed {sym}, processing next symbol...")
                         
                 except Exception as e:
                     error_msg = str(e)
                     if "Error running backtest for" in error_msg:
                         error_msg = error_msg.split(": ", 1)[1]  # Get the actual error message
                     await update.message.reply_text(f"❌ Could not run backtest for {sym}: {error_msg}")
+                
+                # Update status for multiple symbols
+                if len(symbols_to_test) > 1 and completed < len(symbols_to_test):
+                    await status_message.edit_text(f"✅ Completed {sym} ({completed}/{len(symbols_to_test)}), waiting for the rest...")
             
             # Final status update
             if len(symbols_to_test) > 1:
@@ -867,15 +1040,20 @@ Price Changes:
             logger.error(f"Backtest command error: {str(e)}")
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
-    async def _update_backtest_progress(self, message, processed, total, current_symbol):
+    async def _update_backtest_progress(self, message, progress: dict):
         """Update the backtest progress message"""
         try:
-            progress = (processed / total) * 100
-            await message.edit_text(
+            text = (
                 f"🔄 Running portfolio backtest...\n"
-                f"Progress: {progress:.1f}%\n"
-                f"Currently processing: {current_symbol}"
+                f"Progress: {progress['percent']:.1f}% ({progress['completed']}/{progress['total']} symbols)\n"
+                f"Elapsed: {format_duration(progress['elapsed_seconds'])} • "
+                f"ETA: {format_duration(progress['eta_seconds'])}"
             )
+            if progress['current']:
+                text += f"\nLast completed: {progress['current']}"
+                if progress['current'] in progress['timings']:
+                    text += f" ({progress['timings'][progress['current']]:.1f}s)"
+            await message.edit_text(text)
         except Exception as e:
             logger.error(f"Error updating backtest progress: {e}")
 
@@ -892,17 +1070,44 @@ Price Changes:
             if len(args) >= 2:
                 period = args[1]
                 
-            # Get portfolio history
-            portfolio_history = get_portfolio_history(timeframe=timeframe, period=period)
+            caption = f'Portfolio History (Timeframe: {timeframe}, Period: {period})'
             
-            # Create plot
-            plot_buffer = create_portfolio_plot(portfolio_history)
+            # Repeat requests within the TTL get the last chart immediately
+            last_chart = self._portfolio_charts.get((timeframe, period))
+            if last_chart and time.monotonic() - last_chart['sent_at'] < PORTFOLIO_CHART_TTL:
+                await update.message.reply_photo(photo=last_chart['file_id'], caption=caption)
+                return
             
-            # Send plot
-            await update.message.reply_photo(
-                photo=plot_buffer,
-                caption=f'Portfolio History (Timeframe: {timeframe}, Period: {period})'
-            )
+            status_message = await update.message.reply_text("📊 Fetching portfolio history...")
+            try:
+                if self._http_client is None:
+                    self._http_client = httpx.AsyncClient(timeout=30)
+                portfolio_history = await get_portfolio_history_async(
+                    timeframe=timeframe, period=period, client=self._http_client
+                )
+                
+                chart_key = self.plot_service.cache_key(ALPACA_API_KEY, f"{timeframe}:{period}", portfolio_history)
+                if last_chart and last_chart['key'] == chart_key:
+                    # Unchanged data: resend the photo Telegram already has
+                    photo = last_chart['file_id']
+                else:
+                    await status_message.edit_text("🎨 Rendering portfolio chart...")
+                    photo = await self.plot_service.render_async(
+                        ALPACA_API_KEY, f"{timeframe}:{period}", portfolio_history
+                    )
+                
+                # Send plot
+                message = await update.message.reply_photo(photo=photo, caption=caption)
+                if message.photo:
+                    self._portfolio_charts[(timeframe, period)] = {
+                        'key': chart_key,
+                        'file_id': message.photo[-1].file_id,
+                        'sent_at': time.monotonic()
+                    }
+                await status_message.delete()
+            except Exception as e:
+                logger.error(f"Error in portfolio_command: {str(e)}")
+                await status_message.edit_text(f"Error getting portfolio history: {str(e)}")
             
         except Exception as e:
             logger.error(f"Error in portfolio_command: {str(e)}")
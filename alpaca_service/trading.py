@@ -1,42 +1,50 @@
+import asyncio
 import logging
+import uuid
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
-from fetch import is_market_open
 from config import TRADING_SYMBOLS
-import pytz
-from datetime import datetime
 from utils import get_api_symbol, get_display_symbol
+from async_client import AsyncTradingClient
+from order_tracker import OrderTracker
+from market_sessions import MarketSessions, CALENDAR_TIMEZONE
+
+# Seconds to wait for a trade update before checking the order status directly
+ORDER_UPDATE_TIMEOUT = 30
 
 logger = logging.getLogger(__name__)
 
 class TradingExecutor:
-    def __init__(self, trading_client: TradingClient, symbol: str):
+    def __init__(self, trading_client: TradingClient, symbol: str, async_client: AsyncTradingClient = None,
+                 order_tracker: OrderTracker = None, market_sessions: MarketSessions = None):
         self.trading_client = trading_client
+        # Async methods go through the (ideally shared) async client so they never block the event loop
+        self.async_client = async_client or AsyncTradingClient(trading_client)
+        # Optional trade update stream used to confirm fills as soon as they happen
+        self.order_tracker = order_tracker
         self.symbol = symbol
         self.is_active = True
         self.config = TRADING_SYMBOLS[symbol]
         
-    def _check_market_hours(self) -> bool:
-        """Check if market is open for this symbol"""
+        # Session index shared between executors; symbols with the same hours share a market entry
+        self.market_sessions = market_sessions or MarketSessions()
         market_hours = self.config['market_hours']
-        market_tz = pytz.timezone(market_hours['timezone'])
-        now = datetime.now(market_tz)
-        
-        # For 24/7 markets like Forex
-        if market_hours['start'] == '00:00' and market_hours['end'] == '23:59':
-            return True
-            
-        # Check weekday
-        if now.weekday() >= 5:  # Saturday = 5, Sunday = 6
-            return False
-            
-        # Parse market hours
-        start_time = datetime.strptime(market_hours['start'], '%H:%M').time()
-        end_time = datetime.strptime(market_hours['end'], '%H:%M').time()
-        current_time = now.time()
+        # US-listed (New York hours) non-crypto symbols follow the exchange calendar for holidays
+        use_calendar = self.config['market'] != 'CRYPTO' and market_hours['timezone'] == CALENDAR_TIMEZONE
+        self.market_key = f"{market_hours['timezone']} {market_hours['start']}-{market_hours['end']}" + \
+            (" calendar" if use_calendar else "")
+        self.market_sessions.add_market(
+            self.market_key,
+            start=market_hours['start'],
+            end=market_hours['end'],
+            timezone=market_hours['timezone'],
+            use_calendar=use_calendar
+        )
         
-        return start_time <= current_time <= end_time
+    def _check_market_hours(self) -> bool:
+        """Check if market is open for this symbol"""
+        return self.market_sessions.is_open(self.market_key)
 
     def get_position(self):
         """Get current position details"""
@@ -47,6 +55,64 @@ class TradingExecutor:
                 return None
             raise
 
+    async def get_position_async(self):
+        """Get current position details without blocking the event loop"""
+        try:
+            return await self.async_client.get_open_position(get_api_symbol(self.symbol))
+        except Exception as e:
+            if "no position" in str(e).lower():
+                return None
+            raise
+
+    async def _get_exposure(self) -> tuple:
+        """Fetch account equity and the current position value for this symbol concurrently"""
+        async def position_value():
+            try:
+                position = await self.async_client.get_open_position(get_api_symbol(self.symbol))
+                return float(position.market_value)
+            except Exception:
+                return 0
+        
+        account, current_position_value = await asyncio.gather(
+            self.async_client.get_account(), position_value()
+        )
+        return float(account.equity), current_position_value
+
+    def _size_position(self, equity: float, current_position_value: float, current_price: float,
+                       risk_percent: float = 0.02) -> float:
+        """
+        Position size for a new buy given account equity and the existing position value
+        
+        Args:
+            equity: Account equity
+            current_position_value: Market value of the existing position (0 if none)
+            current_price: Current price of the asset
+            risk_percent: Maximum risk per trade as percentage of equity (default: 2%)
+        """
+        # Calculate remaining available capital (10% of equity - current position value)
+        max_total_position = equity * 0.10  # 10% of total capital
+        available_capital = max_total_position - current_position_value
+        
+        if available_capital <= 0:
+            logger.info(f"Maximum position size reached for {get_display_symbol(self.symbol)} ({self.config['name']}) (10% of capital)")
+            return 0
+        
+        # Calculate quantity based on available capital and risk
+        qty = min(available_capital, equity * risk_percent) / current_price
+        
+        # Round down to nearest whole number for stocks, keep decimals for crypto
+        if self.config['market'] == 'CRYPTO':
+            qty = round(qty, 8)  # Round to 8 decimal places for crypto
+        else:
+            qty = int(qty)  # Round down to whole number for stocks
+        
+        # Ensure minimum position size
+        min_qty = 1 if self.config['market'] != 'CRYPTO' else 0.0001
+        if qty < min_qty:
+            qty = min_qty
+            
+        return qty
+
     def calculate_position_size(self, current_price: float, risk_percent: float = 0.02) -> float:
         """
         Calculate position size based on account equity and risk management
@@ -65,35 +131,22 @@ class TradingExecutor:
                 current_position_value = float(position.market_value)
             except Exception:
                 current_position_value = 0
-                
-            # Calculate remaining available capital (10% of equity - current position value)
-            max_total_position = equity * 0.10  # 10% of total capital
-            available_capital = max_total_position - current_position_value
-            
-            if available_capital <= 0:
-                logger.info(f"Maximum position size reached for {get_display_symbol(self.symbol)} ({self.config['name']}) (10% of capital)")
-                return 0
-            
-            # Calculate quantity based on available capital and risk
-            qty = min(available_capital, equity * risk_percent) / current_price
             
-            # Round down to nearest whole number for stocks, keep decimals for crypto
-            if self.config['market'] == 'CRYPTO':
-                qty = round(qty, 8)  # Round to 8 decimal places for crypto
-            else:
-                qty = int(qty)  # Round down to whole number for stocks
-            
-            # Ensure minimum position size
-            min_qty = 1 if self.config['market'] != 'CRYPTO' else 0.0001
-            if qty < min_qty:
-                qty = min_qty
-                
-            return qty
+            return self._size_position(equity, current_position_value, current_price, risk_percent)
             
         except Exception as e:
             logger.error(f"Error calculating position size: {str(e)}")
             return 0
 
+    async def calculate_position_size_async(self, current_price: float, risk_percent: float = 0.02) -> float:
+        """Async version of calculate_position_size"""
+        try:
+            equity, current_position_value = await self._get_exposure()
+            return self._size_position(equity, current_position_value, current_price, risk_percent)
+        except Exception as e:
+            logger.error(f"Error calculating position size: {str(e)}")
+            return 0
+
     def calculate_shares_from_amount(self, amount: float, current_price: float) -> float:
         """Calculate number of shares based on dollar amount"""
         shares = amount / current_price
@@ -131,7 +184,9 @@ class TradingExecutor:
             
             # For buy orders, calculate new position size
             if action == "BUY":
-                new_qty = self.calculate_position_size(analysis['current_price'])
+                # One concurrent snapshot of equity and the existing position serves both sizing and exposure
+                equity, existing_position_value = await self._get_exposure()
+                new_qty = self._size_position(equity, existing_position_value, analysis['current_price'])
                 
                 if new_qty <= 0:
                     message = f"Maximum position size reached or invalid size calculated for {get_display_symbol(self.symbol)} ({self.config['name']})"
@@ -140,17 +195,7 @@ class TradingExecutor:
                         await notify_callback(message)
                     return False
                 
-                # Calculate exposure
-                account = self.trading_client.get_account()
-                equity = float(account.equity)
-                
                 # Get total position value (existing + new)
-                try:
-                    position = self.trading_client.get_open_position(get_api_symbol(self.symbol))
-                    existing_position_value = float(position.market_value)
-                except Exception:
-                    existing_position_value = 0
-                    
                 new_position_value = new_qty * analysis['current_price']
                 total_position_value = existing_position_value + new_position_value
                 exposure_percentage = (total_position_value / equity) * 100
@@ -176,7 +221,7 @@ class TradingExecutor:
                     time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY
                 )
                 
-                submitted_order = self.trading_client.submit_order(order)
+                submitted_order = await self.async_client.submit_order(order)
                 
                 # Create detailed order confirmation message
                 message = f"""✅ BUY Order Executed for {get_display_symbol(self.symbol)} ({self.config['name']}):
@@ -198,7 +243,7 @@ class TradingExecutor:
             # For sell orders, get current position
             else:
                 try:
-                    position = self.trading_client.get_open_position(get_api_symbol(self.symbol))
+                    position = await self.async_client.get_open_position(get_api_symbol(self.symbol))
                     qty = abs(float(position.qty))
                     avg_entry_price = float(position.avg_entry_price)
                     
@@ -223,7 +268,7 @@ class TradingExecutor:
                         time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY
                     )
                     
-                    submitted_order = self.trading_client.submit_order(order)
+                    submitted_order = await self.async_client.submit_order(order)
                     
                     # Create detailed order confirmation message
                     message = f"""✅ SELL Order Executed for {get_display_symbol(self.symbol)} ({self.config['name']}):
@@ -285,15 +330,27 @@ class TradingExecutor:
                 return False
             
             # Submit buy order
+            client_order_id = uuid.uuid4().hex
             order = MarketOrderRequest(
                 symbol=get_api_symbol(self.symbol),
                 qty=shares,
                 side=OrderSide.BUY,
-                time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY
+                time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY,
+                client_order_id=client_order_id
             )
             
+            # Register for trade updates before submitting so a fast fill can't be missed
+            tracking = self.order_tracker is not None and self.order_tracker.connected
+            if tracking:
+                self.order_tracker.track(client_order_id)
+            
             # Submit the order and get confirmation
-            submitted_order = self.trading_client.submit_order(order)
+            try:
+                submitted_order = await self.async_client.submit_order(order)
+            except Exception:
+                if tracking:
+                    self.order_tracker.untrack(client_order_id)
+                raise
             
             # Initial order message
             message = f"""🔄 Opening position: BUY {shares} {get_display_symbol(self.symbol)} (${amount:.2f}) at ${current_price:.2f}
@@ -302,12 +359,19 @@ Order ID: {submitted_order.id}"""
             if notify_callback:
                 await notify_callback(message)
             
-            # Wait briefly for order to be processed
-            import asyncio
-            await asyncio.sleep(2)
+            # Wait for the order to fill, cancel or be rejected
+            trade_update = None
+            if tracking:
+                trade_update = await self.order_tracker.wait_for(client_order_id, ORDER_UPDATE_TIMEOUT)
+            else:
+                # No trade update stream: wait briefly for order to be processed
+                await asyncio.sleep(2)
             
             # Get order status
-            order_status = self.trading_client.get_order_by_id(submitted_order.id)
+            if trade_update is not None:
+                order_status = trade_update.order
+            else:
+                order_status = await self.async_client.get_order_by_id(submitted_order.id)
             
             # Create confirmation message
             if order_status.status == 'filled':
@@ -339,6 +403,15 @@ Order ID: {submitted_order.id}"""
                 await notify_callback(f"❌ {error_msg}")
             return False
 
+    def close_order_request(self, position) -> MarketOrderRequest:
+        """Market sell order liquidating the given position for this symbol"""
+        return MarketOrderRequest(
+            symbol=get_api_symbol(self.symbol),
+            qty=abs(float(position.qty)),
+            side=OrderSide.SELL,
+            time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY
+        )
+
     async def close_position(self, notify_callback=None) -> bool:
         """
         Close entire position for this symbol
@@ -353,18 +426,11 @@ Order ID: {submitted_order.id}"""
             
             # Get current position
             try:
-                position = self.trading_client.get_open_position(get_api_symbol(self.symbol))
+                position = await self.async_client.get_open_position(get_api_symbol(self.symbol))
                 shares = abs(float(position.qty))
                 
                 # Submit sell order
-                order = MarketOrderRequest(
-                    symbol=get_api_symbol(self.symbol),
-                    qty=shares,
-                    side=OrderSide.SELL,
-                    time_in_force=TimeInForce.GTC if self.config['market'] == 'CRYPTO' else TimeInForce.DAY
-                )
-                
-                self.trading_client.submit_order(order)
+                await self.async_client.submit_order(self.close_order_request(position))
                 
                 message = f"Closing position: SELL {shares} {get_display_symbol(self.symbol)} ({self.config['name']}) at market price"
                 logger.info(message)
@@ -0,0 +1,191 @@
+"""
+Vectorized composite-signal backtests evaluated over whole parameter grids at once
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from alpaca_service.analytics import infer_periods_per_year, to_array
+except ImportError:
+    # The Telegram bot runs from inside alpaca_service/ and imports its modules directly
+    from analytics import infer_periods_per_year, to_array
+
+logger = logging.getLogger(__name__)
+
+# Order of the columns in a parameter matrix
+PARAMETERS = ('buy_threshold', 'sell_threshold', 'risk_percent', 'max_position_pct')
+# Sizing rules of TradingExecutor: 2% of equity per buy, at most 10% of equity per position
+DEFAULT_PARAMETERS = {'risk_percent': 0.02, 'max_position_pct': 0.10}
+# Upper bound on parameter sets x bars simulated per chunk (keeps each chunk to ~100 MB)
+MAX_CHUNK_CELLS = 1_000_000
+
+
+def parameter_grid(**values: Sequence) -> List[Dict]:
+    """
+    Cartesian product of parameter values, e.g.
+    parameter_grid(buy_threshold=[0.2, 0.4], sell_threshold=[-0.2, -0.4])
+    """
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def _segment_cumsum(values: np.ndarray, last_reset: np.ndarray) -> np.ndarray:
+    """Cumulative sum along each row that restarts at zero on every reset bar"""
+    sums = np.cumsum(values, axis=1)
+    base = np.take_along_axis(sums, np.clip(last_reset, 0, None), axis=1)
+    return np.where(last_reset >= 0, sums - base, sums)
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    """Previous bar's value along each row (0 before the first bar)"""
+    out = np.zeros_like(values)
+    out[:, 1:] = values[:, :-1]
+    return out
+
+
+def simulate(prices: np.ndarray, composite: np.ndarray, params: np.ndarray,
+             initial_capital: float = 100000.0, fractional: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Simulate every parameter set over the same bars without a per-bar loop
+
+    A bar whose composite is above buy_threshold buys risk_percent of initial capital, until
+    max_position_pct of capital is invested in the position (the last buy takes what is left);
+    a bar below sell_threshold closes the whole position. Orders fill at the bar's price.
+    Unlike the live executor, the cap is measured on capital invested rather than market
+    value, and sizing uses initial rather than current equity; this is what keeps the
+    simulation a closed-form sequence of cumulative sums.
+
+    Args:
+        prices: Bar prices, shape (bars,)
+        composite: Composite signal per bar, shape (bars,) (NaN = no signal)
+        params: One row per parameter set, columns in PARAMETERS order
+        initial_capital: Starting cash
+        fractional: Allow fractional quantities (crypto); otherwise whole shares, at least 1
+
+    Returns:
+        dict: (sets, bars) arrays 'equity', 'shares', 'bought', 'sold' and 'pnl' (per closed position)
+    """
+    price = prices[None, :]
+    signal = composite[None, :]
+    buy_threshold, sell_threshold, risk_percent, max_position = (params[:, [i]] for i in range(4))
+
+    with np.errstate(invalid='ignore'):
+        sell = signal < sell_threshold
+        buy = (signal > buy_threshold) & ~sell
+    bars = np.arange(prices.size)
+    last_sell = np.maximum.accumulate(np.where(sell, bars, -1), axis=1)
+
+    # Capital the position should have absorbed after each bar's buys
+    buys_in_position = _segment_cumsum(buy.astype(float), last_sell)
+    invested_target = np.minimum(buys_in_position * risk_percent, max_position) * initial_capital
+    order_value = np.where(buy, np.clip(invested_target - _shift(invested_target), 0, None), 0.0)
+
+    bought = order_value / price
+    if not fractional:
+        bought = np.where(order_value > 0, np.maximum(np.floor(bought), 1.0), 0.0)
+
+    shares = _segment_cumsum(bought, last_sell)  # Zero on sell bars
+    sold = np.where(sell, _shift(shares), 0.0)
+    buy_cost = bought * price
+    proceeds = sold * price
+    cash = initial_capital - np.cumsum(buy_cost, axis=1) + np.cumsum(proceeds, axis=1)
+    position_cost = _shift(_segment_cumsum(buy_cost, last_sell))
+
+    return {
+        'equity': cash + shares * price,
+        'shares': shares,
+        'bought': bought,
+        'sold': sold,
+        'pnl': np.where(sold > 0, proceeds - position_cost, 0.0)
+    }
+
+
+def _evaluate_chunk(prices: np.ndarray, composite: np.ndarray, params: np.ndarray,
+                    initial_capital: float, fractional: bool, periods_per_year: float) -> Dict[str, np.ndarray]:
+    """Summary metrics per parameter set for one chunk of the grid"""
+    result = simulate(prices, composite, params, initial_capital, fractional)
+    equity = result['equity']
+
+    running_peak = np.maximum.accumulate(equity, axis=1)
+    returns = equity[:, 1:] / equity[:, :-1] - 1
+    volatility = returns.std(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(params))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(volatility > 0, returns.mean(axis=1) / volatility * np.sqrt(periods_per_year), 0.0)
+
+    closed = (result['sold'] > 0).sum(axis=1)
+    wins = (result['pnl'] > 0).sum(axis=1)
+    return {
+        'final_value': equity[:, -1],
+        'total_return': (equity[:, -1] / initial_capital - 1) * 100,
+        'max_drawdown': (equity / running_peak - 1).min(axis=1) * 100,
+        'sharpe_ratio': sharpe,
+        'total_trades': (result['bought'] > 0).sum(axis=1) + closed,
+        'closed_positions': closed,
+        'win_rate': np.where(closed > 0, wins / np.maximum(closed, 1) * 100, 0.0),
+        'open_position': result['shares'][:, -1] > 0
+    }
+
+
+def run_parameter_sweep(prices: Sequence, composite: Sequence, grid: List[Dict],
+                        timestamps: Optional[Sequence] = None, initial_capital: float = 100000.0,
+                        fractional: bool = False, rank_by: str = 'sharpe_ratio',
+                        max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Backtest a grid of thresholds and sizing rules over one price/composite series
+
+    Args:
+        prices: Bar prices, oldest first
+        composite: Composite signal aligned with prices
+        grid: Parameter sets (see parameter_grid); risk_percent and max_position_pct default
+            to the live 2% / 10% rules
+        timestamps: Bar epoch timestamps, used to annualize the Sharpe ratio (daily if omitted)
+        initial_capital: Starting cash
+        fractional: Allow fractional quantities (crypto)
+        rank_by: Metric column to sort by, highest first
+        max_workers: Processes to spread the grid over (1 runs in the calling process)
+
+    Returns:
+        pd.DataFrame: One row per parameter set with its metrics, ranked by rank_by
+    """
+    prices = to_array(prices)
+    composite = to_array(composite)
+    if prices.shape != composite.shape or prices.size < 2:
+        raise ValueError("prices and composite must be aligned series of at least 2 bars")
+    if not grid:
+        raise ValueError("grid must contain at least one parameter set")
+
+    missing = [name for name in PARAMETERS[:2] if any(name not in params for params in grid)]
+    if missing:
+        raise ValueError(f"Every parameter set needs {', '.join(missing)}")
+    params = np.array([[{**DEFAULT_PARAMETERS, **p}[name] for name in PARAMETERS] for p in grid], dtype=float)
+
+    periods_per_year = infer_periods_per_year(timestamps)
+    chunk_size = max(1, MAX_CHUNK_CELLS // prices.size)
+    chunks = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+    max_workers = max_workers or min(len(chunks), os.cpu_count() or 1)
+
+    args = (initial_capital, fractional, periods_per_year)
+    if max_workers == 1 or len(chunks) == 1:
+        results = [_evaluate_chunk(prices, composite, chunk, *args) for chunk in chunks]
+    else:
+        # Spawned workers don't inherit the event loop or client threads of the caller
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_evaluate_chunk, prices, composite, chunk, *args) for chunk in chunks]
+            results = [future.result() for future in futures]
+    logger.info(f"Evaluated {len(params)} parameter sets over {prices.size} bars in {len(chunks)} chunks")
+
+    table = pd.DataFrame(params, columns=list(PARAMETERS))
+    for column in results[0]:
+        table[column] = np.concatenate([result[column] for result in results])
+    if rank_by not in table.columns:
+        raise ValueError(f"Unknown metric to rank by: {rank_by}")
+    # Every metric is better when higher (drawdowns are negative percentages)
+    return table.sort_values(rank_by, ascending=False, kind='stable').reset_index(drop=True)
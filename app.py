@@ -9,6 +9,12 @@ from services.chatbot import ChatbotService
 from services.portfolio import PortfolioService
 from routes import api
 from models import db, User
+from database import configure_database, init_database
+from services.jobs import job_queue
+from services import market_data
+from services.user_cache import user_cache
+from services.memory_writer import memory_writer
+from services.memory_retrieval import memory_retriever, is_memory_index
 
 # Load environment variables
 load_dotenv()
@@ -27,12 +33,31 @@ app.config['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
 db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database')
 os.makedirs(db_dir, exist_ok=True)
 db_path = os.path.join(db_dir, 'users.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite by default, or a server database through DATABASE_URL
+configure_database(app, db_path)
+app.config['JOB_QUEUE_DATABASE'] = os.path.join(db_dir, 'jobs.db')
+app.config['JOB_ARTIFACT_DIR'] = os.path.join(db_dir, 'job_artifacts')
 
-# Initialize database and migrations
-db.init_app(app)
-migrate = Migrate(app, db)
+# Initialize database (with per-connection tuning) and migrations
+init_database(app, db)
+# The full-text index over user_info is managed by its own migration, not autogenerate
+migrate = Migrate(app, db, include_object=is_memory_index)
+
+# Initialize background job queue for long-running reports
+job_queue.init_app(app)
+
+# Keep watched symbols' indicator state across restarts
+app.config['INDICATOR_STATE_PATH'] = os.path.join(db_dir, 'indicator_state.json')
+market_data.init_app(app)
+
+# Cache logged-in users so authenticated requests don't query the user table
+user_cache.init_app(app)
+
+# Write chatbot memories in batches in the background
+memory_writer.init_app(app)
+
+# Select relevant chatbot memories per message
+memory_retriever.init_app(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
@@ -44,7 +69,7 @@ chatbot = ChatbotService(os.getenv('OPENAI_API_KEY'))
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.get(int(user_id))
 
 # Routes
 @app.route('/')
@@ -143,9 +168,7 @@ def settings():
                 portfolio_service.alpaca.get_account_info()
                 
                 # Save credentials if test was successful
-                current_user.alpaca_api_key = alpaca_api_key
-                current_user.alpaca_secret_key = alpaca_secret_key
-                db.session.commit()
+                current_user.save_alpaca_credentials(alpaca_api_key, alpaca_secret_key)
                 
                 flash('API credentials updated and validated successfully')
                 return redirect(url_for('settings'))
@@ -0,0 +1,71 @@
+import os
+from typing import Dict
+from sqlalchemy import event
+
+# Applied to every new SQLite connection: WAL lets readers and a writer run concurrently,
+# NORMAL sync is durable in WAL mode at far fewer fsyncs, and writers wait on locks
+# instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # milliseconds
+    'mmap_size': 256 * 1024 * 1024,  # bytes of the database file read through mmap
+    'temp_store': 'MEMORY'
+}
+
+
+def database_url(default_sqlite_path: str) -> str:
+    """DATABASE_URL from the environment (e.g. a PostgreSQL server), else the local SQLite file"""
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        return f'sqlite:///{default_sqlite_path}'
+    # Some hosts still hand out the scheme SQLAlchemy dropped
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url: str) -> Dict:
+    """Connection pool settings for the database URL (overridable through DB_* variables)"""
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30))
+    }
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+            # In-memory databases live in a single connection
+            return {}
+        # Connections are pooled across request threads; SQLite's own wait covers lock contention
+        options['connect_args'] = {'check_same_thread': False, 'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000}
+    else:
+        # Server connections can be dropped while idle in the pool
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    return options
+
+
+def configure_database(app, default_sqlite_path: str):
+    """Set the SQLAlchemy URI and engine options on the app config"""
+    url = database_url(default_sqlite_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_database(app, db):
+    """Initialize Flask-SQLAlchemy and hook SQLite tuning into every new connection"""
+    db.init_app(app)
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _apply_sqlite_pragmas)
@@ -0,0 +1,28 @@
+"""add user info indexes
+
+Revision ID: 7c41d2e9a0f3
+Revises: bce9aa1a4911
+Create Date: 2026-10-18 09:12:45.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41d2e9a0f3'
+down_revision = 'bce9aa1a4911'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_info', schema=None) as batch_op:
+        batch_op.create_index('ix_user_info_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_user_info_user_id_info_type_created_at', ['user_id', 'info_type', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_info', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_info_user_id_info_type_created_at')
+        batch_op.drop_index('ix_user_info_user_id_created_at')
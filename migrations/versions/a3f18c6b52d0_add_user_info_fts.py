@@ -0,0 +1,57 @@
+"""add user info full-text index
+
+Revision ID: a3f18c6b52d0
+Revises: 7c41d2e9a0f3
+Create Date: 2026-10-18 14:37:02.581940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f18c6b52d0'
+down_revision = '7c41d2e9a0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        # Memory retrieval falls back to scoring in Python on other databases
+        return
+    try:
+        op.execute(
+            "CREATE VIRTUAL TABLE user_info_fts USING fts5("
+            "content, info_type UNINDEXED, content='user_info', content_rowid='id', tokenize='porter unicode61')"
+        )
+    except sa.exc.OperationalError:
+        # SQLite built without FTS5
+        return
+    # Keep the external-content index in sync with user_info
+    op.execute(
+        "CREATE TRIGGER user_info_fts_insert AFTER INSERT ON user_info BEGIN "
+        "INSERT INTO user_info_fts(rowid, content, info_type) VALUES (new.id, new.content, new.info_type); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_info_fts_delete AFTER DELETE ON user_info BEGIN "
+        "INSERT INTO user_info_fts(user_info_fts, rowid, content, info_type) "
+        "VALUES ('delete', old.id, old.content, old.info_type); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_info_fts_update AFTER UPDATE ON user_info BEGIN "
+        "INSERT INTO user_info_fts(user_info_fts, rowid, content, info_type) "
+        "VALUES ('delete', old.id, old.content, old.info_type); "
+        "INSERT INTO user_info_fts(rowid, content, info_type) VALUES (new.id, new.content, new.info_type); END"
+    )
+    op.execute("INSERT INTO user_info_fts(user_info_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS user_info_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS user_info_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS user_info_fts_insert")
+    op.execute("DROP TABLE IF EXISTS user_info_fts")
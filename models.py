@@ -26,9 +26,43 @@ class User(UserMixin, db.Model):
     def has_alpaca_credentials(self):
         return bool(self.alpaca_api_key and self.alpaca_secret_key)
 
-    def get_stored_info(self):
-        """Get all stored information for the user"""
-        return UserInfo.query.filter_by(user_id=self.id).order_by(UserInfo.created_at.desc()).all()
+    def stored_info_query(self, category=None, before_id=None):
+        """
+        Query for the user's stored information, newest first
+
+        Filtering and ordering are served by the (user_id, [info_type,] created_at) indexes.
+        before_id continues after an item of a previous page (keyset pagination), so deep
+        pages cost the same as the first one.
+        """
+        query = UserInfo.query.filter(UserInfo.user_id == self.id)
+        if category:
+            query = query.filter(UserInfo.info_type == category)
+        if before_id is not None:
+            cursor = db.session.query(UserInfo.created_at, UserInfo.id).filter(
+                UserInfo.id == before_id, UserInfo.user_id == self.id
+            ).first()
+            if cursor is not None:
+                query = query.filter(db.or_(
+                    UserInfo.created_at < cursor.created_at,
+                    db.and_(UserInfo.created_at == cursor.created_at, UserInfo.id < cursor.id)
+                ))
+        return query.order_by(UserInfo.created_at.desc(), UserInfo.id.desc())
+
+    def get_stored_info(self, category=None, limit=None, offset=0, before_id=None):
+        """Get stored information for the user, optionally one category and one page of it"""
+        query = self.stored_info_query(category=category, before_id=before_id)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def count_stored_info(self, category=None):
+        """Number of stored information items (optionally of one category)"""
+        query = db.session.query(db.func.count(UserInfo.id)).filter(UserInfo.user_id == self.id)
+        if category:
+            query = query.filter(UserInfo.info_type == category)
+        return query.scalar()
 
 class UserInfo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -41,5 +75,12 @@ class UserInfo(db.Model):
     # Add relationship to User model
     user = db.relationship('User', backref=db.backref('important_info', lazy=True))
 
+    __table_args__ = (
+        # Per-user listings, newest first (the leading user_id also serves plain user_id lookups)
+        db.Index('ix_user_info_user_id_created_at', 'user_id', 'created_at'),
+        # Per-user listings of one category
+        db.Index('ix_user_info_user_id_info_type_created_at', 'user_id', 'info_type', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<UserInfo {self.info_type}: {self.content[:30]}...>'
@@ -1,13 +1,18 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, send_file, url_for
 from flask_login import current_user, login_required
 from models import db, User
 import alpaca_trade_api as tradeapi
 from services.portfolio import PortfolioService
 import re
+import base64
 from datetime import datetime, timedelta
 import pytz
 from dateutil.relativedelta import relativedelta
-from services.chatbot import ChatbotService
+from services.chatbot import ChatbotService, REPORT_FORMATS
+from services.jobs import job_queue, JobQueue
+from services.trading import TradingService
+from services.rebalancing import RebalancingService, parse_bool, normalize_targets, run_rebalance_job
+from services.market_data import MarketDataService
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import (
     MarketOrderRequest,
@@ -193,31 +198,45 @@ def get_analysis():
         if not portfolio_service:
             return jsonify({'error': 'Alpaca API credentials not set'}), 401
 
+        # Either a single symbol or a comma-separated list of symbols
         symbol = request.args.get('symbol')
-        if not symbol:
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        if not symbol and not symbols:
             return jsonify({'error': 'Symbol parameter is required'}), 400
 
         try:
-            # Get latest quote
-            quote = portfolio_service.alpaca.data_client.get_stock_latest_quote(symbol)
-            current_price = float(quote.ask_price)
-
-            # Get technical indicators
-            analysis = {
-                'symbol': symbol,
-                'current_price': current_price,
-                'indicators': {
-                    'price': current_price,
-                    'change_24h': quote.ask_price - quote.bid_price,
-                    'volume': quote.ask_size,
-                }
-            }
-            
-            return jsonify(analysis), 200
+            # Get latest quotes in one batched request
+            quotes = portfolio_service.alpaca.get_latest_quotes(symbols or [symbol])
+            market_data = MarketDataService(portfolio_service.alpaca)
+
+            analyses = []
+            for quote in quotes.values():
+                current_price = quote['ask_price']
+
+                # Get technical indicators (daily bars are cached after the first request)
+                technical = market_data.get_technical_indicators(quote['symbol']) or {}
+                analyses.append({
+                    'symbol': quote['symbol'],
+                    'current_price': current_price,
+                    'indicators': {
+                        'price': current_price,
+                        'change_24h': quote['ask_price'] - quote['bid_price'],
+                        'volume': quote['ask_size'],
+                        **{name: value for name, value in technical.items() if name not in ('price', 'volume')}
+                    }
+                })
+
+            if symbols:
+                missing = [s for s in symbols if s not in quotes]
+                return jsonify({'analyses': analyses, 'missing': missing}), 200
+
+            if not analyses:
+                return jsonify({'error': f'Failed to analyze {symbol}'}), 500
+            return jsonify(analyses[0]), 200
             
         except Exception as e:
-            current_app.logger.error(f"Error analyzing {symbol}: {str(e)}")
-            return jsonify({'error': f'Failed to analyze {symbol}'}), 500
+            current_app.logger.error(f"Error analyzing {symbols or symbol}: {str(e)}")
+            return jsonify({'error': f'Failed to analyze {symbols or symbol}'}), 500
 
     except Exception as e:
         current_app.logger.error(f"Error in get_analysis: {str(e)}")
@@ -298,6 +317,83 @@ def place_trade():
         current_app.logger.error(f"Error placing trade: {str(e)}")
         return jsonify({'error': 'Failed to place trade'}), 500
 
+@api.route('/portfolio/orders/batch', methods=['POST'])
+@login_required
+def submit_batch_orders():
+    try:
+        portfolio_service = get_portfolio_service()
+        if not portfolio_service:
+            return jsonify({'error': 'Alpaca API credentials not set'}), 401
+
+        data = request.get_json() or {}
+        orders = data.get('orders')
+        if not orders or not isinstance(orders, list):
+            return jsonify({'error': 'orders must be a non-empty list'}), 400
+
+        max_concurrency = min(max(int(data.get('max_concurrency', 8)), 1), 16)
+        result = TradingService(portfolio_service.alpaca).submit_orders(orders, max_concurrency=max_concurrency)
+
+        # Nothing is sent when any order fails validation
+        if any(order['status'] == 'invalid' for order in result['results']):
+            return jsonify(result), 400
+        return jsonify(result), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error placing batch orders: {str(e)}")
+        return jsonify({'error': 'Failed to place orders'}), 500
+
+@api.route('/portfolio/rebalance', methods=['POST'])
+@login_required
+def rebalance_portfolio():
+    try:
+        portfolio_service = get_portfolio_service()
+        if not portfolio_service:
+            return jsonify({'error': 'Alpaca API credentials not set'}), 401
+
+        data = request.get_json() or {}
+        targets = data.get('target_weights')
+        if not targets or not isinstance(targets, dict):
+            return jsonify({'error': 'target_weights must map symbols to weights in percent'}), 400
+
+        try:
+            normalize_targets(targets)
+            options = {
+                'max_concurrency': min(max(int(data.get('max_concurrency', 8)), 1), 16),
+                'liquidate_unlisted': parse_bool(data.get('liquidate_unlisted'), False),
+                'min_trade_value': float(data.get('min_trade_value', 1.0)),
+                'cash_buffer': float(data.get('cash_buffer', 0.0))
+            }
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if parse_bool(data.get('dry_run'), True):
+            try:
+                result = RebalancingService(portfolio_service.alpaca).rebalance(targets, dry_run=True, **options)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(result), 200
+
+        # A live rebalance waits for its sells to fill before buying, so it runs in the background
+        job_id = job_queue.submit(
+            'rebalance',
+            run_rebalance_job,
+            current_user.alpaca_api_key,
+            current_user.alpaca_secret_key,
+            targets,
+            user_id=current_user.id,
+            **options
+        )
+        current_app.logger.info(f"Queued rebalance job {job_id} for user {current_user.id}")
+        return jsonify({
+            'job_id': job_id,
+            'status': JobQueue.QUEUED,
+            'status_url': url_for('api.get_job_status', job_id=job_id)
+        }), 202
+
+    except Exception as e:
+        current_app.logger.error(f"Error rebalancing portfolio: {str(e)}")
+        return jsonify({'error': 'Failed to rebalance portfolio'}), 500
+
 def get_timeframe_params(timeframe, period):
     """Helper function to calculate start and end dates based on timeframe and period"""
     end_date = datetime.now(pytz.UTC)
@@ -372,6 +468,17 @@ def get_portfolio_history():
         current_app.logger.error(f"Error in get_portfolio_history: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+def encode_attachment(response_data):
+    """Helper function to base64-encode a binary attachment so the response can be serialized as JSON"""
+    if response_data.get('has_attachment') and response_data.get('attachment'):
+        attachment = response_data['attachment']
+        if isinstance(attachment.get('data'), bytes):
+            attachment['data'] = base64.b64encode(attachment['data']).decode('utf-8')
+        current_app.logger.info('Attachment data encoded successfully')
+    else:
+        current_app.logger.warning('No attachment data found in response')
+    return response_data
+
 @api.route('/chat/analyze_performance', methods=['GET'])
 @login_required
 def analyze_performance():
@@ -380,48 +487,79 @@ def analyze_performance():
         if not portfolio_service:
             return jsonify({'error': 'Alpaca API credentials not set'}), 401
 
+        chatbot = ChatbotService(current_app.config['OPENAI_API_KEY'])
         chatbot.initialize_portfolio_service(
             current_user.alpaca_api_key,
             current_user.alpaca_secret_key
         )
         
-        analysis = chatbot.analyze_portfolio_performance()
+        analysis = encode_attachment(chatbot.analyze_portfolio_performance())
         return jsonify({'analysis': analysis}), 200
 
     except Exception as e:
         current_app.logger.error(f"Error analyzing performance: {str(e)}")
         return jsonify({'error': 'Failed to analyze performance'}), 500
 
+def run_performance_report_job(job, openai_api_key, alpaca_api_key, alpaca_secret_key, export_format='xlsx'):
+    """Background job building the portfolio performance report and its file export"""
+    job.update_progress(5, "🔑 Connecting to your Alpaca account...")
+    chatbot = ChatbotService(openai_api_key)
+    chatbot.initialize_portfolio_service(alpaca_api_key, alpaca_secret_key)
+
+    # Analysis progress is mapped onto 5-90% of the job
+    response_data = chatbot.analyze_portfolio_performance(
+        progress_callback=lambda percent, message: job.update_progress(5 + percent * 0.85, message),
+        include_attachment=False
+    )
+
+    artifact = None
+    if response_data.get('performance_data'):
+        job.update_progress(92, "📊 Writing report file...")
+        extension, content_type = REPORT_FORMATS[export_format]
+        filename = f"portfolio_performance_{datetime.now(pytz.UTC).strftime('%Y-%m-%d')}.{extension}"
+        path = chatbot.export_performance_report(
+            response_data['performance_data'],
+            response_data['asset_performance'],
+            job.artifact_path(filename),
+            export_format
+        )
+        artifact = {
+            'path': path,
+            'filename': filename,
+            'content_type': content_type
+        }
+
+    return {'result': response_data, 'artifact': artifact}
+
 @api.route('/portfolio/performance', methods=['POST'])
 @login_required
 def analyze_portfolio_performance():
-    """Analyze portfolio performance with progress updates"""
+    """Queue a portfolio performance report and return the job id immediately"""
     try:
-        portfolio_service = get_portfolio_service()
-        if not portfolio_service:
+        if not current_user.has_alpaca_credentials():
             return jsonify({'error': 'Alpaca API credentials not set'}), 401
 
-        # Initialize chatbot with portfolio service
-        chatbot = ChatbotService(current_app.config['OPENAI_API_KEY'])
-        chatbot.initialize_portfolio_service(
+        data = request.get_json(silent=True) or {}
+        export_format = (request.args.get('format') or data.get('format') or 'xlsx').lower()
+        if export_format not in REPORT_FORMATS:
+            return jsonify({'error': f"Unsupported format. Use one of: {', '.join(REPORT_FORMATS)}"}), 400
+
+        job_id = job_queue.submit(
+            'performance_report',
+            run_performance_report_job,
+            current_app.config['OPENAI_API_KEY'],
             current_user.alpaca_api_key,
-            current_user.alpaca_secret_key
+            current_user.alpaca_secret_key,
+            export_format,
+            user_id=current_user.id
         )
-        
-        # Get the analysis with progress updates
-        response_data = chatbot.analyze_portfolio_performance()
-        
-        # If there's an attachment, encode it as base64
-        if response_data.get('has_attachment') and response_data.get('attachment'):
-            import base64
-            attachment = response_data['attachment']
-            if isinstance(attachment.get('data'), bytes):
-                attachment['data'] = base64.b64encode(attachment['data']).decode('utf-8')
-            current_app.logger.info('Attachment data encoded successfully')
-        else:
-            current_app.logger.warning('No attachment data found in response')
-        
-        return jsonify(response_data)
+        current_app.logger.info(f"Queued performance report job {job_id} for user {current_user.id}")
+
+        return jsonify({
+            'job_id': job_id,
+            'status': JobQueue.QUEUED,
+            'status_url': url_for('api.get_job_status', job_id=job_id)
+        }), 202
 
     except Exception as e:
         current_app.logger.error(f"Error analyzing performance: {str(e)}")
@@ -430,6 +568,49 @@ def analyze_portfolio_performance():
             'details': str(e)
         }), 500
 
+@api.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    """Poll the progress of a background job"""
+    job = job_queue.get(job_id, user_id=current_user.id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    response_data = {
+        'job_id': job['id'],
+        'type': job['job_type'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+    if job['status'] == JobQueue.COMPLETED:
+        response_data['result'] = job['result']
+        if job['has_artifact']:
+            response_data['download_url'] = url_for('api.download_job_artifact', job_id=job_id)
+    elif job['status'] == JobQueue.FAILED:
+        response_data['error'] = job['error']
+
+    return jsonify(response_data), 200
+
+@api.route('/jobs/<job_id>/download', methods=['GET'])
+@login_required
+def download_job_artifact(job_id):
+    """Stream the finished artifact of a background job as a binary download"""
+    job = job_queue.get(job_id, user_id=current_user.id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != JobQueue.COMPLETED or not job['has_artifact']:
+        return jsonify({'error': 'No artifact available for this job'}), 409
+
+    return send_file(
+        job['artifact_path'],
+        mimetype=job['content_type'],
+        as_attachment=True,
+        download_name=job['artifact_name']
+    )
+
 @api.route('/chat', methods=['POST'])
 @login_required
 def chat():
@@ -471,17 +652,29 @@ def chat():
 @api.route('/user/important-info', methods=['GET'])
 @login_required
 def get_user_important_info():
-    """Get all important information stored for the user"""
+    """Get important information stored for the user (optionally one category, one page at a time)"""
     try:
         category = request.args.get('category')
-        info_items = current_user.get_stored_info()
-        
-        # Filter by category if specified
-        if category:
-            info_items = [item for item in info_items if item.info_type == category]
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        before_id = request.args.get('before', type=int)
+        if (limit is not None and limit <= 0) or offset < 0:
+            return jsonify({'success': False, 'error': 'limit must be positive and offset non-negative'}), 400
+
+        # Filtering and paging happen in SQL; one extra row tells whether there is another page
+        info_items = current_user.get_stored_info(
+            category=category,
+            limit=limit + 1 if limit is not None else None,
+            offset=offset,
+            before_id=before_id
+        )
+        has_more = limit is not None and len(info_items) > limit
+        if has_more:
+            info_items = info_items[:limit]
         
         # Format the response
         formatted_info = [{
+            'id': item.id,
             'type': item.info_type,
             'content': item.content,
             'created_at': item.created_at.isoformat(),
@@ -490,10 +683,19 @@ def get_user_important_info():
         
         current_app.logger.info(f"Retrieved {len(formatted_info)} important info items for user {current_user.id}")
         
-        return jsonify({
+        response = {
             'success': True,
             'data': formatted_info
-        }), 200
+        }
+        if limit is not None:
+            response['pagination'] = {
+                'limit': limit,
+                'offset': offset,
+                'has_more': has_more,
+                # Pass as ?before= to fetch the next page without an offset scan
+                'next_before': formatted_info[-1]['id'] if has_more else None
+            }
+        return jsonify(response), 200
         
     except Exception as e:
         current_app.logger.error(f"Error retrieving important info: {str(e)}")
@@ -2,12 +2,40 @@ import openai
 from typing import Dict, Any, Optional, List
 import json
 import re
-from datetime import datetime
+import copy
+import csv
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytz
 import yfinance as yf
 from services.portfolio import PortfolioService
 from services.yahoo_finance import YahooFinanceService
+from alpaca_service.analytics import compute_performance_metrics, align_series, returns_since
+
+# Timeframes covered by the performance report, in display order
+PERFORMANCE_TIMEFRAMES = ['1D', '1W', '1M', '3M', '1Y']
+# Timeframes whose portfolio history is sampled daily and can be compared bar-by-bar to the benchmark
+DAILY_TIMEFRAMES = {'1M', '3M', '1Y'}
+BENCHMARK_SYMBOL = '^GSPC'
+# Export formats for the performance report: extension and content type
+REPORT_FORMATS = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+PERFORMANCE_ROW_COLUMNS = [
+    'section', 'timeframe', 'symbol', 'weight_pct', 'return_pct',
+    'benchmark_return_pct', 'start_value', 'end_value'
+]
 
 class ChatbotService:
+    # Performance reports shared across instances, keyed by (account, trading day)
+    _performance_cache = {}
+    _performance_cache_lock = threading.Lock()
+
     def __init__(self, api_key: str):
         from openai import OpenAI  # Import at function level
         self.client = OpenAI(
@@ -255,10 +283,13 @@ class ChatbotService:
                 "content": user_message
             })
 
+            # The user's saved facts relevant to this message, for this turn only
+            memory_message = self._relevant_memories(user, user_message)
+
             # Get initial response from OpenAI
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=self.conversation_history,
+                messages=self._prompt_messages(memory_message),
                 temperature=0.7,
                 max_tokens=1800
             )
@@ -276,7 +307,7 @@ class ChatbotService:
                         print(f"Detected tool command: {tool_command}")  # Debug log
                         
                         # Get tool response
-                        tool_response = self._handle_tool_command(tool_command)
+                        tool_response = self._handle_tool_command(tool_command, user)
                         
                         # Add tool result to conversation for context
                         self.conversation_history.append({
@@ -287,7 +318,7 @@ class ChatbotService:
                         # Get final analysis from OpenAI
                         final_response = self.client.chat.completions.create(
                             model=self.model,
-                            messages=self.conversation_history,
+                            messages=self._prompt_messages(memory_message),
                             temperature=0.7,
                             max_tokens=1500
                         )
@@ -321,8 +352,25 @@ class ChatbotService:
                 "error": True
             }
 
-    def _handle_tool_command(self, command: str) -> Dict:
-        """Handle tool commands from the chatbot"""
+    def _relevant_memories(self, user, user_message: str) -> Optional[Dict]:
+        """System message with the user's stored facts most relevant to the message, if any"""
+        if user is None or not user.is_authenticated:
+            return None
+        try:
+            from services.memory_retrieval import memory_retriever
+            return memory_retriever.context_message(user.id, user_message)
+        except Exception as e:
+            print(f"Error retrieving user memories: {str(e)}")
+            return None
+
+    def _prompt_messages(self, memory_message: Optional[Dict] = None) -> List[Dict]:
+        """Conversation history with the retrieved memories right after the system prompt"""
+        if memory_message is None:
+            return self.conversation_history
+        return self.conversation_history[:1] + [memory_message] + self.conversation_history[1:]
+
+    def _handle_tool_command(self, command: str, user=None) -> Dict:
+        """Handle tool commands from the chatbot (user is the one chatting, needed to save memories)"""
         try:
             print(f"Processing tool command: {command}")
             parts = command.split(":")
@@ -432,88 +480,29 @@ class ChatbotService:
                 content = parts[3]
                 
                 try:
-                    # Import necessary modules
-                    from flask import current_app
-                    from flask_login import current_user
-                    from models import UserInfo, db
-                    
+                    from services.memory_writer import memory_writer
+
                     print(f"[IMPORTANT_INFO] Starting process for info_type: {info_type}")
                     print(f"[IMPORTANT_INFO] Content to store: {content}")
-                    
-                    # Check user authentication
-                    if not current_user:
-                        print("[IMPORTANT_INFO] Error: current_user object is None")
-                        return {
-                            "response": "Cannot save user information - no user context found",
-                            "requires_action": True
-                        }
-                        
-                    if not current_user.is_authenticated:
-                        print("[IMPORTANT_INFO] Error: User is not authenticated")
+
+                    if user is None or not user.is_authenticated:
+                        print("[IMPORTANT_INFO] Error: No authenticated user")
                         return {
                             "response": "Cannot save user information - user not authenticated",
                             "requires_action": True
                         }
-                        
-                    print(f"[IMPORTANT_INFO] User authenticated successfully. User ID: {current_user.id}")
-                    
-                    # Create new UserInfo instance
-                    try:
-                        new_info = UserInfo(
-                            user_id=current_user.id,
-                            info_type=info_type,
-                            content=content
-                        )
-                        print(f"[IMPORTANT_INFO] Created new UserInfo instance for user {current_user.id}")
-                    except Exception as e:
-                        print(f"[IMPORTANT_INFO] Error creating UserInfo instance: {str(e)}")
-                        raise
-                    
-                    # Verify app context
-                    if not current_app:
-                        print("[IMPORTANT_INFO] Error: No Flask app context")
-                        return {
-                            "response": "Server configuration error - no app context",
-                            "requires_action": False
-                        }
-                    
-                    print("[IMPORTANT_INFO] Starting database operation...")
-                    # Add and commit to database within app context
-                    try:
-                        with current_app.app_context():
-                            print("[IMPORTANT_INFO] Entered app context")
-                            
-                            # Verify database session
-                            if not db.session:
-                                print("[IMPORTANT_INFO] Error: No database session available")
-                                return {
-                                    "response": "Database error - no session available",
-                                    "requires_action": False
-                                }
-                            
-                            print("[IMPORTANT_INFO] Adding to database session...")
-                            db.session.add(new_info)
-                            
-                            print("[IMPORTANT_INFO] Committing to database...")
-                            db.session.commit()
-                            
-                            print(f"[IMPORTANT_INFO] Successfully stored info for user {current_user.id}")
-                            
-                            return {
-                                "response": f"✅ I've noted this important information about your {info_type}.",
-                                "data": {"type": info_type, "content": content}
-                            }
-                            
-                    except Exception as e:
-                        print(f"[IMPORTANT_INFO] Database operation error: {str(e)}")
-                        # Attempt to rollback on error
-                        try:
-                            db.session.rollback()
-                            print("[IMPORTANT_INFO] Session rolled back after error")
-                        except Exception as rollback_error:
-                            print(f"[IMPORTANT_INFO] Rollback failed: {str(rollback_error)}")
-                        raise
-                        
+
+                    # Written in the background by the memory writer, off the response path
+                    if memory_writer.enqueue(user.id, info_type, content):
+                        print(f"[IMPORTANT_INFO] Queued info for user {user.id}")
+                    else:
+                        print(f"[IMPORTANT_INFO] Duplicate info already queued for user {user.id}")
+
+                    return {
+                        "response": f"✅ I've noted this important information about your {info_type}.",
+                        "data": {"type": info_type, "content": content}
+                    }
+
                 except Exception as e:
                     print(f"[IMPORTANT_INFO] Critical error in information storage: {str(e)}")
                     return {
@@ -640,71 +629,349 @@ class ChatbotService:
         """Clear the conversation history"""
         self.conversation_history = [self.conversation_history[0]]  # Keep only the initial system message
 
+    def analyze_portfolio_performance(self, force_refresh: bool = False, progress_callback=None,
+                                      include_attachment: bool = True) -> Dict[str, Any]:
+        """
+        Analyze portfolio performance for every timeframe against the S&P 500
+
+        Portfolio history for all timeframes, the benchmark and per-asset bars are fetched
+        concurrently, metrics are computed with the vectorized analytics module and the
+        report is cached per account for the current trading day.
+
+        Args:
+            force_refresh: Ignore any cached report for today
+            progress_callback: Optional callable receiving (percent, message) updates
+            include_attachment: Attach the Excel report bytes (callers exporting to a file
+                should pass False and use export_performance_report instead)
+
+        Returns:
+            Dict with the chat response, per-timeframe performance_data, asset_performance
+            and optionally the Excel report as an attachment
+        """
+        if not self.portfolio_service:
+            return {
+                "response": "I need access to your Alpaca trading account to analyze your portfolio performance. "
+                           "Please make sure your credentials are set up in the settings page.",
+                "requires_action": True
+            }
+
+        progress_messages = []
+
+        def report_progress(percent, message):
+            progress_messages.append(message)
+            if progress_callback:
+                progress_callback(percent, message)
+
+        alpaca = self.portfolio_service.alpaca
+        trading_day = self._current_trading_day()
+        cache_key = (alpaca.api_key, trading_day)
+        if not force_refresh:
+            with self._performance_cache_lock:
+                cached = self._performance_cache.get(cache_key)
+            if cached:
+                print("Serving cached portfolio performance report")
+                result = copy.deepcopy(cached)
+                result["progress_messages"] = progress_messages
+                if include_attachment:
+                    self._attach_performance_excel(result, trading_day)
+                report_progress(100, "✅ Loaded today's performance report")
+                return result
+
+        positions = self.portfolio_service.positions
+        if positions is None:
+            positions = self.portfolio_service.get_positions()
+        symbols = [position['symbol'] for position in positions]
+
+        report_progress(10, "📥 Fetching portfolio history, S&P 500 and asset prices...")
+        histories = {}
+        with ThreadPoolExecutor(max_workers=len(PERFORMANCE_TIMEFRAMES) + 2) as executor:
+            history_futures = {
+                timeframe: executor.submit(alpaca.get_portfolio_history, timeframe=timeframe)
+                for timeframe in PERFORMANCE_TIMEFRAMES
+            }
+            benchmark_future = executor.submit(self._fetch_benchmark_closes)
+            bars_future = executor.submit(
+                alpaca.get_stock_bars, symbols, datetime.now(pytz.UTC) - timedelta(days=400)
+            )
+
+            for timeframe, future in history_futures.items():
+                try:
+                    histories[timeframe] = future.result()
+                except Exception as e:
+                    print(f"Error fetching {timeframe} portfolio history: {str(e)}")
+            try:
+                benchmark_ts, benchmark_closes = benchmark_future.result()
+            except Exception as e:
+                print(f"Error fetching benchmark data: {str(e)}")
+                benchmark_ts, benchmark_closes = [], []
+            try:
+                asset_bars = bars_future.result()
+            except Exception as e:
+                print(f"Error fetching asset bars: {str(e)}")
+                asset_bars = {}
+
+        report_progress(60, "🧮 Computing performance metrics...")
+        timeframes = [tf for tf in PERFORMANCE_TIMEFRAMES if histories.get(tf, {}).get('timestamp')]
+        window_starts = [histories[tf]['timestamp'][0] for tf in timeframes]
+
+        benchmark_returns = returns_since(benchmark_ts, benchmark_closes, window_starts)
+        asset_returns = {}
+        for position in positions:
+            bars = asset_bars.get(position['symbol'], [])
+            returns = returns_since(
+                [bar['timestamp'].timestamp() for bar in bars],
+                [bar['close'] for bar in bars],
+                window_starts
+            )
+            asset_returns[position['symbol']] = {
+                # Intraday asset moves come from the position itself rather than daily bars
+                tf: position.get('change_today') if tf == '1D' else self._optional_float(ret)
+                for tf, ret in zip(timeframes, returns)
+            }
+
+        performance_data = {}
+        for timeframe, benchmark_return in zip(timeframes, benchmark_returns):
+            history = histories[timeframe]
+            benchmark = None
+            if timeframe in DAILY_TIMEFRAMES and benchmark_ts:
+                benchmark = align_series(history['timestamp'], benchmark_ts, benchmark_closes)
+            metrics = compute_performance_metrics(
+                history['equity'],
+                timestamps=history['timestamp'],
+                benchmark=benchmark,
+                base_value=history.get('base_value')
+            )
+            if not metrics:
+                continue
+            performance_data[timeframe] = {
+                'portfolio_return': metrics['total_return'],
+                'benchmark_return': self._optional_float(benchmark_return),
+                'start_value': metrics['start_value'],
+                'end_value': metrics['end_value'],
+                'asset_returns': {symbol: returns.get(timeframe) for symbol, returns in asset_returns.items()},
+                'metrics': metrics
+            }
+
+        allocation = alpaca.calculate_asset_allocation(positions)
+        asset_performance = {
+            position['symbol']: {
+                'weight': allocation.get(position['symbol'], 0),
+                'market_value': position['market_value'],
+                'unrealized_pl': position['unrealized_pl'],
+                'unrealized_plpc': position['unrealized_plpc'],
+                'returns': asset_returns[position['symbol']]
+            }
+            for position in positions
+        }
+
+        result = {
+            "response": self._format_performance_analysis(performance_data, asset_performance),
+            "requires_action": False,
+            "progress_messages": progress_messages,
+            "performance_data": performance_data,
+            "asset_performance": asset_performance,
+            "has_attachment": False
+        }
+        with self._performance_cache_lock:
+            # Only today's reports stay cached
+            for key in [k for k in self._performance_cache if k[1] != trading_day]:
+                del self._performance_cache[key]
+            self._performance_cache[cache_key] = copy.deepcopy(result)
+
+        if include_attachment:
+            report_progress(85, "📊 Building Excel report...")
+            self._attach_performance_excel(result, trading_day)
+
+        report_progress(100, "✅ Performance analysis complete")
+        return result
+
+    def _attach_performance_excel(self, result: Dict[str, Any], trading_day: str):
+        """Attach the Excel report to an analysis result"""
+        if not result.get("performance_data"):
+            return
+        try:
+            extension, content_type = REPORT_FORMATS['xlsx']
+            result["attachment"] = {
+                "data": self._generate_performance_excel(result["performance_data"], result["asset_performance"]),
+                "filename": f"portfolio_performance_{trading_day}.{extension}",
+                "content_type": content_type
+            }
+            result["has_attachment"] = True
+        except Exception as e:
+            print(f"Error attaching performance report: {str(e)}")
+
+    def _current_trading_day(self) -> str:
+        """Current date on the US equity market clock"""
+        return datetime.now(pytz.timezone('America/New_York')).date().isoformat()
+
+    def _fetch_benchmark_closes(self):
+        """Fetch one year of daily S&P 500 closes as (epoch timestamps, closes)"""
+        hist = yf.Ticker(BENCHMARK_SYMBOL).history(period='1y', interval='1d')
+        if hist.empty:
+            return [], []
+        timestamps = (hist.index.tz_convert('UTC').tz_localize(None).astype('int64') // 10**9).tolist()
+        return timestamps, hist['Close'].tolist()
+
+    @staticmethod
+    def _optional_float(value) -> Optional[float]:
+        """Convert NaN results into None for JSON and Excel output"""
+        if value is None or value != value:
+            return None
+        return float(value)
+
+    def _format_performance_analysis(self, performance_data: Dict, asset_performance: Dict) -> str:
+        """Format the multi-timeframe performance analysis into a user-friendly response"""
+        if not performance_data:
+            return "No performance data available."
+
+        response = ["📈 Portfolio Performance Analysis:\n"]
+        for timeframe, data in performance_data.items():
+            metrics = data['metrics']
+            benchmark = f"{data['benchmark_return']:+.2f}%" if data['benchmark_return'] is not None else "N/A"
+            response.extend([
+                f"🔸 {timeframe}: {data['portfolio_return']:+.2f}% (S&P 500: {benchmark})",
+                f"   Max Drawdown: {metrics['max_drawdown']:.2f}% | Volatility: {metrics['volatility']:.2f}% | "
+                f"Sharpe: {metrics['sharpe_ratio']:.2f}"
+            ])
+
+        longest = list(performance_data)[-1]
+        ranked = sorted(
+            ((symbol, ret) for symbol, ret in performance_data[longest]['asset_returns'].items() if ret is not None),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        if ranked:
+            response.append(f"\nAsset Returns ({longest}):")
+            for symbol, ret in ranked:
+                response.append(f"• {symbol}: {ret:+.2f}% ({asset_performance[symbol]['weight']:.1f}% of positions)")
+
+        response.append("\nNote: Past performance does not guarantee future results.")
+        return "\n".join(response)
+
     def _generate_performance_excel(self, performance_data, asset_performance):
         """Generate an Excel file containing the performance analysis data"""
         try:
-            import pandas as pd
-            import io
-
-            output = io.BytesIO()
-            
-            # Create a Pandas Excel writer
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Summary sheet
-                summary_data = []
-                for timeframe, data in performance_data.items():
-                    summary_data.append({
-                        'Timeframe': timeframe,
-                        'Portfolio Return (%)': data['portfolio_return'],
-                        'S&P 500 Return (%)': data['benchmark_return'] if data['benchmark_return'] is not None else 'N/A',
-                        'Start Value ($)': data['start_value'],
-                        'End Value ($)': data['end_value']
-                    })
-                
-                if summary_data:
-                    summary_df = pd.DataFrame(summary_data)
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Asset Performance sheet for each timeframe
-                for timeframe, data in performance_data.items():
-                    asset_data = []
-                    for symbol, return_value in data['asset_returns'].items():
-                        weight = asset_performance[symbol]['weight']
-                        asset_data.append({
-                            'Symbol': symbol,
-                            'Weight (%)': weight,
-                            f'Return ({timeframe}) (%)': return_value if return_value is not None else 'N/A'
-                        })
-                    
-                    if asset_data:
-                        asset_df = pd.DataFrame(asset_data)
-                        asset_df.to_excel(writer, sheet_name=f'{timeframe} Details', index=False)
-                        
-                        # Get the xlsxwriter workbook and worksheet objects
-                        workbook = writer.book
-                        worksheet = writer.sheets[f'{timeframe} Details']
-                        
-                        # Add some formatting
-                        header_format = workbook.add_format({
-                            'bold': True,
-                            'bg_color': '#2d2d2d',
-                            'font_color': 'white',
-                            'border': 1
-                        })
-                        
-                        # Write the column headers with the header format
-                        for col_num, value in enumerate(asset_df.columns.values):
-                            worksheet.write(0, col_num, value, header_format)
-                            worksheet.set_column(col_num, col_num, 15)  # Set column width
-            
-            # Reset pointer and return bytes
-            output.seek(0)
-            return output.getvalue()
+            # Stream the workbook to a temporary file and read it back once
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = self.export_performance_report(
+                    performance_data,
+                    asset_performance,
+                    os.path.join(tmp_dir, 'performance.xlsx')
+                )
+                with open(path, 'rb') as f:
+                    return f.read()
             
         except Exception as e:
             print(f"Error generating Excel file: {str(e)}")
             raise
 
+    def export_performance_report(self, performance_data: Dict, asset_performance: Dict, path: str,
+                                  export_format: str = 'xlsx') -> str:
+        """
+        Write the performance analysis straight to a file without building it in memory
+
+        Args:
+            performance_data: Per-timeframe results from analyze_portfolio_performance
+            asset_performance: Per-asset weights from analyze_portfolio_performance
+            path: Destination file path
+            export_format: 'xlsx' (constant-memory workbook), 'csv' or 'parquet' (tidy table)
+
+        Returns:
+            str: The path written to
+        """
+        if export_format == 'xlsx':
+            self._write_performance_xlsx(performance_data, asset_performance, path)
+        elif export_format == 'csv':
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(PERFORMANCE_ROW_COLUMNS)
+                writer.writerows(self._iter_performance_rows(performance_data, asset_performance))
+        elif export_format == 'parquet':
+            self._write_performance_parquet(performance_data, asset_performance, path)
+        else:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        return path
+
+    def _write_performance_xlsx(self, performance_data: Dict, asset_performance: Dict, path: str):
+        """Write the workbook row by row using xlsxwriter's constant memory mode"""
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        try:
+            header_format = workbook.add_format({
+                'bold': True,
+                'bg_color': '#2d2d2d',
+                'font_color': 'white',
+                'border': 1
+            })
+
+            # Summary sheet
+            if performance_data:
+                worksheet = workbook.add_worksheet('Summary')
+                headers = ['Timeframe', 'Portfolio Return (%)', 'S&P 500 Return (%)', 'Start Value ($)', 'End Value ($)']
+                worksheet.set_column(0, len(headers) - 1, 18)
+                worksheet.write_row(0, 0, headers, header_format)
+                for row, (timeframe, data) in enumerate(performance_data.items(), start=1):
+                    worksheet.write_row(row, 0, [
+                        timeframe,
+                        data['portfolio_return'],
+                        data['benchmark_return'] if data['benchmark_return'] is not None else 'N/A',
+                        data['start_value'],
+                        data['end_value']
+                    ])
+
+            # Asset Performance sheet for each timeframe
+            for timeframe, data in performance_data.items():
+                if not data['asset_returns']:
+                    continue
+                worksheet = workbook.add_worksheet(f'{timeframe} Details')
+                worksheet.set_column(0, 2, 15)
+                worksheet.write_row(0, 0, ['Symbol', 'Weight (%)', f'Return ({timeframe}) (%)'], header_format)
+                for row, (symbol, return_value) in enumerate(data['asset_returns'].items(), start=1):
+                    worksheet.write_row(row, 0, [
+                        symbol,
+                        asset_performance[symbol]['weight'],
+                        return_value if return_value is not None else 'N/A'
+                    ])
+        finally:
+            workbook.close()
+
+    def _write_performance_parquet(self, performance_data: Dict, asset_performance: Dict, path: str):
+        """Write the tidy performance table as Parquet, one row group per timeframe"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires the pyarrow package")
+
+        schema = pa.schema([
+            ('section', pa.string()),
+            ('timeframe', pa.string()),
+            ('symbol', pa.string()),
+            ('weight_pct', pa.float64()),
+            ('return_pct', pa.float64()),
+            ('benchmark_return_pct', pa.float64()),
+            ('start_value', pa.float64()),
+            ('end_value', pa.float64())
+        ])
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for timeframe in performance_data:
+                rows = list(self._iter_performance_rows({timeframe: performance_data[timeframe]}, asset_performance))
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                ))
+
+    def _iter_performance_rows(self, performance_data: Dict, asset_performance: Dict):
+        """Yield the analysis as flat rows matching PERFORMANCE_ROW_COLUMNS"""
+        for timeframe, data in performance_data.items():
+            yield ('summary', timeframe, None, None, data['portfolio_return'], data['benchmark_return'],
+                   data['start_value'], data['end_value'])
+            for symbol, return_value in data['asset_returns'].items():
+                yield ('asset', timeframe, symbol, asset_performance[symbol]['weight'], return_value,
+                       None, None, None)
+
     def _handle_price_data_request(self, request: Dict) -> Dict:
         """Handle a price data request"""
         try:
@@ -813,22 +1080,23 @@ class ChatbotService:
         if not performance or 'equity' not in performance:
             return "No performance data available."
 
-        equity_values = [v for v in performance['equity'] if v is not None]
-        if not equity_values:
+        metrics = compute_performance_metrics(
+            performance['equity'],
+            timestamps=performance.get('timestamp')
+        )
+        if not metrics:
             return "No valid performance data available."
 
-        current_value = equity_values[-1]
-        start_value = equity_values[0]
-        total_return = ((current_value - start_value) / start_value * 100) if start_value > 0 else 0
-        max_value = max(equity_values)
-        min_value = min(equity_values)
-
         response = [
             "📈 Portfolio Performance Summary:\n",
-            f"Current Value: ${current_value:,.2f}",
-            f"Period Return: {total_return:+.2f}%",
-            f"Period High: ${max_value:,.2f}",
-            f"Period Low: ${min_value:,.2f}",
+            f"Current Value: ${metrics['end_value']:,.2f}",
+            f"Period Return: {metrics['total_return']:+.2f}%",
+            f"Period High: ${metrics['max_value']:,.2f}",
+            f"Period Low: ${metrics['min_value']:,.2f}",
+            f"Max Drawdown: {metrics['max_drawdown']:.2f}%",
+            f"Annualized Volatility: {metrics['volatility']:.2f}%",
+            f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f}",
+            f"Sortino Ratio: {metrics['sortino_ratio']:.2f}",
             "\nNote: Past performance does not guarantee future results."
         ]
 
@@ -16,6 +16,8 @@ class ChatbotActions:
             'place_limit_order': self._place_limit_order,
             'place_stop_order': self._place_stop_order,
             'place_stop_limit_order': self._place_stop_limit_order,
+            'submit_orders': self._submit_orders,
+            'rebalance_portfolio': self._rebalance_portfolio,
             'cancel_order': self._cancel_order,
             'cancel_all_orders': self._cancel_all_orders,
             'close_position': self._close_position,
@@ -101,6 +103,56 @@ class ChatbotActions:
             limit_price=float(params['limit_price'])
         )
 
+    def _submit_orders(self, params: Dict) -> Dict:
+        """Submit several orders at once"""
+        orders = params.get('orders')
+        if not orders or not isinstance(orders, list):
+            return {'error': 'Missing orders parameter (a list of orders)'}
+        
+        return self.trading.submit_orders(
+            orders,
+            max_concurrency=int(params.get('max_concurrency', 8))
+        )
+
+    def _rebalance_portfolio(self, params: Dict) -> Dict:
+        """Preview (default) or execute a rebalance to target weights in percent"""
+        targets = params.get('target_weights')
+        if not targets or not isinstance(targets, dict):
+            return {'error': 'Missing target_weights parameter (symbol -> weight in %)'}
+        
+        from services.rebalancing import RebalancingService, parse_bool, normalize_targets, run_rebalance_job
+        options = {
+            'liquidate_unlisted': parse_bool(params.get('liquidate_unlisted'), False),
+            'min_trade_value': float(params.get('min_trade_value', 1.0))
+        }
+        if parse_bool(params.get('dry_run'), True):
+            rebalancer = RebalancingService(self.trading.alpaca, self.trading)
+            return rebalancer.rebalance(targets, dry_run=True, **options)
+
+        # A live rebalance waits for its sells to fill, so it runs on the job queue
+        from services.jobs import job_queue
+        user_id = params.get('user_id')
+        if user_id is None:
+            from flask import has_request_context
+            from flask_login import current_user
+            if has_request_context() and current_user.is_authenticated:
+                user_id = current_user.id
+        normalize_targets(targets)
+        job_id = job_queue.submit(
+            'rebalance',
+            run_rebalance_job,
+            self.trading.alpaca.api_key,
+            self.trading.alpaca.secret_key,
+            targets,
+            user_id=user_id,
+            **options
+        )
+        return {
+            'job_id': job_id,
+            'status': 'queued',
+            'message': 'Rebalance queued: sells are placed first and buys once they have filled'
+        }
+
     def _cancel_order(self, params: Dict) -> Dict:
         """Cancel a specific order"""
         if 'order_id' not in params:
@@ -128,7 +180,14 @@ class ChatbotActions:
 
     # Market data action handlers
     def _get_quote(self, params: Dict) -> Dict:
-        """Get latest quote for a symbol"""
+        """Get latest quote for a symbol, or for a list of symbols in one request"""
+        if params.get('symbols'):
+            symbols = [symbol.upper() for symbol in params['symbols']]
+            quotes = self.market_data.get_latest_quotes(symbols)
+            if not quotes:
+                return {'error': 'Could not fetch quotes'}
+            return {'quotes': quotes, 'missing': [symbol for symbol in symbols if symbol not in quotes]}
+        
         if 'symbol' not in params:
             return {'error': 'Missing symbol parameter'}
         
@@ -167,16 +226,18 @@ class ChatbotActions:
         if 'symbol' not in params:
             return {'error': 'Missing symbol parameter'}
         
-        bars = self.market_data.get_bars(
-            symbol=params['symbol'].upper(),
+        # 200 daily bars are needed for the 200-day SMA; watched symbols are read from their live state,
+        # so repeat questions about a symbol are constant-time lookups
+        self.market_data.watch(params['symbol'].upper(), timeframe='1D')
+        indicators = self.market_data.get_technical_indicators(
+            params['symbol'].upper(),
             timeframe='1D',
-            limit=200  # Need enough data for 200-day SMA
+            limit=200
         )
         
-        if not bars:
+        if not indicators:
             return {'error': 'Could not fetch data for technical analysis'}
             
-        indicators = self.market_data.calculate_technical_indicators(bars)
         return {
             'symbol': params['symbol'].upper(),
             'indicators': indicators
@@ -236,17 +297,20 @@ class ChatbotActions:
             return {'error': f'Missing required parameters. Need: {", ".join(required)}'}
         
         try:
-            from models import UserInfo, db
-            from flask import g
-            
-            new_info = UserInfo(
-                user_id=g.user.id,
-                info_type=params['info_type'],
-                content=params['content']
-            )
-            db.session.add(new_info)
-            db.session.commit()
-            
+            from services.memory_writer import memory_writer
+
+            user_id = params.get('user_id')
+            if user_id is None:
+                # Fall back to the logged-in user when called from a request
+                from flask import has_request_context
+                from flask_login import current_user
+                if not has_request_context() or not current_user.is_authenticated:
+                    return {'error': 'Missing required parameter: user_id'}
+                user_id = current_user.id
+
+            # Written in the background by the memory writer, off the response path
+            memory_writer.enqueue(int(user_id), params['info_type'], params['content'])
+
             return {
                 'success': True,
                 'message': f"Saved important information about {params['info_type']}"
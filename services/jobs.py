@@ -0,0 +1,190 @@
+import os
+import json
+import sqlite3
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, Optional
+from alpaca_service.progress import ProgressChannel
+
+
+class JobContext:
+    """Handle passed to a running job for progress reporting and artifact output"""
+
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    def update_progress(self, percent: float, message: Optional[str] = None):
+        """Record job progress (0-100) and an optional status message"""
+        self.queue._update(self.job_id, progress=max(0.0, min(100.0, float(percent))), message=message)
+
+    def progress_channel(self, total: int, min_interval: float = 1.0) -> ProgressChannel:
+        """Item-based progress for the job (percent, ETA, timings), written at most once per interval"""
+        return ProgressChannel(
+            total,
+            lambda snapshot: self.update_progress(snapshot['percent'], snapshot['message']),
+            min_interval=min_interval
+        )
+
+    def artifact_path(self, filename: str) -> str:
+        """Path where the job should write its downloadable artifact"""
+        return os.path.join(self.queue.artifact_dir, f"{self.job_id}_{os.path.basename(filename)}")
+
+
+class JobQueue:
+    """
+    Local background job queue backed by a thread pool, with job state stored in SQLite
+
+    Jobs are submitted with a callable taking a JobContext as first argument. The callable
+    may return a dict with a JSON-serializable 'result' and an 'artifact' entry
+    ({'path', 'filename', 'content_type'}) that can later be downloaded.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    def __init__(self, app=None):
+        self.db_path = None
+        self.artifact_dir = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the queue from the Flask app config and register it as an extension"""
+        default_dir = os.path.join(app.root_path, 'database')
+        self.db_path = app.config.get('JOB_QUEUE_DATABASE', os.path.join(default_dir, 'jobs.db'))
+        self.artifact_dir = app.config.get('JOB_ARTIFACT_DIR', os.path.join(default_dir, 'job_artifacts'))
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(self.artifact_dir, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('JOB_QUEUE_WORKERS', 2),
+            thread_name_prefix='job-queue'
+        )
+        self._create_schema()
+        self._recover_interrupted_jobs()
+        self.purge_expired(timedelta(hours=app.config.get('JOB_RETENTION_HOURS', 24)))
+
+        app.extensions['job_queue'] = self
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection for one transaction (committed or rolled back), closed on exit"""
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _create_schema(self):
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    job_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    artifact_path TEXT,
+                    artifact_name TEXT,
+                    content_type TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_jobs_user_id ON jobs (user_id)')
+
+    def _recover_interrupted_jobs(self):
+        """Jobs run in-process, so anything unfinished at startup was lost with the previous process"""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (self.FAILED, 'Interrupted by server restart', datetime.utcnow().isoformat(),
+                 self.QUEUED, self.RUNNING)
+            )
+
+    def purge_expired(self, max_age: timedelta):
+        """Delete finished jobs and their artifacts older than max_age"""
+        cutoff = (datetime.utcnow() - max_age).isoformat()
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, artifact_path FROM jobs WHERE updated_at < ? AND status IN (?, ?)",
+                (cutoff, self.COMPLETED, self.FAILED)
+            ).fetchall()
+            for row in rows:
+                if row['artifact_path'] and os.path.exists(row['artifact_path']):
+                    os.remove(row['artifact_path'])
+            connection.executemany("DELETE FROM jobs WHERE id = ?", [(row['id'],) for row in rows])
+
+    def _update(self, job_id: str, **fields):
+        fields['updated_at'] = datetime.utcnow().isoformat()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._lock, self._connect() as connection:
+            connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, job_type: str, func: Callable[..., Optional[Dict]], *args, user_id: Optional[int] = None, **kwargs) -> str:
+        """Queue a job and return its id immediately"""
+        if self._executor is None:
+            raise RuntimeError("Job queue not initialized. Call init_app() first.")
+
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, user_id, job_type, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (job_id, user_id, job_type, self.QUEUED, now, now)
+            )
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: Dict[str, Any]):
+        self._update(job_id, status=self.RUNNING)
+        try:
+            outcome = func(JobContext(self, job_id), *args, **kwargs) or {}
+            fields = {
+                'status': self.COMPLETED,
+                'progress': 100.0,
+                'result': json.dumps(outcome.get('result'), default=str)
+            }
+            artifact = outcome.get('artifact')
+            if artifact:
+                fields.update({
+                    'artifact_path': artifact['path'],
+                    'artifact_name': artifact['filename'],
+                    'content_type': artifact.get('content_type', 'application/octet-stream')
+                })
+            self._update(job_id, **fields)
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            traceback.print_exc()
+            self._update(job_id, status=self.FAILED, error=str(e))
+
+    def get(self, job_id: str, user_id: Optional[int] = None) -> Optional[Dict]:
+        """Get a job's state, optionally restricted to the user who submitted it"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['has_artifact'] = bool(job['artifact_path'] and os.path.exists(job['artifact_path']))
+        return job
+
+
+job_queue = JobQueue()
@@ -0,0 +1,341 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from alpaca.data.requests import StockLatestTradeRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+from alpaca_service.indicators import compute_indicators, IndicatorState
+
+# Longest a cached bar series is served before its newest bars are fetched again (seconds)
+BAR_CACHE_TTL = 60
+# Number of indicator results kept for recently seen bar series
+INDICATOR_CACHE_SIZE = 256
+# Bars used to seed the indicator state of a watched symbol
+WATCH_HISTORY_BARS = 200
+# Most series kept watched at once (the least recently watched one is dropped first)
+MAX_WATCHED = 100
+
+_TIMEFRAME_PATTERN = re.compile(r'^(\d+)\s*(Min|T|H|Hour|D|Day|W|Week|M|Month)$', re.IGNORECASE)
+_TIMEFRAME_UNITS = {
+    'min': (TimeFrameUnit.Minute, 60),
+    't': (TimeFrameUnit.Minute, 60),
+    'h': (TimeFrameUnit.Hour, 3600),
+    'hour': (TimeFrameUnit.Hour, 3600),
+    'd': (TimeFrameUnit.Day, 86400),
+    'day': (TimeFrameUnit.Day, 86400),
+    'w': (TimeFrameUnit.Week, 7 * 86400),
+    'week': (TimeFrameUnit.Week, 7 * 86400),
+    'm': (TimeFrameUnit.Month, 30 * 86400),
+    'month': (TimeFrameUnit.Month, 30 * 86400)
+}
+
+
+def _encode_state(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode_state(value: Dict):
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+
+def parse_timeframe(timeframe: str) -> Tuple[TimeFrame, int]:
+    """Parse a timeframe such as '5Min', '1H' or '1D' into an alpaca-py TimeFrame and its length in seconds"""
+    match = _TIMEFRAME_PATTERN.match(str(timeframe).strip())
+    if not match:
+        raise ValueError(f"Invalid timeframe: {timeframe}")
+    amount = int(match.group(1))
+    unit, unit_seconds = _TIMEFRAME_UNITS[match.group(2).lower()]
+    return TimeFrame(amount, unit), amount * unit_seconds
+
+
+class MarketDataService:
+    # Bars don't depend on the account, so every instance in the process shares them
+    _bar_cache: Dict[tuple, Dict] = {}  # (symbol, timeframe) -> {'bars', 'limit', 'fetched_at'}
+    _bar_locks: Dict[tuple, threading.Lock] = {}
+    _indicator_cache: Dict[tuple, Dict] = {}
+    # Watched series keep incremental indicator state: (symbol, timeframe) -> {'state', 'checked_at'}
+    _watched: Dict[tuple, Dict] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, alpaca_service):
+        self.alpaca = alpaca_service
+
+    def get_latest_quote(self, symbol: str) -> Optional[Dict]:
+        """Get the latest quote for a symbol"""
+        return self.alpaca.get_latest_quote(symbol)
+
+    def get_latest_quotes(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Get the latest quotes for several symbols in one request"""
+        return self.alpaca.get_latest_quotes(symbols)
+
+    def get_latest_trade(self, symbol: str) -> Optional[Dict]:
+        """Get the latest trade for a symbol"""
+        try:
+            symbol = symbol.strip().upper()
+            response = self.alpaca.data_client.get_stock_latest_trade(
+                StockLatestTradeRequest(symbol_or_symbols=symbol)
+            )
+            trade = response.get(symbol)
+            if trade is None:
+                return None
+            return {
+                'symbol': symbol,
+                'price': float(trade.price),
+                'size': float(trade.size),
+                'exchange': trade.exchange,
+                'timestamp': trade.timestamp
+            }
+        except Exception as e:
+            print(f"Error getting latest trade for {symbol}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _lookback_start(limit: int, bar_seconds: int) -> datetime:
+        """Start date far enough back to cover `limit` bars, allowing for closed market hours"""
+        if bar_seconds < 86400:
+            # Intraday bars only exist for part of each weekday
+            span = limit * bar_seconds * (24 / 16) * (7 / 5) + 4 * 86400
+        elif bar_seconds == 86400:
+            span = limit * 86400 * (7 / 5) * 1.1 + 5 * 86400
+        else:
+            span = limit * bar_seconds * 1.1 + 7 * 86400
+        return datetime.now(timezone.utc) - timedelta(seconds=span)
+
+    def _fetch_bars(self, symbol: str, timeframe: TimeFrame, start: datetime) -> List[Dict]:
+        return self.alpaca.get_stock_bars([symbol], start, timeframe).get(symbol, [])
+
+    def get_bars(self, symbol: str, timeframe: str = '1D', limit: int = 100) -> List[Dict]:
+        """
+        Get the most recent bars for a symbol, oldest first
+
+        Bars are cached per (symbol, timeframe). Once cached, a stale series is brought up to
+        date by fetching only the bars since its last timestamp, so repeated requests (e.g. the
+        200 daily bars behind technical analysis) are served from memory.
+
+        Args:
+            symbol: Stock symbol
+            timeframe: Bar size such as '1Min', '15Min', '1H', '1D' or '1W'
+            limit: Number of bars to return
+
+        Returns:
+            list: Bars as {'timestamp', 'open', 'high', 'low', 'close', 'volume'} dicts
+        """
+        symbol = symbol.strip().upper()
+        limit = max(int(limit), 1)
+        try:
+            tf, bar_seconds = parse_timeframe(timeframe)
+        except ValueError as e:
+            print(str(e))
+            return []
+
+        key = (symbol, str(tf))
+        with self._lock:
+            key_lock = self._bar_locks.setdefault(key, threading.Lock())
+
+        # One fetch per series at a time; concurrent callers reuse its result
+        with key_lock:
+            cached = self._bar_cache.get(key)
+            now = time.monotonic()
+            try:
+                if cached is None or cached['limit'] < limit or not cached['bars']:
+                    bars = self._fetch_bars(symbol, tf, self._lookback_start(limit, bar_seconds))
+                    cached = {'bars': bars[-limit:], 'limit': limit, 'fetched_at': now}
+                    self._bar_cache[key] = cached
+                elif now - cached['fetched_at'] > min(bar_seconds, BAR_CACHE_TTL):
+                    # The last cached bar may still have been forming, so fetch from it onwards
+                    newer = self._fetch_bars(symbol, tf, cached['bars'][-1]['timestamp'])
+                    if newer:
+                        first_new = newer[0]['timestamp']
+                        kept = [bar for bar in cached['bars'] if bar['timestamp'] < first_new]
+                        cached['bars'] = (kept + newer)[-cached['limit']:]
+                        # Watched series take the new bars as they arrive
+                        for bar in newer:
+                            self.update_bar(symbol, bar, timeframe)
+                    cached['fetched_at'] = now
+            except Exception as e:
+                print(f"Error getting bars for {symbol}: {str(e)}")
+                if cached is None:
+                    return []
+            return cached['bars'][-limit:]
+
+    def calculate_technical_indicators(self, bars: List[Dict]) -> Dict:
+        """
+        Calculate SMA/EMA/RSI/MACD/Bollinger values for the latest bar
+
+        Results are memoized per bar series, so recomputing for unchanged bars is a dict lookup.
+        """
+        if not bars:
+            return {}
+
+        key = (len(bars), bars[0]['timestamp'], bars[-1]['timestamp'], bars[-1]['close'])
+        indicators = self._indicator_cache.get(key)
+        if indicators is None:
+            closes = np.fromiter((bar['close'] for bar in bars), dtype=float, count=len(bars))
+            indicators = compute_indicators(closes)
+            indicators['volume'] = bars[-1].get('volume')
+            indicators['timestamp'] = bars[-1]['timestamp']
+            with self._lock:
+                if len(self._indicator_cache) >= INDICATOR_CACHE_SIZE:
+                    self._indicator_cache.pop(next(iter(self._indicator_cache)))
+                self._indicator_cache[key] = indicators
+        return dict(indicators)
+
+    def get_technical_indicators(self, symbol: str, timeframe: str = '1D', limit: int = 200) -> Optional[Dict]:
+        """Get bars for a symbol and calculate its latest technical indicators"""
+        if self.is_watched(symbol, timeframe):
+            return self.get_watched_indicators(symbol, timeframe)
+        bars = self.get_bars(symbol, timeframe=timeframe, limit=limit)
+        if not bars:
+            return None
+        return self.calculate_technical_indicators(bars)
+
+    @staticmethod
+    def _watch_key(symbol: str, timeframe: str) -> tuple:
+        return symbol.strip().upper(), str(parse_timeframe(timeframe)[0])
+
+    def is_watched(self, symbol: str, timeframe: str = '1D') -> bool:
+        try:
+            return self._watch_key(symbol, timeframe) in self._watched
+        except ValueError:
+            return False
+
+    def watch(self, symbol: str, timeframe: str = '1D') -> bool:
+        """
+        Keep incremental indicator state for a symbol
+
+        The state is seeded from recent bars once; afterwards each new bar updates it in
+        constant time and indicator reads are lookups.
+
+        Returns:
+            bool: Whether the symbol is now watched
+        """
+        key = self._watch_key(symbol, timeframe)
+        if key in self._watched:
+            return True
+        bars = self.get_bars(key[0], timeframe=timeframe, limit=WATCH_HISTORY_BARS)
+        if not bars:
+            return False
+        state = IndicatorState.from_closes([bar['close'] for bar in bars], [bar['timestamp'] for bar in bars])
+        with self._lock:
+            if key not in self._watched and len(self._watched) >= MAX_WATCHED:
+                self._watched.pop(next(iter(self._watched)))
+            self._watched.setdefault(key, {
+                'state': state,
+                'volume': bars[-1].get('volume'),
+                'checked_at': time.monotonic()
+            })
+        return True
+
+    def unwatch(self, symbol: str, timeframe: str = '1D'):
+        """Stop keeping indicator state for a symbol"""
+        with self._lock:
+            self._watched.pop(self._watch_key(symbol, timeframe), None)
+
+    @staticmethod
+    def _fold_bars(entry: Dict, bars: List[Dict]):
+        """Fold bars from the state's latest timestamp on into a watched entry (lock held)"""
+        state = entry['state']
+        # Older bars are already in the state; the latest one may be a revision
+        start = len(bars)
+        while start > 0 and (state.timestamp is None or bars[start - 1]['timestamp'] >= state.timestamp):
+            start -= 1
+        for bar in bars[start:]:
+            state.update(bar['close'], bar['timestamp'])
+            entry['volume'] = bar.get('volume')
+
+    def update_bar(self, symbol: str, bar: Dict, timeframe: str = '1D'):
+        """Fold a new (or updated latest) bar into a watched symbol's indicator state"""
+        entry = self._watched.get(self._watch_key(symbol, timeframe))
+        if entry is not None:
+            with self._lock:
+                self._fold_bars(entry, [bar])
+
+    def get_watched_indicators(self, symbol: str, timeframe: str = '1D') -> Optional[Dict]:
+        """
+        Latest indicators of a watched symbol
+
+        Once per cache period the newest bars are pulled from the bar cache and folded into
+        the state; every other read is a constant-time lookup. The result has the same keys
+        as calculate_technical_indicators().
+        """
+        key = self._watch_key(symbol, timeframe)
+        entry = self._watched.get(key)
+        if entry is None:
+            return None
+
+        _, bar_seconds = parse_timeframe(timeframe)
+        if time.monotonic() - entry['checked_at'] > min(bar_seconds, BAR_CACHE_TTL):
+            entry['checked_at'] = time.monotonic()
+            bars = self.get_bars(key[0], timeframe=timeframe, limit=WATCH_HISTORY_BARS)
+            with self._lock:
+                self._fold_bars(entry, bars)
+
+        with self._lock:
+            indicators = entry['state'].values()
+            indicators['volume'] = entry.get('volume')
+            indicators['timestamp'] = entry['state'].timestamp
+        return indicators
+
+    @classmethod
+    def snapshot_indicators(cls) -> Dict[str, Dict]:
+        """Indicator state of every watched symbol, keyed 'SYMBOL|timeframe'"""
+        with cls._lock:
+            return {f"{symbol}|{timeframe}": {**entry['state'].snapshot(), 'volume': entry.get('volume')}
+                    for (symbol, timeframe), entry in cls._watched.items()}
+
+    @classmethod
+    def restore_indicators(cls, snapshots: Dict[str, Dict]):
+        """Restore watched symbols from snapshot_indicators() (e.g. after a restart)"""
+        with cls._lock:
+            for name, snapshot in snapshots.items():
+                symbol, timeframe = name.split('|', 1)
+                # Restored states catch up on missed bars at the next read
+                cls._watched[cls._watch_key(symbol, timeframe)] = {
+                    'state': IndicatorState.restore(snapshot),
+                    'volume': snapshot.get('volume'),
+                    'checked_at': 0.0
+                }
+
+    @classmethod
+    def save_indicator_state(cls, path: str):
+        """Write the watched symbols' indicator state to a JSON file (replaced atomically)"""
+        snapshots = cls.snapshot_indicators()
+        if not snapshots:
+            return
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(snapshots, f, default=_encode_state)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_indicator_state(cls, path: str) -> int:
+        """Restore watched symbols saved by save_indicator_state(); returns how many were restored"""
+        try:
+            with open(path) as f:
+                snapshots = json.load(f, object_hook=_decode_state)
+            cls.restore_indicators(snapshots)
+            return len(snapshots)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"Error restoring indicator state from {path}: {str(e)}")
+            return 0
+
+
+def init_app(app):
+    """Restore the indicator state of watched symbols from the last run and save it again at exit"""
+    path = app.config.get('INDICATOR_STATE_PATH', os.path.join(app.root_path, 'database', 'indicator_state.json'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    restored = MarketDataService.load_indicator_state(path)
+    if restored:
+        print(f"Restored indicator state for {restored} watched series")
+    atexit.register(MarketDataService.save_indicator_state, path)
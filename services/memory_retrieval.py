@@ -0,0 +1,161 @@
+import math
+import re
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db, UserInfo
+
+FTS_TABLE = 'user_info_fts'
+
+STOPWORDS = {
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'any', 'can', 'had', 'her', 'was', 'one',
+    'our', 'out', 'has', 'his', 'how', 'its', 'may', 'now', 'see', 'who', 'did', 'get', 'let', 'too',
+    'use', 'what', 'when', 'where', 'which', 'with', 'this', 'that', 'from', 'have', 'will', 'your',
+    'about', 'would', 'could', 'should', 'there', 'their', 'them', 'they', 'then', 'than', 'been',
+    'into', 'some', 'just', 'like', 'also', 'does', 'want', 'please', 'tell', 'know', 'much', 'more'
+}
+
+
+def query_terms(message: str, max_terms: int = 16) -> List[str]:
+    """Distinct lowercase content words of a message"""
+    terms = []
+    for word in re.findall(r'\w+', message.lower()):
+        if len(word) >= 3 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms[:max_terms]
+
+
+def estimate_tokens(content: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(content) // 4 + 1
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def is_memory_index(object, name, type_, reflected, compare_to):
+    """Alembic include_object hook that keeps autogenerate away from the full-text index tables"""
+    return not (type_ == 'table' and name and name.startswith(FTS_TABLE))
+
+
+class MemoryRetriever:
+    """
+    Picks the stored UserInfo facts most relevant to a chat message
+
+    Candidates are ranked with SQLite FTS5 (BM25 over user_info_fts, kept in sync by triggers)
+    when the index exists, otherwise by IDF-weighted term overlap over the user's most recent
+    facts. The best ones are then taken in rank order while they fit in the token budget, so
+    the prompt stays small however many facts a user has saved.
+    """
+
+    FALLBACK_SCAN = 500  # Most recent facts scored when there is no full-text index
+
+    def __init__(self, app=None):
+        self.top_k = 8
+        self.token_budget = 300
+        self._fts_available: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure retrieval limits from the Flask app config and register as an extension"""
+        self.top_k = app.config.get('MEMORY_TOP_K', self.top_k)
+        self.token_budget = app.config.get('MEMORY_TOKEN_BUDGET', self.token_budget)
+        app.extensions['memory_retriever'] = self
+
+    def _has_fts(self) -> bool:
+        key = str(db.engine.url)
+        with self._lock:
+            available = self._fts_available.get(key)
+        if available is None:
+            available = db.engine.dialect.name == 'sqlite' and db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first() is not None
+            with self._lock:
+                self._fts_available[key] = available
+        return available
+
+    def _search_fts(self, user_id: int, terms: List[str], limit: int) -> List[Dict]:
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        rows = db.session.execute(text(
+            f"SELECT user_info.id, user_info.info_type, user_info.content, user_info.created_at "
+            f"FROM {FTS_TABLE} JOIN user_info ON user_info.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND user_info.user_id = :user_id "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT :limit"
+        ), {'match': match, 'user_id': user_id, 'limit': limit})
+        return [dict(row._mapping) for row in rows]
+
+    def _search_scan(self, user_id: int, terms: List[str], limit: int) -> List[Dict]:
+        rows = db.session.query(UserInfo.id, UserInfo.info_type, UserInfo.content, UserInfo.created_at).filter(
+            UserInfo.user_id == user_id
+        ).order_by(UserInfo.created_at.desc(), UserInfo.id.desc()).limit(self.FALLBACK_SCAN).all()
+        if not rows:
+            return []
+
+        query = {_stem(term) for term in terms}
+        fact_terms = [{_stem(word) for word in re.findall(r'\w+', row.content.lower())} & query for row in rows]
+        document_frequency = {term: sum(term in found for found in fact_terms) for term in query}
+        scored = []
+        for position, (row, found) in enumerate(zip(rows, fact_terms)):
+            if found:
+                score = sum(math.log(1 + len(rows) / document_frequency[term]) for term in found)
+                # Newer facts win ties
+                scored.append((-score, position, row))
+        scored.sort(key=lambda item: item[:2])
+        return [dict(row._mapping) for _, _, row in scored[:limit]]
+
+    def retrieve(self, user_id: int, message: str, top_k: Optional[int] = None,
+                 token_budget: Optional[int] = None) -> List[Dict]:
+        """
+        Most relevant facts for a message, best first, within the token budget
+
+        Returns:
+            list: {'id', 'info_type', 'content', 'created_at'} dicts
+        """
+        top_k = top_k or self.top_k
+        token_budget = token_budget or self.token_budget
+        terms = query_terms(message)
+        if not terms:
+            return []
+
+        # Extra candidates so facts too long for the remaining budget can be skipped
+        limit = top_k * 3
+        candidates = None
+        if self._has_fts():
+            try:
+                candidates = self._search_fts(user_id, terms, limit)
+            except OperationalError as e:
+                print(f"[MEMORY] Full-text search failed, scanning instead: {str(e)}")
+                db.session.rollback()
+                with self._lock:
+                    self._fts_available[str(db.engine.url)] = False
+        if candidates is None:
+            candidates = self._search_scan(user_id, terms, limit)
+
+        selected, used = [], 0
+        for memory in candidates:
+            cost = estimate_tokens(f"- {memory['info_type']}: {memory['content']}")
+            if used + cost > token_budget:
+                continue
+            selected.append(memory)
+            used += cost
+            if len(selected) >= top_k:
+                break
+        return selected
+
+    def context_message(self, user_id: int, message: str) -> Optional[Dict]:
+        """System message with the facts relevant to a chat message, or None if there are none"""
+        memories = self.retrieve(user_id, message)
+        if not memories:
+            return None
+        lines = '\n'.join(f"- {memory['info_type']}: {memory['content']}" for memory in memories)
+        return {
+            "role": "system",
+            "content": f"Relevant information the user shared previously:\n{lines}"
+        }
+
+
+memory_retriever = MemoryRetriever()
@@ -0,0 +1,179 @@
+import atexit
+import re
+import threading
+import time
+from collections import deque
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+from models import db, UserInfo
+
+
+def normalize_fact(content: str) -> str:
+    """Lowercased content without punctuation or repeated whitespace, for duplicate detection"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', content.lower()).split())
+
+
+def is_near_duplicate(a: str, b: str, threshold: float) -> bool:
+    """Whether two normalized facts are near-identical"""
+    if a == b:
+        return True
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # quick_ratio() is an upper bound of ratio() and much cheaper
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+class UserInfoWriter:
+    """
+    Write-behind queue for UserInfo memories saved by the chatbot
+
+    enqueue() only appends to an in-memory queue, so saving a memory adds no database
+    latency to the chat response and needs no request context (the user id is passed in).
+    A background thread flushes the queue every flush_interval seconds in one transaction
+    per batch, dropping facts that are near-identical to one already queued or recently
+    stored for the same user and category.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_interval = 2.0
+        self.batch_size = 100
+        self.dedup_threshold = 0.9
+        self.dedup_window = 50  # Recent stored facts per user and category to compare against
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the writer from the Flask app config, start its flush thread and register it as an extension"""
+        self.app = app
+        self.flush_interval = app.config.get('MEMORY_FLUSH_INTERVAL', self.flush_interval)
+        self.batch_size = app.config.get('MEMORY_BATCH_SIZE', self.batch_size)
+        self.dedup_threshold = app.config.get('MEMORY_DEDUP_THRESHOLD', self.dedup_threshold)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='memory-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+        app.extensions['memory_writer'] = self
+
+    def enqueue(self, user_id: int, info_type: str, content: str) -> bool:
+        """
+        Queue a memory for saving
+
+        Returns:
+            bool: False if a near-identical memory is already queued for this user and category
+        """
+        content = content.strip()
+        normalized = normalize_fact(content)
+        with self._lock:
+            for entry in self._queue:
+                if (entry['user_id'] == user_id and entry['info_type'] == info_type
+                        and is_near_duplicate(entry['normalized'], normalized, self.dedup_threshold)):
+                    return False
+            self._queue.append({
+                'user_id': user_id,
+                'info_type': info_type,
+                'content': content,
+                'normalized': normalized,
+                'attempts': 0
+            })
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.set()
+        return True
+
+    def pending(self) -> int:
+        """Number of memories waiting to be written"""
+        with self._lock:
+            return len(self._queue)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[MEMORY_WRITER] Flush error: {str(e)}")
+
+    def flush(self) -> int:
+        """
+        Write all queued memories now
+
+        Returns:
+            int: Number of memories stored
+        """
+        stored = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return stored
+                with self.app.app_context():
+                    stored += self._write_batch(batch)
+
+    def _recent_facts(self, batch: List[Dict]) -> Dict[tuple, List[str]]:
+        """Normalized recently stored facts for each (user_id, info_type) in the batch"""
+        recent = {}
+        for key in {(entry['user_id'], entry['info_type']) for entry in batch}:
+            rows = db.session.query(UserInfo.content).filter(
+                UserInfo.user_id == key[0], UserInfo.info_type == key[1]
+            ).order_by(UserInfo.created_at.desc()).limit(self.dedup_window).all()
+            recent[key] = [normalize_fact(row.content) for row in rows]
+        return recent
+
+    def _write_batch(self, batch: List[Dict]) -> int:
+        try:
+            recent = self._recent_facts(batch)
+            new_rows = []
+            for entry in batch:
+                known = recent[(entry['user_id'], entry['info_type'])]
+                if any(is_near_duplicate(fact, entry['normalized'], self.dedup_threshold) for fact in known):
+                    continue
+                known.append(entry['normalized'])
+                new_rows.append(UserInfo(user_id=entry['user_id'], info_type=entry['info_type'], content=entry['content']))
+            db.session.add_all(new_rows)
+            db.session.commit()
+            if new_rows:
+                print(f"[MEMORY_WRITER] Stored {len(new_rows)} of {len(batch)} queued memories")
+            return len(new_rows)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[MEMORY_WRITER] Error storing {len(batch)} memories: {str(e)}")
+            retry = [entry for entry in batch if entry['attempts'] + 1 < self.MAX_ATTEMPTS]
+            for entry in retry:
+                entry['attempts'] += 1
+            with self._lock:
+                self._queue.extendleft(reversed(retry))
+            if len(retry) < len(batch):
+                print(f"[MEMORY_WRITER] Dropped {len(batch) - len(retry)} memories after {self.MAX_ATTEMPTS} attempts")
+            if retry:
+                # Leave the retries for the next interval instead of spinning on a failing database
+                raise
+            return 0
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Stop the flush thread and write whatever is still queued"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        deadline = time.monotonic() + (timeout or 0)
+        while self.pending() and time.monotonic() < deadline:
+            try:
+                self.flush()
+            except Exception:
+                break
+
+
+memory_writer = UserInfoWriter()
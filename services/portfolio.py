@@ -9,6 +9,7 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 
 from alpaca_service.alpaca_service import AlpacaService
+from alpaca_service.analytics import compute_performance_metrics
 
 class PortfolioService:
     def __init__(self):
@@ -171,12 +172,18 @@ class PortfolioService:
         # Calculate today's return
         today_return = self.portfolio_history['profit_loss_pct'][-1] * 100 if self.portfolio_history['profit_loss_pct'] else 0
         
-        # Calculate total return
-        total_return = ((self.portfolio_history['equity'][-1] - self.portfolio_history['base_value']) / self.portfolio_history['base_value']) * 100 if self.portfolio_history['equity'] else 0
+        # Calculate total return, drawdown, volatility and risk-adjusted ratios in one pass
+        metrics = compute_performance_metrics(
+            self.portfolio_history['equity'],
+            timestamps=self.portfolio_history['timestamp'],
+            base_value=self.portfolio_history.get('base_value')
+        )
+        total_return = metrics.get('total_return', 0)
         
         return {
             'today_return': today_return,
             'total_return': total_return,
+            'metrics': metrics,
             'history': {
                 'timestamps': [datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M') for ts in self.portfolio_history['timestamp']],
                 'equity': self.portfolio_history['equity']
@@ -0,0 +1,242 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from alpaca_service.alpaca_service import AlpacaService
+from services.trading import TradingService
+
+# Fractional quantities are truncated to this many decimals
+FRACTIONAL_DECIMALS = 6
+
+
+def parse_bool(value, default: bool = False) -> bool:
+    """Boolean from a JSON or model-supplied parameter, where strings like 'false' and '0' are False"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def normalize_targets(target_weights: Dict[str, float]) -> Dict[str, float]:
+    """Upper-cased symbols -> float weights in percent, rejecting negative or over-allocated targets"""
+    targets = {symbol.strip().upper(): float(weight) for symbol, weight in target_weights.items()}
+    if any(weight < 0 for weight in targets.values()):
+        raise ValueError("Target weights must not be negative")
+    if sum(targets.values()) > 100.0001:
+        raise ValueError("Target weights must not add up to more than 100%")
+    return targets
+
+
+def run_rebalance_job(job, alpaca_api_key: str, alpaca_secret_key: str, target_weights: Dict[str, float],
+                      **options) -> Dict:
+    """Background job executing a live rebalance, including the wait for the sells to fill"""
+    job.update_progress(5, "Planning rebalance...")
+    rebalancer = RebalancingService(AlpacaService(alpaca_api_key, alpaca_secret_key))
+    result = rebalancer.rebalance(target_weights, dry_run=False, progress_callback=job.update_progress, **options)
+    return {'result': result}
+
+
+class RebalancingService:
+    """Computes and executes the orders that move a portfolio to target weights"""
+
+    def __init__(self, alpaca_service, trading_service: Optional[TradingService] = None):
+        self.alpaca = alpaca_service
+        self.trading = trading_service or TradingService(alpaca_service)
+
+    def _get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Latest mid prices for symbols in one quote request"""
+        if not symbols:
+            return {}
+        try:
+            quotes = self.alpaca.get_latest_quotes(symbols)
+        except Exception as e:
+            print(f"Error getting quotes for {symbols}: {str(e)}")
+            return {}
+        return {symbol: quote['price'] for symbol, quote in quotes.items() if quote['price'] > 0}
+
+    def _get_fractionable(self, symbols: List[str]) -> Dict[str, bool]:
+        """Whether each symbol can be traded in fractional quantities"""
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as executor:
+            infos = list(executor.map(self.trading.get_asset_info, symbols))
+        return {symbol: bool(info and info.get('fractionable')) for symbol, info in zip(symbols, infos)}
+
+    @staticmethod
+    def _round_qty(qty: float, fractionable: bool) -> float:
+        """Truncate a quantity toward zero to a tradable size"""
+        if fractionable:
+            factor = 10 ** FRACTIONAL_DECIMALS
+            return math.trunc(qty * factor) / factor
+        return float(math.trunc(qty))
+
+    def plan(self, target_weights: Dict[str, float], liquidate_unlisted: bool = False,
+             min_trade_value: float = 1.0, cash_buffer: float = 0.0) -> Dict:
+        """
+        Compute the minimal set of market orders reaching target weights (dry run)
+
+        Args:
+            target_weights: Symbol -> target weight in percent of portfolio value
+            liquidate_unlisted: Sell held symbols that are not in target_weights
+            min_trade_value: Skip adjustments smaller than this dollar amount
+            cash_buffer: Dollar amount of cash to keep uninvested
+
+        Returns:
+            dict: Per-symbol diff, the orders to place (sells first) and any warnings
+        """
+        targets = normalize_targets(target_weights)
+
+        # One snapshot of account and positions drives the whole plan
+        account = self.alpaca.get_account_info()
+        positions = {position['symbol']: position for position in self.alpaca.get_positions()}
+        portfolio_value = float(account['portfolio_value'])
+        cash = float(account['cash'])
+        if portfolio_value <= 0:
+            raise ValueError("Portfolio value must be positive to rebalance")
+
+        if liquidate_unlisted:
+            for symbol in positions:
+                targets.setdefault(symbol, 0.0)
+
+        symbols = sorted(targets)
+        prices = {symbol: positions[symbol]['current_price'] for symbol in symbols if symbol in positions}
+        prices.update(self._get_prices([symbol for symbol in symbols if symbol not in prices]))
+        fractionable = self._get_fractionable(symbols)
+
+        warnings = []
+        rows = []
+        for symbol in symbols:
+            position = positions.get(symbol)
+            current_qty = position['qty'] if position else 0.0
+            current_value = position['market_value'] if position else 0.0
+            target_value = portfolio_value * targets[symbol] / 100
+            price = prices.get(symbol)
+            row = {
+                'symbol': symbol,
+                'current_weight': current_value / portfolio_value * 100,
+                'target_weight': targets[symbol],
+                'current_value': current_value,
+                'target_value': target_value,
+                'current_qty': current_qty,
+                'price': price,
+                'fractionable': fractionable.get(symbol, False),
+                'side': None,
+                'order_qty': 0.0,
+                'estimated_value': 0.0
+            }
+            rows.append(row)
+
+            if not price:
+                warnings.append(f"No price available for {symbol}, skipped")
+                continue
+            diff_value = target_value - current_value
+            if abs(diff_value) < min_trade_value:
+                continue
+
+            if targets[symbol] == 0:
+                # Close out entirely rather than leaving a rounding remainder
+                qty = -current_qty
+            else:
+                qty = self._round_qty(diff_value / price, row['fractionable'])
+                # Never sell more than is held (no shorting)
+                if current_qty >= 0:
+                    qty = max(qty, -current_qty)
+            if qty == 0:
+                continue
+
+            row['side'] = 'buy' if qty > 0 else 'sell'
+            row['order_qty'] = abs(qty)
+            row['estimated_value'] = abs(qty) * price
+
+        # Buys are funded by cash plus the proceeds of the sells
+        sell_value = sum(row['estimated_value'] for row in rows if row['side'] == 'sell')
+        buy_value = sum(row['estimated_value'] for row in rows if row['side'] == 'buy')
+        budget = max(cash + sell_value - cash_buffer, 0.0)
+        if buy_value > budget:
+            scale = budget / buy_value
+            warnings.append(f"Buys scaled to {scale * 100:.1f}% to stay within available cash")
+            for row in rows:
+                if row['side'] != 'buy':
+                    continue
+                row['order_qty'] = self._round_qty(row['order_qty'] * scale, row['fractionable'])
+                row['estimated_value'] = row['order_qty'] * row['price']
+                if row['order_qty'] == 0:
+                    row['side'] = None
+            buy_value = sum(row['estimated_value'] for row in rows if row['side'] == 'buy')
+
+        orders = [
+            {'symbol': row['symbol'], 'qty': row['order_qty'], 'side': row['side'], 'type': 'market'}
+            for side in ('sell', 'buy') for row in rows if row['side'] == side
+        ]
+
+        return {
+            'portfolio_value': portfolio_value,
+            'cash': cash,
+            'positions': rows,
+            'orders': orders,
+            'estimated_sell_value': sell_value,
+            'estimated_buy_value': buy_value,
+            'estimated_cash_after': cash + sell_value - buy_value,
+            'warnings': warnings
+        }
+
+    def rebalance(self, target_weights: Dict[str, float], dry_run: bool = True,
+                  max_concurrency: int = 8, fill_timeout: float = 60,
+                  progress_callback: Optional[Callable[[float, str], None]] = None, **plan_options) -> Dict:
+        """
+        Plan a rebalance and, unless dry_run, submit it as two batches (sells, then buys)
+
+        Buys are sized from the proceeds of the sells, so they are only submitted once every
+        sell has filled. If a sell fails or hasn't filled within fill_timeout seconds, the buys
+        are not submitted and the result says why; the sells already placed stay in effect.
+        Because of that wait, live rebalances from web requests run on the job queue
+        (run_rebalance_job); progress_callback(percent, message) reports each stage.
+
+        Returns:
+            dict: The plan, plus the batch results for 'sells' and 'buys' and the final sell
+                order states ('sell_fills') when executed
+        """
+        plan = self.plan(target_weights, **plan_options)
+        result = {'dry_run': dry_run, 'plan': plan}
+        if dry_run or not plan['orders']:
+            return result
+
+        report = progress_callback or (lambda percent, message: None)
+        sells = [order for order in plan['orders'] if order['side'] == 'sell']
+        buys = [order for order in plan['orders'] if order['side'] == 'buy']
+        report(20, f"Submitting {len(sells)} sell orders...")
+        result['sells'] = self.trading.submit_orders(sells, max_concurrency=max_concurrency)
+
+        unfilled = []
+        if sells:
+            report(40, "Waiting for the sells to fill...")
+            submitted_ids = [str(entry['order']['id']) for entry in result['sells']['results'] if entry['order']]
+            result['sell_fills'] = self.trading.wait_for_orders(submitted_ids, timeout=fill_timeout)
+            for entry in result['sells']['results']:
+                state = result['sell_fills'].get(str(entry['order']['id'])) if entry['order'] else None
+                if state is None or state['status'] != 'filled':
+                    unfilled.append(entry['symbol'])
+
+        if unfilled:
+            result['buys'] = {
+                'success': False,
+                'submitted': 0,
+                'failed': len(buys),
+                'results': [{
+                    'symbol': order['symbol'],
+                    'side': order['side'],
+                    'qty': order['qty'],
+                    'type': order.get('type', 'market'),
+                    'client_order_id': order.get('client_order_id'),
+                    'status': 'not_submitted',
+                    'error': 'Sell orders not filled',
+                    'order': None
+                } for order in buys]
+            }
+            result['error'] = f"Buys not submitted: sells for {', '.join(unfilled)} did not fill"
+        else:
+            report(80, f"Submitting {len(buys)} buy orders...")
+            result['buys'] = self.trading.submit_orders(buys, max_concurrency=max_concurrency)
+        result['success'] = result['sells']['success'] and result['buys']['success']
+        print(f"Rebalance submitted: {len(sells)} sells, {result['buys']['submitted']} of {len(buys)} buys")
+        return result
@@ -1,62 +1,214 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest, StopOrderRequest, StopLimitOrderRequest
+from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest, StopOrderRequest, StopLimitOrderRequest, GetCalendarRequest
 from alpaca.trading.enums import OrderSide, TimeInForce, OrderType
 from decimal import Decimal
 from typing import Dict, List, Optional
+from alpaca_service.market_sessions import MarketSessions, alpaca_calendar_loader, CALENDAR_TIMEZONE
+
+US_MARKET = 'US'
+ORDER_TYPES = ('market', 'limit', 'stop', 'stop_limit')
+# Order statuses after which an order will not fill any further
+FINAL_ORDER_STATUSES = ('filled', 'canceled', 'expired', 'rejected', 'done_for_day')
+
+
+@lru_cache(maxsize=1)
+def _calendar_client() -> TradingClient:
+    # Created on first use, after the app has loaded its environment
+    return TradingClient(os.getenv('ALPACA_API_KEY'), os.getenv('ALPACA_SECRET_KEY'), paper=True)
+
+
+def _load_market_calendar(start, end):
+    """Exchange calendar loaded with the app-level Alpaca credentials, never a user's"""
+    return alpaca_calendar_loader(_calendar_client())(start, end)
+
 
 class TradingService:
+    # Exchange sessions are the same for every account, so all instances share one index
+    _market_sessions = MarketSessions(_load_market_calendar)
+    _market_sessions.add_market(US_MARKET, start='09:30', end='16:00', timezone=CALENDAR_TIMEZONE, use_calendar=True)
+
     def __init__(self, alpaca_service):
         self.alpaca = alpaca_service
 
+    def _build_order_request(self, symbol: str, qty: float, side: str, order_type: str = 'market',
+                             limit_price: float = None, stop_price: float = None,
+                             client_order_id: str = None):
+        """Build the alpaca-py order request for an order type"""
+        common = {
+            'symbol': symbol,
+            'qty': qty,
+            'side': OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
+            'time_in_force': TimeInForce.DAY,
+            'client_order_id': client_order_id
+        }
+        if order_type == 'limit':
+            return LimitOrderRequest(limit_price=limit_price, **common)
+        if order_type == 'stop':
+            return StopOrderRequest(stop_price=stop_price, **common)
+        if order_type == 'stop_limit':
+            return StopLimitOrderRequest(stop_price=stop_price, limit_price=limit_price, **common)
+        return MarketOrderRequest(**common)
+
     def place_market_order(self, symbol: str, qty: float, side: str) -> Dict:
         """Place a market order"""
-        order_data = MarketOrderRequest(
-            symbol=symbol,
-            qty=qty,
-            side=OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
-            time_in_force=TimeInForce.DAY
-        )
+        order_data = self._build_order_request(symbol, qty, side)
         order = self.alpaca.client.submit_order(order_data)
         return self._format_order_response(order)
 
     def place_limit_order(self, symbol: str, qty: float, side: str, limit_price: float) -> Dict:
         """Place a limit order"""
-        order_data = LimitOrderRequest(
-            symbol=symbol,
-            qty=qty,
-            side=OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
-            time_in_force=TimeInForce.DAY,
-            limit_price=limit_price
-        )
+        order_data = self._build_order_request(symbol, qty, side, 'limit', limit_price=limit_price)
         order = self.alpaca.client.submit_order(order_data)
         return self._format_order_response(order)
 
     def place_stop_order(self, symbol: str, qty: float, side: str, stop_price: float) -> Dict:
         """Place a stop order"""
-        order_data = StopOrderRequest(
-            symbol=symbol,
-            qty=qty,
-            side=OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
-            time_in_force=TimeInForce.DAY,
-            stop_price=stop_price
-        )
+        order_data = self._build_order_request(symbol, qty, side, 'stop', stop_price=stop_price)
         order = self.alpaca.client.submit_order(order_data)
         return self._format_order_response(order)
 
     def place_stop_limit_order(self, symbol: str, qty: float, side: str, stop_price: float, limit_price: float) -> Dict:
         """Place a stop-limit order"""
-        order_data = StopLimitOrderRequest(
-            symbol=symbol,
-            qty=qty,
-            side=OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
-            time_in_force=TimeInForce.DAY,
-            stop_price=stop_price,
-            limit_price=limit_price
-        )
+        order_data = self._build_order_request(symbol, qty, side, 'stop_limit',
+                                               limit_price=limit_price, stop_price=stop_price)
         order = self.alpaca.client.submit_order(order_data)
         return self._format_order_response(order)
 
+    def _normalize_order(self, order: Dict) -> Dict:
+        """Validate a batch order spec locally and normalize its fields
+
+        Returns:
+            dict: The normalized order, with an 'error' key if it is invalid
+        """
+        normalized = {
+            'symbol': str(order.get('symbol') or '').strip().upper(),
+            'side': str(order.get('side') or '').lower(),
+            'type': str(order.get('type') or 'market').lower(),
+            'client_order_id': order.get('client_order_id') or uuid.uuid4().hex
+        }
+        try:
+            normalized['qty'] = float(order.get('qty'))
+            for price in ('limit_price', 'stop_price'):
+                normalized[price] = float(order[price]) if order.get(price) is not None else None
+        except (TypeError, ValueError):
+            normalized['error'] = 'qty, limit_price and stop_price must be numbers'
+            return normalized
+
+        if not normalized['symbol']:
+            normalized['error'] = 'Missing symbol'
+        elif normalized['side'] not in ('buy', 'sell'):
+            normalized['error'] = "side must be 'buy' or 'sell'"
+        elif normalized['type'] not in ORDER_TYPES:
+            normalized['error'] = f"type must be one of: {', '.join(ORDER_TYPES)}"
+        elif normalized['qty'] <= 0:
+            normalized['error'] = 'qty must be positive'
+        elif normalized['type'] in ('limit', 'stop_limit') and not (normalized['limit_price'] or 0) > 0:
+            normalized['error'] = f"Missing limit price for {normalized['type']} order"
+        elif normalized['type'] in ('stop', 'stop_limit') and not (normalized['stop_price'] or 0) > 0:
+            normalized['error'] = f"Missing stop price for {normalized['type']} order"
+        return normalized
+
+    def _submit_normalized_order(self, order: Dict) -> Dict:
+        """Submit one validated batch order and return its result entry"""
+        result = {k: order[k] for k in ('symbol', 'side', 'qty', 'type', 'client_order_id')}
+        order_data = self._build_order_request(
+            order['symbol'], order['qty'], order['side'], order['type'],
+            limit_price=order['limit_price'], stop_price=order['stop_price'],
+            client_order_id=order['client_order_id']
+        )
+        try:
+            submitted = self.alpaca.client.submit_order(order_data)
+        except Exception as e:
+            # The request may have reached Alpaca before failing; the client order id tells us
+            try:
+                submitted = self.alpaca.client.get_order_by_client_id(order['client_order_id'])
+            except Exception:
+                result.update({'status': 'failed', 'error': str(e), 'order': None})
+                return result
+        result.update({'status': 'submitted', 'error': None, 'order': self._format_order_response(submitted)})
+        return result
+
+    def submit_orders(self, orders: List[Dict], max_concurrency: int = 8) -> Dict:
+        """
+        Submit several orders concurrently
+
+        Every order is validated locally before anything is sent; if any is invalid the
+        whole batch is rejected. Each order carries a client_order_id (generated unless
+        given) so a submission whose response was lost can be recovered instead of resent.
+
+        Args:
+            orders: Order specs with symbol, qty, side, type ('market', 'limit', 'stop',
+                'stop_limit'), optional limit_price/stop_price and client_order_id
+            max_concurrency: Maximum number of orders in flight at once
+
+        Returns:
+            dict: success flag, submitted/failed counts and one result per order (in input order)
+        """
+        normalized = [self._normalize_order(order) for order in orders]
+
+        seen_ids = set()
+        for order in normalized:
+            if 'error' not in order and order['client_order_id'] in seen_ids:
+                order['error'] = 'Duplicate client_order_id in batch'
+            seen_ids.add(order['client_order_id'])
+
+        if any('error' in order for order in normalized):
+            results = [{
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'qty': order.get('qty'),
+                'type': order['type'],
+                'client_order_id': order['client_order_id'],
+                'status': 'invalid' if 'error' in order else 'not_submitted',
+                'error': order.get('error'),
+                'order': None
+            } for order in normalized]
+            return {'success': False, 'submitted': 0, 'failed': len(results), 'results': results}
+
+        if not normalized:
+            return {'success': True, 'submitted': 0, 'failed': 0, 'results': []}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(normalized)))) as executor:
+            results = list(executor.map(self._submit_normalized_order, normalized))
+
+        submitted = sum(1 for result in results if result['status'] == 'submitted')
+        return {
+            'success': submitted == len(results),
+            'submitted': submitted,
+            'failed': len(results) - submitted,
+            'results': results
+        }
+
+    def wait_for_orders(self, order_ids: List[str], timeout: float = 60, poll_interval: float = 1.0) -> Dict[str, Dict]:
+        """
+        Poll orders until each reaches a final status (filled, canceled, ...) or the timeout passes
+
+        Returns:
+            dict: Latest formatted state of each order, keyed by order id (missing if it couldn't be read)
+        """
+        states = {}
+        pending = [str(order_id) for order_id in order_ids]
+        deadline = time.monotonic() + timeout
+        while pending:
+            for order_id in list(pending):
+                try:
+                    states[order_id] = self._format_order_response(self.alpaca.client.get_order_by_id(order_id))
+                except Exception as e:
+                    print(f"Error checking order {order_id}: {str(e)}")
+                    continue
+                if states[order_id]['status'] in FINAL_ORDER_STATUSES:
+                    pending.remove(order_id)
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+        return states
+
     def get_position(self, symbol: str) -> Optional[Dict]:
         """Get position details for a specific symbol"""
         try:
@@ -129,18 +281,20 @@ class TradingService:
             return None
 
     def get_clock(self) -> Dict:
-        """Get the current market clock"""
-        clock = self.alpaca.client.get_clock()
-        return {
-            'timestamp': clock.timestamp,
-            'is_open': clock.is_open,
-            'next_open': clock.next_open,
-            'next_close': clock.next_close
-        }
+        """Get the current market clock (served from the cached session index)"""
+        return self._market_sessions.clock(US_MARKET)
 
     def get_calendar(self, start: datetime, end: datetime) -> List[Dict]:
         """Get the market calendar between dates"""
-        calendar = self.alpaca.client.get_calendar(start, end)
+        start_date = start.date() if isinstance(start, datetime) else start
+        end_date = end.date() if isinstance(end, datetime) else end
+        
+        sessions = self._market_sessions.sessions(US_MARKET, start_date, end_date)
+        if sessions is not None:
+            return sessions
+        
+        # Outside the cached window
+        calendar = self.alpaca.client.get_calendar(GetCalendarRequest(start=start_date, end=end_date))
         return [{
             'date': day.date,
             'open': day.open,
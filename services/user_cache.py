@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from flask_login import UserMixin
+from sqlalchemy import event
+from models import db, User
+
+
+class CachedUser(UserMixin):
+    """
+    Detached snapshot of a User row used as Flask-Login's current_user
+
+    Holds the identity and Alpaca credential fields request handlers read, and delegates
+    the stored-info queries (which only need the user id) to the User model. Writes go
+    through save_alpaca_credentials(), which updates the row and drops the cached entry.
+    """
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.alpaca_api_key = user.alpaca_api_key
+        self.alpaca_secret_key = user.alpaca_secret_key
+        self.created_at = user.created_at
+        self.updated_at = user.updated_at
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+    def has_alpaca_credentials(self):
+        return bool(self.alpaca_api_key and self.alpaca_secret_key)
+
+    def save_alpaca_credentials(self, api_key, secret_key):
+        user = self.load()
+        user.save_alpaca_credentials(api_key, secret_key)
+        self.alpaca_api_key = api_key
+        self.alpaca_secret_key = secret_key
+        self.updated_at = user.updated_at
+        user_cache.invalidate(self.id)
+
+    def load(self) -> User:
+        """The User row, attached to the current session (for writes and relationships)"""
+        return db.session.get(User, self.id)
+
+    def stored_info_query(self, category=None, before_id=None):
+        return User.stored_info_query(self, category=category, before_id=before_id)
+
+    def get_stored_info(self, category=None, limit=None, offset=0, before_id=None):
+        return User.get_stored_info(self, category=category, limit=limit, offset=offset, before_id=before_id)
+
+    def count_stored_info(self, category=None):
+        return User.count_stored_info(self, category=category)
+
+
+class UserCache:
+    """
+    In-process cache of CachedUser entries keyed by user id, with a TTL
+
+    Serves Flask-Login's user loader so authenticated requests (including dashboard polls)
+    don't query the user table. Entries are dropped when credentials are saved or the
+    row is updated or deleted through the ORM; the TTL bounds staleness for changes made
+    by other processes.
+    """
+
+    def __init__(self, app=None, ttl: float = 300):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, CachedUser]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the TTL from the Flask app config and register the cache as an extension"""
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        """Cached user, loading it from the database when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        cached = CachedUser(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, cached)
+        return cached
+
+    def invalidate(self, user_id: int):
+        """Drop a user's entry so the next request reloads it"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
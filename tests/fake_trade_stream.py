@@ -0,0 +1,122 @@
+"""
+Local fake of Alpaca's trade_updates websocket stream, for testing OrderTracker
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+import websockets
+
+
+def order_payload(client_order_id: str, symbol: str = 'AAPL', side: str = 'buy', qty: float = 1,
+                  status: str = 'new', filled_qty: float = 0, filled_avg_price: Optional[float] = None) -> Dict:
+    """Order object as it appears in a trade update"""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        'id': str(uuid.uuid4()),
+        'client_order_id': client_order_id,
+        'created_at': now,
+        'updated_at': now,
+        'submitted_at': now,
+        'filled_at': now if status == 'filled' else None,
+        'expired_at': None,
+        'canceled_at': now if status == 'canceled' else None,
+        'failed_at': now if status == 'rejected' else None,
+        'replaced_at': None,
+        'replaced_by': None,
+        'replaces': None,
+        'asset_id': str(uuid.uuid4()),
+        'symbol': symbol,
+        'asset_class': 'us_equity',
+        'notional': None,
+        'qty': str(qty),
+        'filled_qty': str(filled_qty),
+        'filled_avg_price': None if filled_avg_price is None else str(filled_avg_price),
+        'order_class': 'simple',
+        'order_type': 'market',
+        'type': 'market',
+        'side': side,
+        'time_in_force': 'day',
+        'limit_price': None,
+        'stop_price': None,
+        'status': status,
+        'extended_hours': False,
+        'legs': None,
+        'trail_percent': None,
+        'trail_price': None,
+        'hwm': None
+    }
+
+
+class FakeTradeStream:
+    """
+    Websocket server speaking the trade_updates protocol on localhost
+
+    Clients authenticate with the configured key pair and subscribe with a 'listen' action;
+    send_update() then pushes a trade update to every subscribed client.
+
+        async with FakeTradeStream() as stream:
+            tracker = OrderTracker('key', 'secret', url=stream.url)
+    """
+
+    def __init__(self, api_key: str = 'key', secret_key: str = 'secret'):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.url = None
+        self._server = None
+        self._listeners: Set = set()
+        self._listening = asyncio.Event()
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(self._handle, '127.0.0.1', 0)
+        port = next(iter(self._server.sockets)).getsockname()[1]
+        self.url = f'ws://127.0.0.1:{port}/stream'
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws, path=None):
+        authorized = False
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                action = message.get('action')
+                if action == 'authenticate':
+                    data = message.get('data') or {}
+                    authorized = data.get('key_id') == self.api_key and data.get('secret_key') == self.secret_key
+                    await ws.send(json.dumps({
+                        'stream': 'authorization',
+                        'data': {'action': 'authenticate', 'status': 'authorized' if authorized else 'unauthorized'}
+                    }))
+                    if not authorized:
+                        return
+                elif action == 'listen' and authorized:
+                    await ws.send(json.dumps({'stream': 'listening', 'data': {'streams': ['trade_updates']}}))
+                    self._listeners.add(ws)
+                    self._listening.set()
+        finally:
+            self._listeners.discard(ws)
+
+    async def wait_for_listener(self, timeout: float = 5.0):
+        """Wait until a client has subscribed to trade updates"""
+        await asyncio.wait_for(self._listening.wait(), timeout)
+
+    async def send_update(self, event: str, order: Dict, **fields):
+        """Push a trade update (e.g. 'fill', 'partial_fill', 'canceled', 'rejected') to all listeners"""
+        message = json.dumps({
+            'stream': 'trade_updates',
+            'data': {'event': event, 'order': order, 'timestamp': datetime.now(timezone.utc).isoformat(), **fields}
+        })
+        for ws in list(self._listeners):
+            await ws.send(message)
+
+    async def disconnect_all(self):
+        """Drop every client connection (to exercise reconnects)"""
+        self._listening.clear()
+        for ws in list(self._listeners):
+            await ws.close()
@@ -0,0 +1,95 @@
+import asyncio
+
+from alpaca_service.order_tracker import OrderTracker
+from tests.fake_trade_stream import FakeTradeStream, order_payload
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 20))
+
+
+async def _tracker(stream: FakeTradeStream) -> OrderTracker:
+    tracker = OrderTracker(stream.api_key, stream.secret_key, url=stream.url)
+    assert await tracker.start(timeout=5)
+    await stream.wait_for_listener()
+    return tracker
+
+
+def test_resolving_events_resolve_their_orders():
+    async def scenario():
+        async with FakeTradeStream() as stream:
+            tracker = await _tracker(stream)
+            try:
+                cases = {
+                    'fill-1': ('fill', order_payload('fill-1', status='filled', filled_qty=1, filled_avg_price=101.5)),
+                    'partial-1': ('partial_fill', order_payload('partial-1', qty=10, status='partially_filled',
+                                                                filled_qty=4, filled_avg_price=99)),
+                    'cancel-1': ('canceled', order_payload('cancel-1', status='canceled')),
+                    'reject-1': ('rejected', order_payload('reject-1', status='rejected'))
+                }
+                for client_order_id in cases:
+                    tracker.track(client_order_id)
+                for event, order in cases.values():
+                    await stream.send_update(event, order)
+
+                updates = {}
+                for client_order_id, (event, order) in cases.items():
+                    update = await tracker.wait_for(client_order_id, timeout=5)
+                    assert update is not None
+                    assert update.event == event
+                    assert update.order.client_order_id == client_order_id
+                    assert update.order.status == order['status']
+                    updates[client_order_id] = update
+                assert float(updates['partial-1'].order.filled_qty) == 4
+            finally:
+                await tracker.stop()
+
+    run(scenario())
+
+
+def test_non_resolving_and_untracked_updates_are_ignored():
+    async def scenario():
+        async with FakeTradeStream() as stream:
+            tracker = await _tracker(stream)
+            try:
+                tracker.track('order-1', events={'fill'})
+                # 'new' doesn't settle the order, and other orders' updates don't touch it
+                await stream.send_update('new', order_payload('order-1'))
+                await stream.send_update('fill', order_payload('other', status='filled', filled_qty=1))
+                assert await tracker.wait_for('order-1', timeout=0.5) is None
+            finally:
+                await tracker.stop()
+
+    run(scenario())
+
+
+def test_reconnects_after_the_stream_drops():
+    async def scenario():
+        async with FakeTradeStream() as stream:
+            tracker = OrderTracker(stream.api_key, stream.secret_key, url=stream.url, max_reconnect_delay=0.2)
+            assert await tracker.start(timeout=5)
+            try:
+                await stream.wait_for_listener()
+                await stream.disconnect_all()
+                await stream.wait_for_listener()
+
+                tracker.track('after-reconnect')
+                await stream.send_update('fill', order_payload('after-reconnect', status='filled', filled_qty=1))
+                update = await tracker.wait_for('after-reconnect', timeout=5)
+                assert update is not None and update.event == 'fill'
+            finally:
+                await tracker.stop()
+
+    run(scenario())
+
+
+def test_rejected_credentials_never_connect():
+    async def scenario():
+        async with FakeTradeStream() as stream:
+            tracker = OrderTracker('wrong', 'credentials', url=stream.url)
+            try:
+                assert not await tracker.start(timeout=0.5)
+            finally:
+                await tracker.stop()
+
+    run(scenario())